@@ -1,5 +1,7 @@
 # app.py (Main entry point)
 import streamlit as st
+# Only lightweight modules are imported here; the ML stack loads in the background
+from service.warmup import start_warmup
 
 st.set_page_config(
     page_title="RAG Q&A System",
@@ -174,4 +176,7 @@ with col2:
         st.switch_page("pages/2_Website_QA.py")
 
 st.markdown('<hr style="border: 0; border-top: 2px solid black; margin: 20px 0; background: transparent;">', unsafe_allow_html=True)
-st.markdown("<p style='text-align: center; color: black; opacity: 0.8;'>Powered by AI • Built with Streamlit</p>", unsafe_allow_html=True)
\ No newline at end of file
+st.markdown("<p style='text-align: center; color: black; opacity: 0.8;'>Powered by AI • Built with Streamlit</p>", unsafe_allow_html=True)
+
+# The page is on screen; load the embedding model and LLM client meanwhile
+start_warmup()
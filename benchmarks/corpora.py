@@ -0,0 +1,186 @@
+"""
+Synthetic benchmark corpora.
+
+Every corpus is generated from a seed, so the same size always yields the
+same bytes and runs on different machines or commits are comparable. Text
+is filler prose with one checkable fact per paragraph ("The Orion project
+was started in 1987 by Maria Keller ..."); benchmark questions ask about
+those facts, so retrieval has a real answer to find.
+"""
+import random
+import csv
+import os
+
+# Pages per corpus size; a page is about 2,500 characters of text
+SIZES = {
+    "small": 20,
+    "medium": 200,
+    "large": 1000,
+}
+
+PARAGRAPHS_PER_PAGE = 5
+
+_FILLER = (
+    "the system process data report model result analysis method value team "
+    "review design change project market customer service quality cost time "
+    "level policy research support network security program budget plan risk "
+    "performance product document question answer source index search query "
+    "annual regional technical strategic internal external primary detailed "
+    "shows requires describes includes improves reduces measures compares"
+).split()
+
+_PROJECTS = (
+    "Orion Atlas Nimbus Vega Helix Quartz Falcon Cedar Aurora Titan Lumen "
+    "Delta Ember Zephyr Granite Harbor Summit Willow Cobalt Meridian"
+).split()
+
+_PEOPLE = (
+    "Maria Keller|James Okafor|Li Wei|Sofia Rossi|Daniel Novak|Aisha Rahman|"
+    "Tom Becker|Elena Petrova|Kenji Sato|Laura Silva"
+).split("|")
+
+_CITIES = "Berlin Lagos Osaka Lisbon Denver Pune Oslo Quito Perth Tunis".split()
+
+
+def _fact(rng, number):
+    project = f"{rng.choice(_PROJECTS)}-{number}"
+    person = rng.choice(_PEOPLE)
+    city = rng.choice(_CITIES)
+    year = rng.randint(1950, 2024)
+    budget = rng.randint(1, 900)
+    sentence = (
+        f"The {project} project was started in {year} by {person} in {city} "
+        f"with a budget of {budget} million."
+    )
+    question = f"Who started the {project} project and in which year?"
+    return sentence, {"question": question, "expected": f"{person}, {year}"}
+
+
+def _sentence(rng):
+    words = [rng.choice(_FILLER) for _ in range(rng.randint(8, 18))]
+    return " ".join(words).capitalize() + "."
+
+
+def generate_pages(pages, seed=0):
+    """
+    Page texts plus the questions they answer.
+
+    Returns:
+        tuple: (list of page strings, list of ``{"question", "expected"}``)
+    """
+    rng = random.Random(seed)
+    texts, questions = [], []
+    for page in range(pages):
+        paragraphs = []
+        for paragraph in range(PARAGRAPHS_PER_PAGE):
+            fact, question = _fact(rng, page * PARAGRAPHS_PER_PAGE + paragraph)
+            sentences = [_sentence(rng) for _ in range(rng.randint(3, 5))]
+            sentences.insert(rng.randint(0, len(sentences)), fact)
+            paragraphs.append(" ".join(sentences))
+            questions.append(question)
+        texts.append("\n\n".join(paragraphs))
+    return texts, questions
+
+
+def _pdf_string(text):
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def _wrap(text, width=95):
+    lines = []
+    for paragraph in text.split("\n\n"):
+        line = ""
+        for word in paragraph.split():
+            if line and len(line) + len(word) + 1 > width:
+                lines.append(line)
+                line = word
+            else:
+                line = f"{line} {word}" if line else word
+        lines.append(line)
+        lines.append("")
+    return lines
+
+
+def write_pdf(path, pages):
+    """
+    Write page texts as a plain text-layer PDF (Helvetica, US Letter).
+
+    Written by hand so the benchmarks need no PDF authoring library.
+    """
+    objects = [None, None, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    page_refs = []
+    for text in pages:
+        commands = ["BT", "/F1 9 Tf", "11 TL", "40 760 Td"]
+        commands += [f"({_pdf_string(line)}) '" for line in _wrap(text)]
+        commands.append("ET")
+        stream = "\n".join(commands).encode("latin-1", "replace")
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        content = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content
+        )
+        page_refs.append(len(objects))
+    objects[0] = b"<< /Type /Catalog /Pages 2 0 R >>"
+    kids = b" ".join(b"%d 0 R" % ref for ref in page_refs)
+    objects[1] = b"<< /Type /Pages /Kids [" + kids + b"] /Count %d >>" % len(page_refs)
+
+    with open(path, "wb") as f:
+        f.write(b"%PDF-1.4\n")
+        offsets = []
+        for number, body in enumerate(objects, 1):
+            offsets.append(f.tell())
+            f.write(b"%d 0 obj\n" % number + body + b"\nendobj\n")
+        xref = f.tell()
+        f.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+        for offset in offsets:
+            f.write(b"%010d 00000 n \n" % offset)
+        f.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n"
+                % (len(objects) + 1, xref))
+
+
+def write_csv(path, rows, seed=0):
+    """A table of ``rows`` project records"""
+    rng = random.Random(seed)
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["project", "lead", "city", "year", "budget_musd", "status", "notes"])
+        for row in range(rows):
+            writer.writerow([
+                f"{rng.choice(_PROJECTS)}-{row}",
+                rng.choice(_PEOPLE),
+                rng.choice(_CITIES),
+                rng.randint(1950, 2024),
+                rng.randint(1, 900),
+                rng.choice(["active", "paused", "closed"]),
+                _sentence(rng),
+            ])
+
+
+def build_corpus(size, directory, seed=0):
+    """
+    Write the ``size`` corpus (see SIZES) as TXT, PDF and CSV files.
+
+    Files are reused if they already exist, since generation is
+    deterministic.
+
+    Returns:
+        dict: ``{"files": {"txt", "pdf", "csv"}: path, "pages", "questions"}``
+    """
+    pages = SIZES[size]
+    texts, questions = generate_pages(pages, seed=seed)
+    os.makedirs(directory, exist_ok=True)
+    files = {
+        "txt": os.path.join(directory, f"{size}-{seed}.txt"),
+        "pdf": os.path.join(directory, f"{size}-{seed}.pdf"),
+        "csv": os.path.join(directory, f"{size}-{seed}.csv"),
+    }
+    if not os.path.exists(files["txt"]):
+        with open(files["txt"], "w", encoding="utf-8") as f:
+            f.write("\n\n".join(texts))
+    if not os.path.exists(files["pdf"]):
+        write_pdf(files["pdf"], texts)
+    if not os.path.exists(files["csv"]):
+        # About as much text as the pages
+        write_csv(files["csv"], pages * 25, seed=seed)
+    return {"files": files, "pages": pages, "questions": questions}
@@ -0,0 +1,134 @@
+"""
+Import-time budget check for the Streamlit entry points.
+
+Run from the repository root:
+    python -m benchmarks.import_budget
+    python -m benchmarks.import_budget --scale 2   # slower machine
+
+Each check runs in a fresh interpreter and fails if it takes longer than
+its budget or loads any module in HEAVY_MODULES. The checks are what a
+first page render costs: the top-level imports of app.py and pages/*.py
+(Streamlit itself excluded), and creating an empty knowledge base. The
+ML stack must instead load on first use or in the background warm-up
+(service.warmup).
+"""
+import argparse
+import subprocess
+import ast
+import json
+import sys
+import os
+
+# Must not be imported before the user uploads or asks something
+HEAVY_MODULES = (
+    "langchain_community",
+    "langchain_groq",
+    "groq",
+    "langchain_huggingface",
+    "sentence_transformers",
+    "transformers",
+    "torch",
+    "faiss",
+    "unstructured",
+    "langchain_text_splitters",
+    "pandas",
+    "aiohttp",
+    "bs4",
+    "pypdf",
+    "pdfminer",
+    "fitz",
+    "pytesseract",
+)
+
+ENTRY_POINTS = ("app.py", "pages/1_PDF_QA.py", "pages/2_Website_QA.py")
+
+# Seconds on a developer laptop; langchain_core alone is about a third of the second check
+BUDGETS = {
+    "entry point imports": 0.25,
+    "empty knowledge base": 1.0,
+}
+
+_PROBE = """
+import sys, time, json
+try:
+    import streamlit  # fixed cost of any Streamlit app, not ours
+except ImportError:
+    pass
+before = set(sys.modules)
+start = time.perf_counter()
+exec(compile({code!r}, "<check>", "exec"))
+seconds = time.perf_counter() - start
+loaded = sorted({{name.split(".")[0] for name in set(sys.modules) - before}})
+print(json.dumps({{"seconds": seconds, "loaded": loaded}}))
+"""
+
+
+def entry_point_imports(paths=ENTRY_POINTS):
+    """Module-level import statements of the page scripts, as source code"""
+    statements = []
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            tree = ast.parse(f.read(), path)
+        for node in tree.body:
+            if isinstance(node, (ast.Import, ast.ImportFrom)):
+                source = ast.unparse(node)
+                if "streamlit" not in source and source not in statements:
+                    statements.append(source)
+    return "\n".join(statements)
+
+
+def checks():
+    return {
+        "entry point imports": entry_point_imports(),
+        "empty knowledge base": (
+            "from service.client import new_knowledge_base\n"
+            "kb = new_knowledge_base()\n"
+            "kb.chunks, kb.sources()"
+        ),
+    }
+
+
+def run_check(code, repeat=3):
+    """Fastest of ``repeat`` fresh-interpreter runs of ``code``"""
+    env = dict(os.environ, KNOWLENS_WARMUP="0")
+    env.pop("KNOWLENS_API_URL", None)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [os.getcwd(), env.get("PYTHONPATH")]))
+    best = None
+    for _ in range(max(1, repeat)):
+        result = subprocess.run(
+            [sys.executable, "-W", "ignore", "-c", _PROBE.format(code=code)],
+            capture_output=True, text=True, env=env,
+        )
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr else "check failed")
+        measured = json.loads(result.stdout.strip().splitlines()[-1])
+        if best is None or measured["seconds"] < best["seconds"]:
+            best = measured
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check import time of the Streamlit entry points")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply every budget (slow machines)")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per check (fastest is kept)")
+    args = parser.parse_args(argv)
+
+    failed = False
+    for name, code in checks().items():
+        budget = BUDGETS[name] * args.scale
+        try:
+            result = run_check(code, args.repeat)
+        except RuntimeError as e:
+            print(f"❌ {name}: {e}")
+            failed = True
+            continue
+        heavy = [module for module in result["loaded"] if module in HEAVY_MODULES]
+        ok = result["seconds"] <= budget and not heavy
+        failed |= not ok
+        print(f"{'✅' if ok else '❌'} {name}: {result['seconds'] * 1000:.0f} ms "
+              f"(budget {budget * 1000:.0f} ms)" + (f", loads {', '.join(heavy)}" if heavy else ""))
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
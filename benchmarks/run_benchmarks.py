@@ -0,0 +1,483 @@
+"""
+Ingestion, retrieval and QA benchmarks.
+
+Run from the repository root:
+    python -m benchmarks.run_benchmarks run --sizes small medium --out results.json
+    python -m benchmarks.run_benchmarks run --baseline baseline.json
+    python -m benchmarks.run_benchmarks compare baseline.json results.json
+
+``run`` measures, per corpus: parse throughput per loader (TXT, CSV and
+every available PDF engine), splitting speed, embedding chunks/sec, index
+build time, dense and hybrid query latency (p50/p95/p99) and end-to-end
+QA latency with a local stub LLM in place of Groq. Corpora are the
+synthetic sizes in benchmarks.corpora, plus any files passed with
+``--docs`` as a "sample" corpus.
+
+Results are JSON. ``compare`` (or ``run --baseline``) flags every metric
+that got worse than the baseline by more than ``--tolerance`` and exits
+with status 1 if any did.
+"""
+from benchmarks.corpora import SIZES, build_corpus
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+import numpy as np
+import argparse
+import datetime
+import platform
+import statistics
+import subprocess
+import tempfile
+import json
+import time
+import os
+
+SCHEMA_VERSION = 1
+
+# Fractional change that counts as a regression
+DEFAULT_TOLERANCE = 0.2
+
+# Differences smaller than this are timer noise, whatever the ratio
+NOISE_FLOOR = {"ms": 0.5, "s": 0.005}
+
+STUB_ANSWER = (
+    "Based on the provided documents, the project was started by the person "
+    "and in the year named in the context above. [1]"
+)
+
+
+class StubChatModel(BaseChatModel):
+    """
+    Local stand-in for the Groq model: a fixed answer, streamed word by word.
+
+    ``first_token_latency`` and ``token_latency`` (seconds) simulate model
+    time; both default to zero so end-to-end numbers show this project's
+    own overhead.
+    """
+
+    answer: str = STUB_ANSWER
+    first_token_latency: float = 0.0
+    token_latency: float = 0.0
+
+    @property
+    def _llm_type(self):
+        return "benchmark-stub"
+
+    def _tokens(self):
+        words = self.answer.split(" ")
+        return [word if i == 0 else " " + word for i, word in enumerate(words)]
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        time.sleep(self.first_token_latency + self.token_latency * len(self._tokens()))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.answer))])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        time.sleep(self.first_token_latency)
+        for token in self._tokens():
+            if self.token_latency:
+                time.sleep(self.token_latency)
+            # The base class reports each chunk to the callbacks
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+
+
+def percentiles(samples_ms):
+    """p50/p95/p99/mean of latency samples, in milliseconds"""
+    values = np.array(samples_ms, dtype=np.float64)
+    return {
+        "p50_ms": float(np.percentile(values, 50)),
+        "p95_ms": float(np.percentile(values, 95)),
+        "p99_ms": float(np.percentile(values, 99)),
+        "mean_ms": float(values.mean()),
+    }
+
+
+def _timed(fn, repeat):
+    """(median seconds over ``repeat`` runs, result of the last run)"""
+    timings = []
+    result = None
+    for _ in range(max(1, repeat)):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings), result
+
+
+class Recorder:
+    """Flat ``name -> {"value", "unit", "better"}`` metrics for one run"""
+
+    def __init__(self):
+        self.metrics = {}
+
+    def add(self, name, value, unit, better):
+        self.metrics[name] = {"value": float(value), "unit": unit, "better": better}
+
+    def add_latency(self, name, samples_ms):
+        for key, value in percentiles(samples_ms).items():
+            self.add(f"{name}.{key}", value, "ms", "lower")
+
+    def add_throughput(self, name, seconds, items, item_unit, size_bytes=None):
+        self.add(f"{name}.seconds", seconds, "s", "lower")
+        self.add(f"{name}.{item_unit}_per_s", items / seconds if seconds else 0.0, f"{item_unit}/s", "higher")
+        if size_bytes is not None:
+            self.add(f"{name}.mb_per_s", size_bytes / 1e6 / seconds if seconds else 0.0, "MB/s", "higher")
+
+
+def get_benchmark_embeddings(kind, batch_size):
+    """
+    The shared model without the on-disk cache (so every run really
+    embeds), or a deterministic fake for quick runs without the model.
+    """
+    if kind == "fake":
+        from langchain_core.embeddings import DeterministicFakeEmbedding
+
+        return DeterministicFakeEmbedding(size=384)
+    from retrieval.embeddings import get_embeddings
+
+    return get_embeddings(batch_size=batch_size)
+
+
+def bench_parse(recorder, prefix, files, repeat):
+    """Parse throughput per loader; returns the parsed PDF pages"""
+    from langchain_community.document_loaders import TextLoader
+    from ingest.csv_Ingest import RowBlockCSVLoader
+    from ingest.pdf_Engines import TieredPDFLoader, available_engines
+    from ingest.pdf_Ingest import SPLITTER_CONFIG
+
+    loaders = {}
+    if "txt" in files:
+        loaders["txt"] = lambda: TextLoader(files["txt"], encoding="utf-8")
+    if "csv" in files:
+        loaders["csv"] = lambda: RowBlockCSVLoader(files["csv"], max_block_chars=SPLITTER_CONFIG["chunk_size"])
+    if "pdf" in files:
+        for engine in available_engines():
+            loaders[f"pdf_{engine}"] = lambda engine=engine: TieredPDFLoader(files["pdf"], engines=[engine])
+
+    pages = []
+    for name, make_loader in loaders.items():
+        path = files[name.split("_")[0]]
+        seconds, docs = _timed(lambda: list(make_loader().lazy_load()), repeat)
+        recorder.add_throughput(f"{prefix}.parse.{name}", seconds, len(docs), "docs",
+                                size_bytes=os.path.getsize(path))
+        if name.startswith("pdf") and not pages:
+            pages = docs
+        print(f"  📄 parse {name}: {len(docs)} docs in {seconds * 1000:.1f} ms")
+    return pages
+
+
+def bench_split(recorder, prefix, pages, repeat):
+    from ingest.pdf_Ingest import get_splitter
+
+    chars = sum(len(page.page_content) for page in pages)
+    seconds, chunks = _timed(lambda: get_splitter().split_documents(pages), repeat)
+    recorder.add_throughput(f"{prefix}.split", seconds, len(chunks), "chunks", size_bytes=chars)
+    print(f"  ✂️ split: {len(chunks)} chunks in {seconds * 1000:.1f} ms")
+    return chunks
+
+
+def bench_embed(recorder, prefix, chunks, embeddings, batch_size):
+    """Embedding throughput in ``batch_size`` batches, as the ingest pipeline calls it"""
+    texts = [chunk.page_content for chunk in chunks]
+    embeddings.embed_documents(texts[:batch_size])  # warm-up
+    vectors = []
+    start = time.perf_counter()
+    for i in range(0, len(texts), batch_size):
+        vectors.extend(embeddings.embed_documents(texts[i:i + batch_size]))
+    seconds = time.perf_counter() - start
+    recorder.add_throughput(f"{prefix}.embed", seconds, len(texts), "chunks")
+    print(f"  🧠 embed: {len(texts) / seconds:.0f} chunks/s")
+    return vectors
+
+
+def build_store(chunks, vectors, embeddings, index_type):
+    """A FAISS store plus BM25 over pre-computed vectors (no embedding)"""
+    from langchain_community.vectorstores import FAISS
+    from langchain_community.docstore.in_memory import InMemoryDocstore
+    from retrieval.ann_index import build_index
+    from retrieval.bm25 import BM25Index, attach_bm25
+    import uuid
+
+    ids = [str(uuid.uuid4()) for _ in chunks]
+    store = FAISS(
+        embedding_function=embeddings,
+        index=build_index(np.array(vectors, dtype=np.float32), index_type=index_type),
+        docstore=InMemoryDocstore(dict(zip(ids, chunks))),
+        index_to_docstore_id=dict(enumerate(ids)),
+    )
+    bm25 = BM25Index()
+    bm25.add(ids, [chunk.page_content for chunk in chunks])
+    attach_bm25(store, bm25)
+    return store
+
+
+def bench_index(recorder, prefix, chunks, vectors, embeddings, index_type, repeat):
+    seconds, store = _timed(lambda: build_store(chunks, vectors, embeddings, index_type), repeat)
+    recorder.add_throughput(f"{prefix}.index", seconds, len(chunks), "chunks")
+    print(f"  🗂️ index ({index_type}): {seconds * 1000:.1f} ms")
+    return store
+
+
+def bench_query(recorder, prefix, store, questions, k, lexical_weight):
+    """Per-query latency, including the query embedding; the search cache is bypassed"""
+    from retrieval.retriever import search
+
+    for mode, weight in (("dense", 0), ("hybrid", lexical_weight)):
+        search(store, questions[0], k=k, lexical_weight=weight, use_cache=False)  # warm-up
+        samples = []
+        for question in questions:
+            start = time.perf_counter()
+            search(store, question, k=k, lexical_weight=weight, use_cache=False)
+            samples.append((time.perf_counter() - start) * 1000)
+        recorder.add_latency(f"{prefix}.query.{mode}", samples)
+        print(f"  🔎 query {mode}: p50 {np.percentile(samples, 50):.2f} ms, "
+              f"p99 {np.percentile(samples, 99):.2f} ms")
+
+
+def bench_end_to_end(recorder, prefix, store, questions, k, lexical_weight, llm):
+    """Streamed answers through the full QA chain: time to first token and total"""
+    from retrieval.qa_chain import build_qa_chain, stream_answer
+    from retrieval.search_cache import get_search_cache
+
+    get_search_cache().invalidate()
+    rag_chain, _ = build_qa_chain(store, k=k, lexical_weight=lexical_weight, llm=llm)
+    for _ in stream_answer(rag_chain, "warm-up question"):
+        pass
+
+    first_token, total = [], []
+    for question in questions:
+        start = time.perf_counter()
+        first = None
+        for event in stream_answer(rag_chain, question):
+            if first is None and event["type"] == "token":
+                first = time.perf_counter() - start
+        total.append((time.perf_counter() - start) * 1000)
+        first_token.append((first if first is not None else total[-1] / 1000) * 1000)
+    recorder.add_latency(f"{prefix}.e2e.first_token", first_token)
+    recorder.add_latency(f"{prefix}.e2e.total", total)
+    print(f"  💬 end-to-end: p50 {np.percentile(total, 50):.2f} ms, "
+          f"first token p50 {np.percentile(first_token, 50):.2f} ms")
+
+
+def bench_corpus(recorder, prefix, files, questions, embeddings, args, llm):
+    print(f"📚 Corpus {prefix}")
+    pages = bench_parse(recorder, prefix, files, args.repeat)
+    if not pages:
+        # No PDF in a sample corpus: split whatever was parsed
+        from ingest.pdf_Ingest import get_loader
+
+        pages = [doc for path in files.values() for doc in get_loader(path).lazy_load()]
+    chunks = bench_split(recorder, prefix, pages, args.repeat)
+    vectors = bench_embed(recorder, prefix, chunks, embeddings, args.batch_size)
+    store = bench_index(recorder, prefix, chunks, vectors, embeddings, args.index_type, args.repeat)
+
+    questions = questions[:args.queries]
+    bench_query(recorder, prefix, store, questions, args.k, args.lexical_weight)
+    bench_end_to_end(recorder, prefix, store, questions[:args.e2e_queries], args.k,
+                     args.lexical_weight, llm)
+
+
+def _sample_corpus(paths):
+    """Files passed with --docs, keyed by loader name, and questions from their text"""
+    from ingest.batch_Ingest import collect_files
+
+    files = {}
+    for path in collect_files(paths):
+        extension = os.path.splitext(path)[1].lower().lstrip(".")
+        # One file per type keeps the per-loader metrics well defined
+        files.setdefault(extension, path)
+    questions = []
+    if "txt" in files:
+        with open(files["txt"], encoding="utf-8", errors="replace") as f:
+            sentences = [s.strip() for s in f.read().split(".") if len(s.split()) >= 6]
+        questions = [{"question": " ".join(s.split()[:12]) + "?"} for s in sentences]
+    return files, questions or [{"question": "What is this document about?"}]
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args):
+    from ingest.pdf_Ingest import SPLITTER_CONFIG
+
+    # Splitter settings under test; this process only
+    SPLITTER_CONFIG["chunk_size"] = args.chunk_size
+    SPLITTER_CONFIG["chunk_overlap"] = args.chunk_overlap
+
+    params = {
+        "sizes": args.sizes,
+        "sample": bool(args.docs),
+        "seed": args.seed,
+        "repeat": args.repeat,
+        "chunk_size": args.chunk_size,
+        "chunk_overlap": args.chunk_overlap,
+        "batch_size": args.batch_size,
+        "embeddings": args.embeddings,
+        "index_type": args.index_type,
+        "k": args.k,
+        "lexical_weight": args.lexical_weight,
+        "queries": args.queries,
+        "e2e_queries": args.e2e_queries,
+        "llm_first_token_latency": args.llm_first_token_latency,
+        "llm_token_latency": args.llm_token_latency,
+    }
+    embeddings = get_benchmark_embeddings(args.embeddings, args.batch_size)
+    llm = StubChatModel(
+        first_token_latency=args.llm_first_token_latency, token_latency=args.llm_token_latency
+    )
+    corpus_dir = args.corpus_dir or os.path.join(tempfile.gettempdir(), "knowlens-bench-corpora")
+
+    recorder = Recorder()
+    start = time.perf_counter()
+    for size in args.sizes:
+        corpus = build_corpus(size, corpus_dir, seed=args.seed)
+        bench_corpus(recorder, size, corpus["files"], [q["question"] for q in corpus["questions"]],
+                     embeddings, args, llm)
+    if args.docs:
+        files, questions = _sample_corpus(args.docs)
+        bench_corpus(recorder, "sample", files, [q["question"] for q in questions],
+                     embeddings, args, llm)
+
+    results = {
+        "schema": SCHEMA_VERSION,
+        "meta": {
+            "created": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "processor": platform.processor() or platform.machine(),
+            "cpu_count": os.cpu_count(),
+            "elapsed_s": time.perf_counter() - start,
+        },
+        "params": params,
+        "metrics": recorder.metrics,
+    }
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"💾 {len(recorder.metrics)} metrics written to {args.out}")
+
+    if args.baseline:
+        return report_comparison(load_results(args.baseline), results, args.tolerance)
+    return 0
+
+
+def load_results(path):
+    with open(path, encoding="utf-8") as f:
+        results = json.load(f)
+    if results.get("schema") != SCHEMA_VERSION:
+        raise ValueError(f"{path}: unsupported results schema {results.get('schema')}")
+    return results
+
+
+def compare(baseline, current, tolerance=DEFAULT_TOLERANCE):
+    """
+    Compare two result sets metric by metric.
+
+    A metric regresses when it moves in its worse direction by more than
+    ``tolerance`` (a fraction of the baseline value) and by more than the
+    noise floor of its unit.
+
+    Returns:
+        list: ``{"metric", "baseline", "current", "change", "status"}`` rows;
+        status is "regression", "improvement", "ok", "new" or "missing"
+    """
+    rows = []
+    old_metrics, new_metrics = baseline["metrics"], current["metrics"]
+    for name in sorted(set(old_metrics) | set(new_metrics)):
+        old, new = old_metrics.get(name), new_metrics.get(name)
+        if old is None or new is None:
+            rows.append({"metric": name, "baseline": old and old["value"], "current": new and new["value"],
+                         "change": None, "status": "new" if old is None else "missing"})
+            continue
+        delta = new["value"] - old["value"]
+        change = delta / old["value"] if old["value"] else 0.0
+        worse = change > tolerance if new["better"] == "lower" else change < -tolerance
+        better = change < -tolerance if new["better"] == "lower" else change > tolerance
+        if abs(delta) < NOISE_FLOOR.get(new["unit"], 0.0):
+            worse = better = False
+        status = "regression" if worse else "improvement" if better else "ok"
+        rows.append({"metric": name, "baseline": old["value"], "current": new["value"],
+                     "change": change, "status": status})
+    return rows
+
+
+def report_comparison(baseline, current, tolerance=DEFAULT_TOLERANCE):
+    """Print a comparison; returns the exit status (1 if anything regressed)"""
+    if baseline.get("params") != current.get("params"):
+        changed = sorted(
+            key for key in set(baseline.get("params", {})) | set(current.get("params", {}))
+            if baseline.get("params", {}).get(key) != current.get("params", {}).get(key)
+        )
+        print(f"⚠️ Parameters differ from the baseline: {', '.join(changed)}")
+    if baseline["meta"].get("platform") != current["meta"].get("platform"):
+        print("⚠️ Baseline was recorded on a different platform; timings may not be comparable")
+
+    rows = compare(baseline, current, tolerance)
+    marks = {"regression": "❌", "improvement": "🚀", "ok": "  ", "new": "➕", "missing": "➖"}
+    for row in rows:
+        if row["change"] is None:
+            print(f"{marks[row['status']]} {row['metric']}: {row['status']}")
+        else:
+            print(f"{marks[row['status']]} {row['metric']}: {row['baseline']:.4g} → "
+                  f"{row['current']:.4g} ({row['change']:+.1%})")
+
+    regressions = [row for row in rows if row["status"] == "regression"]
+    improvements = sum(1 for row in rows if row["status"] == "improvement")
+    print(f"🏁 {len(regressions)} regression(s), {improvements} improvement(s) "
+          f"at ±{tolerance:.0%} tolerance")
+    return 1 if regressions else 0
+
+
+def main(argv=None):
+    from ingest.pdf_Ingest import SPLITTER_CONFIG
+    from retrieval.retriever import DEFAULT_LEXICAL_WEIGHT
+    from retrieval.embeddings import DEFAULT_BATCH_SIZE
+
+    parser = argparse.ArgumentParser(description="KnowLens performance benchmarks")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="run the benchmarks and write JSON results")
+    run_parser.add_argument("--sizes", nargs="*", default=["small", "medium"], choices=list(SIZES),
+                            help="synthetic corpus sizes")
+    run_parser.add_argument("--docs", nargs="*", default=[], help="sample files or folders to benchmark too")
+    run_parser.add_argument("--out", default="benchmark_results.json", help="results JSON path")
+    run_parser.add_argument("--baseline", help="results JSON to compare against after the run")
+    run_parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                            help="fractional change counted as a regression")
+    run_parser.add_argument("--corpus-dir", help="where generated corpora are kept (default: temp dir)")
+    run_parser.add_argument("--seed", type=int, default=0)
+    run_parser.add_argument("--repeat", type=int, default=3,
+                            help="runs per parse/split/index measurement (median is kept)")
+    run_parser.add_argument("--chunk-size", type=int, default=SPLITTER_CONFIG["chunk_size"])
+    run_parser.add_argument("--chunk-overlap", type=int, default=SPLITTER_CONFIG["chunk_overlap"])
+    run_parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                            help="chunks per embedding call")
+    run_parser.add_argument("--embeddings", choices=["model", "fake"], default="model",
+                            help="'fake' skips the embedding model (embedding numbers are then meaningless)")
+    run_parser.add_argument("--index-type", default="flat", help="see retrieval.ann_index")
+    run_parser.add_argument("--k", type=int, default=3, help="chunks retrieved per question")
+    run_parser.add_argument("--lexical-weight", type=float, default=DEFAULT_LEXICAL_WEIGHT)
+    run_parser.add_argument("--queries", type=int, default=200, help="questions per query benchmark")
+    run_parser.add_argument("--e2e-queries", type=int, default=50, help="questions per end-to-end benchmark")
+    run_parser.add_argument("--llm-first-token-latency", type=float, default=0.0,
+                            help="simulated stub LLM time to first token (seconds)")
+    run_parser.add_argument("--llm-token-latency", type=float, default=0.0,
+                            help="simulated stub LLM time per token (seconds)")
+
+    compare_parser = commands.add_parser("compare", help="compare two results files")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+
+    args = parser.parse_args(argv)
+    if args.command == "compare":
+        return report_comparison(load_results(args.baseline), load_results(args.current), args.tolerance)
+    return run(args)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,157 @@
+"""
+Parallel batch ingestion: parse and split many files across a process pool.
+
+Usage:
+    python -m ingest.batch_Ingest docs/ manual.pdf --workers 8 --index
+"""
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from ingest.pdf_Ingest import load_document, ingest_config
+import argparse
+import json
+import time
+import os
+
+SUPPORTED_EXTENSIONS = ('.pdf', '.txt', '.doc', '.docx', '.csv')
+
+
+def collect_files(paths):
+    """Expand files and folders into a sorted list of supported files"""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, names in os.walk(path):
+                for name in names:
+                    if name.lower().endswith(SUPPORTED_EXTENSIONS):
+                        files.append(os.path.join(root, name))
+        else:
+            files.append(path)
+    return sorted(files)
+
+
+def _ingest_one(path, use_ocr):
+    # Runs in a worker process; never raises so one bad file cannot
+    # take the batch down
+    start = time.perf_counter()
+    try:
+        chunks = load_document(path, use_ocr=use_ocr)
+        error = None
+    except Exception as e:
+        chunks = None
+        error = f"{type(e).__name__}: {e}"
+    return {
+        "path": path,
+        "chunks": chunks,
+        "error": error,
+        "seconds": time.perf_counter() - start,
+    }
+
+
+def ingest_files(paths, max_workers=None, use_ocr=False, on_result=None):
+    """
+    Load and split many documents in parallel.
+
+    Args:
+        paths (list): document paths
+        max_workers (int): process count (defaults to CPU count)
+        use_ocr (bool): use OCR for PDFs
+        on_result (callable): called with each result as it completes
+
+    Returns:
+        list: one result dict per path, in input order, with keys
+        ``path``, ``chunks`` (list or None), ``error`` (str or None) and
+        ``seconds``
+    """
+    results = [None] * len(paths)
+    if not paths:
+        return results
+
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        futures = {
+            pool.submit(_ingest_one, path, use_ocr): i
+            for i, path in enumerate(paths)
+        }
+        for future in as_completed(futures):
+            i = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                # Worker crashed (e.g. killed by the OOM killer)
+                result = {
+                    "path": paths[i],
+                    "chunks": None,
+                    "error": f"{type(e).__name__}: {e}",
+                    "seconds": None,
+                }
+            results[i] = result
+            if on_result is not None:
+                on_result(result)
+    return results
+
+
+def index_results(results, use_ocr=False):
+    """Embed successful results into the knowledge-base store, one index per file"""
+    from retrieval.kb_store import open_or_build, fingerprint_file, index_stamp
+    from retrieval.retriever import create_vector_store
+
+    for result in results:
+        if not result["chunks"]:
+            continue
+        start = time.perf_counter()
+        open_or_build(
+            fingerprint_file(result["path"]),
+            index_stamp(ingest_config(use_ocr, result["path"])),
+            lambda: create_vector_store(result["chunks"]),
+            source=os.path.basename(result["path"]),
+        )
+        result["index_seconds"] = time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Parallel batch document ingestion")
+    parser.add_argument("paths", nargs="+", help="files or folders to ingest")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--ocr", action="store_true", help="use OCR for PDFs")
+    parser.add_argument("--index", action="store_true", help="embed and save each file to the knowledge-base store")
+    parser.add_argument("--report", help="write a JSON report of per-file timing to this path")
+    args = parser.parse_args(argv)
+
+    files = collect_files(args.paths)
+    print(f"📚 Ingesting {len(files)} file(s)")
+
+    start = time.perf_counter()
+    results = ingest_files(
+        files,
+        max_workers=args.workers,
+        use_ocr=args.ocr,
+        on_result=lambda r: print(
+            f"{'✅' if r['error'] is None else '❌'} {r['path']} "
+            f"({len(r['chunks']) if r['chunks'] else 0} chunks, {r['seconds'] or 0:.2f}s)"
+            + (f" {r['error']}" if r['error'] else "")
+        ),
+    )
+    if args.index:
+        index_results(results, use_ocr=args.ocr)
+    elapsed = time.perf_counter() - start
+
+    failed = [r for r in results if r["error"] is not None]
+    print(f"🏁 {len(results) - len(failed)} ok, {len(failed)} failed in {elapsed:.2f}s")
+
+    if args.report:
+        report = [
+            {
+                "path": r["path"],
+                "chunks": len(r["chunks"]) if r["chunks"] else 0,
+                "error": r["error"],
+                "seconds": r["seconds"],
+                "index_seconds": r.get("index_seconds"),
+            }
+            for r in results
+        ]
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump({"elapsed": elapsed, "files": report}, f, indent=2)
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,148 @@
+from langchain_core.document_loaders import BaseLoader
+from ingest.pdf_Engines import TieredPDFLoader
+from concurrent.futures import ProcessPoolExecutor
+from collections import deque
+import multiprocessing
+import os
+
+# Pages whose text layer has fewer characters than this are treated as scanned
+MIN_TEXT_CHARS = int(os.getenv("KNOWLENS_OCR_MIN_TEXT_CHARS", "20"))
+
+# Tesseract language(s), e.g. "eng+deu"
+OCR_LANGUAGE = os.getenv("KNOWLENS_OCR_LANG", "eng")
+
+
+def needs_ocr(page_text, page):
+    """True if a PDF page has no usable text layer but does carry images"""
+    if len(page_text.strip()) >= MIN_TEXT_CHARS:
+        return False
+    try:
+        return len(page.images) > 0
+    except Exception:
+        # Broken image streams: nothing to OCR either
+        return False
+
+
+def ocr_page(path, page_number, lang=OCR_LANGUAGE):
+    """
+    OCR the images of one PDF page.
+
+    Runs in a worker process, so it reopens the file itself; scanned pages
+    store the page as one or more embedded images, which are decoded with
+    Pillow and passed to Tesseract in reading order.
+
+    A page that cannot be OCR'd (Tesseract not installed, unreadable
+    image, ...) is logged and returns no text, as it did before OCR: one
+    bad page must not fail the whole document.
+
+    Returns:
+        str: recognized text
+    """
+    try:
+        import pytesseract
+        from pypdf import PdfReader
+
+        page = PdfReader(path).pages[page_number]
+        texts = []
+        for image in page.images:
+            text = pytesseract.image_to_string(image.image, lang=lang)
+            if text.strip():
+                texts.append(text.strip())
+        return "\n\n".join(texts)
+    except Exception as e:
+        print(f"⚠️ OCR failed for page {page_number + 1} of {os.path.basename(path)}: {e}")
+        return ""
+
+
+class SelectiveOCRLoader(BaseLoader):
+    """
+    PDF loader that OCRs only the pages without a text layer.
+
+    Every page is first read with the tiered text engines
+    (ingest.pdf_Engines). Pages with too little text but with
+    embedded images are sent to Tesseract in a process pool while the
+    remaining pages are read; pages are yielded in page order as soon as
+    they (and every page before them) are ready. OCR cost therefore scales
+    with the number of scanned pages, not the page count.
+
+    Args:
+        path (str): PDF file
+        max_workers (int): OCR processes (default: CPU count); inside a
+            worker process OCR runs inline instead of nesting pools
+        max_pending (int): scanned pages in flight before the reader waits
+        lang (str): Tesseract language(s)
+    """
+
+    def __init__(self, path, max_workers=None, max_pending=None, lang=OCR_LANGUAGE):
+        self.path = path
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_pending = max_pending or 2 * self.max_workers
+        self.lang = lang
+        self.stats = {"pages": 0, "ocr_pages": 0}
+
+    def lazy_load(self):
+        from pypdf import PdfReader
+
+        # pypdf is only needed to look for images on text-less pages
+        reader = PdfReader(self.path)
+        inline = (
+            self.max_workers <= 1
+            or multiprocessing.current_process().name != "MainProcess"
+        )
+        # Spawned, not forked: this runs in a pipeline thread of a process
+        # that already has other threads (Streamlit, torch, uvicorn)
+        pool = None if inline else ProcessPoolExecutor(
+            max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn")
+        )
+
+        # (Document, text or Future, ocr flag) in page order
+        pending = deque()
+        in_flight = 0
+
+        def ready():
+            nonlocal in_flight
+            document, text, ocr = pending.popleft()
+            if ocr and not isinstance(text, str):
+                in_flight -= 1
+                try:
+                    text = text.result()
+                except Exception as e:
+                    # The worker died (e.g. out of memory); skip the page
+                    print(f"⚠️ OCR failed for page {document.metadata['page'] + 1}: {e}")
+                    text = ""
+            document.page_content = text
+            document.metadata["ocr"] = ocr
+            return document
+
+        try:
+            for document in TieredPDFLoader(self.path).lazy_load():
+                page_number = document.metadata["page"]
+                text = document.page_content
+                self.stats["pages"] += 1
+                if needs_ocr(text, reader.pages[page_number]):
+                    self.stats["ocr_pages"] += 1
+                    if pool is None:
+                        text = ocr_page(self.path, page_number, self.lang)
+                    else:
+                        text = pool.submit(ocr_page, self.path, page_number, self.lang)
+                        in_flight += 1
+                    pending.append((document, text, True))
+                else:
+                    pending.append((document, text, False))
+
+                # Emit finished pages at the front; wait only when the pool is full
+                while pending and (
+                    not pending[0][2]
+                    or isinstance(pending[0][1], str)
+                    or pending[0][1].done()
+                    or in_flight >= self.max_pending
+                ):
+                    yield ready()
+
+            while pending:
+                yield ready()
+        finally:
+            if pool is not None:
+                pool.shutdown(cancel_futures=True)
+            if self.stats["ocr_pages"]:
+                print(f"🔍 OCR'd {self.stats['ocr_pages']} of {self.stats['pages']} page(s)")
@@ -0,0 +1,312 @@
+from langchain_core.document_loaders import BaseLoader
+from langchain_core.documents import Document
+import threading
+import time
+import io
+import os
+import re
+
+# Extraction engines tried per page, first to last. Unavailable engines
+# (not installed) are skipped. Reorder from measurements with
+# recommended_order().
+DEFAULT_ENGINE_ORDER = tuple(
+    name.strip()
+    for name in os.getenv("KNOWLENS_PDF_ENGINES", "pymupdf,pypdf,pdfminer").split(",")
+    if name.strip()
+)
+
+
+class PyMuPDFEngine:
+    """MuPDF via PyMuPDF (optional dependency); the fastest when installed"""
+
+    name = "pymupdf"
+
+    @staticmethod
+    def available():
+        try:
+            import fitz  # noqa: F401
+        except ImportError:
+            return False
+        return True
+
+    def open(self, path):
+        import fitz
+
+        self._doc = fitz.open(path)
+        return self._doc.page_count
+
+    def extract(self, page_number):
+        return self._doc[page_number].get_text()
+
+    def close(self):
+        self._doc.close()
+
+
+class PyPDFEngine:
+    """Pure-Python pypdf"""
+
+    name = "pypdf"
+
+    @staticmethod
+    def available():
+        return True
+
+    def open(self, path):
+        from pypdf import PdfReader
+
+        self._reader = PdfReader(path)
+        return len(self._reader.pages)
+
+    def page(self, page_number):
+        return self._reader.pages[page_number]
+
+    def extract(self, page_number):
+        return self._reader.pages[page_number].extract_text() or ""
+
+    def close(self):
+        self._reader = None
+
+
+class PDFMinerEngine:
+    """pdfminer.six: slow, but tolerant of unusual fonts and encodings"""
+
+    name = "pdfminer"
+
+    @staticmethod
+    def available():
+        return True
+
+    def open(self, path):
+        from pdfminer.layout import LAParams
+        from pdfminer.pdfdocument import PDFDocument
+        from pdfminer.pdfinterp import PDFResourceManager
+        from pdfminer.pdfpage import PDFPage
+        from pdfminer.pdfparser import PDFParser
+
+        # Parsed once: high_level.extract_text() re-opens and re-parses the
+        # whole file for every page it is asked for
+        self._file = open(path, "rb")
+        try:
+            self._pages = list(PDFPage.create_pages(PDFDocument(PDFParser(self._file))))
+        except Exception:
+            self._file.close()
+            raise
+        self._resources = PDFResourceManager(caching=True)
+        self._laparams = LAParams()
+        return len(self._pages)
+
+    def extract(self, page_number):
+        from pdfminer.converter import TextConverter
+        from pdfminer.pdfinterp import PDFPageInterpreter
+
+        output = io.StringIO()
+        converter = TextConverter(self._resources, output, laparams=self._laparams)
+        try:
+            PDFPageInterpreter(self._resources, converter).process_page(self._pages[page_number])
+        finally:
+            converter.close()
+        return output.getvalue()
+
+    def close(self):
+        self._pages = None
+        self._file.close()
+
+
+ENGINES = {
+    engine.name: engine
+    for engine in (PyMuPDFEngine, PyPDFEngine, PDFMinerEngine)
+}
+
+
+class EngineStats:
+    """
+    Process-wide extraction counters per engine.
+
+    ``seconds`` includes failed and empty attempts, so throughput reflects
+    the real cost of putting an engine first.
+    """
+
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def record(self, engine, seconds, chars=0, failed=False, empty=False):
+        with self._lock:
+            entry = self._data.setdefault(engine, {
+                "pages": 0, "chars": 0, "seconds": 0.0, "failures": 0, "empty": 0,
+            })
+            entry["seconds"] += seconds
+            if failed:
+                entry["failures"] += 1
+            elif empty:
+                entry["empty"] += 1
+            else:
+                entry["pages"] += 1
+                entry["chars"] += chars
+
+    def report(self):
+        """{engine: counters plus pages_per_second and chars_per_second}"""
+        with self._lock:
+            report = {}
+            for engine, entry in self._data.items():
+                seconds = entry["seconds"] or 1e-9
+                report[engine] = {
+                    **entry,
+                    "pages_per_second": entry["pages"] / seconds,
+                    "chars_per_second": entry["chars"] / seconds,
+                }
+            return report
+
+    def recommended_order(self, min_pages=20):
+        """
+        Engine order by measured throughput, fastest first.
+
+        Engines with fewer than ``min_pages`` successful pages keep their
+        place after the measured ones, in the default order.
+        """
+        report = self.report()
+        measured = sorted(
+            (name for name, entry in report.items() if entry["pages"] >= min_pages),
+            key=lambda name: report[name]["pages_per_second"],
+            reverse=True,
+        )
+        rest = [name for name in DEFAULT_ENGINE_ORDER if name not in measured]
+        return measured + rest
+
+    def reset(self):
+        with self._lock:
+            self._data.clear()
+
+
+_stats = EngineStats()
+
+
+def get_engine_stats():
+    """Return the process-wide engine statistics"""
+    return _stats
+
+
+# A "BT" (begin text) operator token in a content stream
+_TEXT_OBJECT_RE = re.compile(rb"(?<![^\s\]>)}])BT(?![^\s\[(<{/])")
+
+
+def has_text_operators(page, _depth=0):
+    """
+    True if a pypdf page (or a form XObject it draws) contains a text
+    object. Pages without one carry no text for any engine to find.
+    """
+    contents = page.get_contents() if _depth == 0 else page
+    if contents is not None and _TEXT_OBJECT_RE.search(contents.get_data()):
+        return True
+    resources = page.get("/Resources")
+    resources = resources.get_object() if resources is not None else {}
+    xobjects = resources.get("/XObject")
+    if xobjects is None or _depth >= 5:
+        return False
+    for xobject in xobjects.get_object().values():
+        xobject = xobject.get_object()
+        if xobject.get("/Subtype") == "/Form" and has_text_operators(xobject, _depth + 1):
+            return True
+    return False
+
+
+def available_engines(order=None):
+    """Engine names from ``order`` (default DEFAULT_ENGINE_ORDER) that can run here"""
+    names = order or DEFAULT_ENGINE_ORDER
+    return [name for name in names if name in ENGINES and ENGINES[name].available()]
+
+
+class TieredPDFLoader(BaseLoader):
+    """
+    PDF loader that falls back engine by engine, page by page.
+
+    Each page is extracted with the first engine in ``engines``; if that
+    raises or returns no text, the next engine is tried for that page only.
+    Engines are opened on first use, so fallbacks cost nothing for clean
+    documents. A page no engine can read is returned empty (it may be a
+    scanned image; see ingest.ocr_Ingest).
+
+    An empty page whose content has no text operators at all (a scanned
+    image) skips the fallbacks: no engine would find text there.
+
+    Args:
+        path (str): PDF file
+        engines (list): engine names in order (default: available_engines())
+        stats (EngineStats): where timings are recorded (default: process-wide)
+    """
+
+    def __init__(self, path, engines=None, stats=None):
+        self.path = path
+        self.engines = available_engines(engines)
+        if not self.engines:
+            raise ValueError(f"No PDF extraction engine available from {engines}")
+        self.stats = stats or get_engine_stats()
+
+    def _engine(self, opened, name):
+        """Open an engine on first use; None if it cannot read the file"""
+        if name not in opened:
+            engine = ENGINES[name]()
+            start = time.perf_counter()
+            try:
+                opened[name] = (engine, engine.open(self.path))
+            except Exception as e:
+                self.stats.record(name, time.perf_counter() - start, failed=True)
+                print(f"⚠️ {name} could not open {os.path.basename(self.path)}: {e}")
+                opened[name] = None
+        return opened[name]
+
+    def _has_text_operators(self, opened, page_number):
+        entry = self._engine(opened, "pypdf")
+        if entry is None:
+            return True
+        try:
+            return has_text_operators(entry[0].page(page_number))
+        except Exception:
+            # Unreadable content: let the other engines try
+            return True
+
+    def lazy_load(self):
+        opened = {}  # name -> (engine, page count) or None
+        try:
+            # Page count from the first engine that can open the file
+            total_pages = next(
+                (entry[1] for entry in (self._engine(opened, n) for n in self.engines) if entry),
+                None,
+            )
+            if total_pages is None:
+                raise ValueError(f"❌ No PDF engine could open {os.path.basename(self.path)}")
+
+            for page_number in range(total_pages):
+                text, used = "", None
+                for name in self.engines:
+                    entry = self._engine(opened, name)
+                    if entry is None:
+                        continue
+                    start = time.perf_counter()
+                    try:
+                        text = entry[0].extract(page_number) or ""
+                    except Exception:
+                        self.stats.record(name, time.perf_counter() - start, failed=True)
+                        continue
+                    seconds = time.perf_counter() - start
+                    if text.strip():
+                        self.stats.record(name, seconds, chars=len(text))
+                        used = name
+                        break
+                    self.stats.record(name, seconds, empty=True)
+                    if not self._has_text_operators(opened, page_number):
+                        break
+
+                yield Document(
+                    page_content=text,
+                    metadata={
+                        "source": self.path,
+                        "page": page_number,
+                        "total_pages": total_pages,
+                        "engine": used,
+                    },
+                )
+        finally:
+            for entry in opened.values():
+                if entry is not None:
+                    entry[0].close()
@@ -1,116 +1,170 @@
-from langchain_community.document_loaders import (
-    PyPDFLoader,
-    TextLoader,
-    UnstructuredWordDocumentLoader,
-    CSVLoader,
-    PDFMinerLoader,  # Alternative PDF loader
-    UnstructuredPDFLoader  # OCR-capable loader
-)
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-import gc
+from ingest.pdf_Engines import TieredPDFLoader
+from ingest.ocr_Ingest import SelectiveOCRLoader
+from ingest.csv_Ingest import RowBlockCSVLoader
+from telemetry import span
 import os
 
+# Chunking settings; part of the knowledge-base version stamp, so changing
+# them invalidates previously saved indexes
+SPLITTER_CONFIG = {
+    "chunk_size": 2000,
+    "chunk_overlap": 400,
+    "separators": ["\n\n", "\n", ". ", " ", ""],
+}
+
+
+def ingest_config(use_ocr=False, path=None):
+    """Settings that determine an index's contents, for its version stamp"""
+    config = dict(SPLITTER_CONFIG)
+    if use_ocr:
+        config["ocr"] = "selective"
+    if path is not None and os.path.splitext(path)[1].lower() == ".csv":
+        config["csv"] = "row-blocks"
+    return config
+
+
+# Default ceiling on the text buffered in one embedding batch (characters)
+DEFAULT_MAX_BATCH_CHARS = 4 * 1024 * 1024
+
+
+def get_loader(path, use_ocr=False):
+    """Select the appropriate loader based on file type"""
+    _, file_extension = os.path.splitext(path)
+    file_extension = file_extension.lower()
+
+    if file_extension == '.pdf':
+        # Extraction engines are tried per page (fastest first) while loading
+        if use_ocr:
+            # Only pages without a text layer are OCR'd
+            print(f"📄 Loading PDF with OCR for scanned pages: {os.path.basename(path)}")
+            return SelectiveOCRLoader(path)
+        print(f"📄 Loading PDF: {os.path.basename(path)}")
+        return TieredPDFLoader(path)
+
+    elif file_extension == '.txt':
+        from langchain_community.document_loaders import TextLoader
+
+        print(f"📝 Loading TXT: {os.path.basename(path)}")
+        return TextLoader(path, encoding='utf-8')
+
+    elif file_extension in ['.doc', '.docx']:
+        # unstructured is heavy; only Word uploads pay for it
+        from langchain_community.document_loaders import UnstructuredWordDocumentLoader
+
+        print(f"📋 Loading Word Document: {os.path.basename(path)}")
+        return UnstructuredWordDocumentLoader(path)
+
+    elif file_extension == '.csv':
+        # Rows grouped into header-prefixed blocks, not one Document per row
+        print(f"📊 Loading CSV: {os.path.basename(path)}")
+        return RowBlockCSVLoader(path, max_block_chars=SPLITTER_CONFIG["chunk_size"])
+
+    raise ValueError(f"Unsupported file format: {file_extension}. Supported formats: PDF, TXT, DOC, DOCX, CSV")
+
+
+def get_splitter():
+    """Text splitter configured from SPLITTER_CONFIG"""
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+    return RecursiveCharacterTextSplitter(
+        chunk_size=SPLITTER_CONFIG["chunk_size"],
+        chunk_overlap=SPLITTER_CONFIG["chunk_overlap"],
+        length_function=len,
+        separators=SPLITTER_CONFIG["separators"],
+        keep_separator=True
+    )
+
+
+def iter_document_chunks(path, use_ocr=False, on_progress=None):
+    """
+    Stream a document page by page and yield its chunks.
+
+    Only the current page and its chunks are held in memory; the loader's
+    ``lazy_load`` is used instead of materializing every page.
+
+    Args:
+        path (str): Path to the document file
+        use_ocr (bool): Use OCR for scanned PDFs
+        on_progress (callable): called as ``on_progress(pages, chars)`` after
+            each page with the running totals
+
+    Yields:
+        Document: text chunks in document order
+    """
+    loader = get_loader(path, use_ocr=use_ocr)
+    splitter = get_splitter()
+
+    pages = 0
+    total_chars = 0
+    for page in loader.lazy_load():
+        pages += 1
+        total_chars += len(page.page_content.strip())
+        if on_progress is not None:
+            on_progress(pages, total_chars)
+
+        # Pages were always split independently, so per-page splitting
+        # produces the same chunks as splitting the whole list at once
+        yield from splitter.split_documents([page])
+
+    print(f"✅ Loaded {pages} page(s), extracted {total_chars} characters")
+
+    if total_chars == 0:
+        raise ValueError(
+            "❌ No text extracted from the document. "
+            "This might be a scanned PDF (image-based). "
+            "Enable OCR for scanned pages or convert it to text format first."
+        )
+
+
+def iter_chunk_batches(path, batch_size=32, max_batch_chars=DEFAULT_MAX_BATCH_CHARS,
+                       use_ocr=False, on_progress=None):
+    """
+    Group streamed chunks into embedding batches under a memory ceiling.
+
+    A batch is flushed when it reaches ``batch_size`` chunks or when its
+    buffered text reaches ``max_batch_chars``, whichever comes first, so peak
+    memory is bounded by one page plus one batch regardless of document size.
+
+    Yields:
+        list: chunks for one embedding call
+    """
+    batch = []
+    batch_chars = 0
+    for chunk in iter_document_chunks(path, use_ocr=use_ocr, on_progress=on_progress):
+        batch.append(chunk)
+        batch_chars += len(chunk.page_content)
+        if len(batch) >= batch_size or batch_chars >= max_batch_chars:
+            yield batch
+            batch = []
+            batch_chars = 0
+    if batch:
+        yield batch
+
+
 def load_document(path, use_ocr=False):
     """
     Load and process documents of multiple formats: PDF, TXT, DOC, DOCX, CSV
-    
+
     Args:
         path (str): Path to the document file
         use_ocr (bool): Use OCR for scanned PDFs (slower but handles images)
-        
+
     Returns:
         list: List of document chunks
     """
     try:
-        # Get file extension
-        _, file_extension = os.path.splitext(path)
-        file_extension = file_extension.lower()
-        
-        # Select appropriate loader based on file type
-        if file_extension == '.pdf':
-            # Try multiple PDF loaders
-            if use_ocr:
-                print(f"📄 Loading PDF with OCR: {os.path.basename(path)}")
-                loader = UnstructuredPDFLoader(path)
-            else:
-                print(f"📄 Loading PDF: {os.path.basename(path)}")
-                try:
-                    loader = PyPDFLoader(path)
-                except Exception as e:
-                    print(f"⚠️ PyPDFLoader failed, trying PDFMiner...")
-                    loader = PDFMinerLoader(path)
-            
-        elif file_extension == '.txt':
-            loader = TextLoader(path, encoding='utf-8')
-            print(f"📝 Loading TXT: {os.path.basename(path)}")
-            
-        elif file_extension in ['.doc', '.docx']:
-            loader = UnstructuredWordDocumentLoader(path)
-            print(f"📋 Loading Word Document: {os.path.basename(path)}")
-            
-        elif file_extension == '.csv':
-            loader = CSVLoader(path, encoding='utf-8')
-            print(f"📊 Loading CSV: {os.path.basename(path)}")
-            
-        else:
-            raise ValueError(f"Unsupported file format: {file_extension}. Supported formats: PDF, TXT, DOC, DOCX, CSV")
-        
-        # Load documents
-        docs = loader.load()
-        print(f"✅ Loaded {len(docs)} page(s)")
-        
-        # Check if documents are empty
-        total_text = "".join([doc.page_content for doc in docs])
-        total_chars = len(total_text.strip())
-        
-        if total_chars == 0:
-            raise ValueError(
-                "❌ No text extracted from the document. "
-                "This might be a scanned PDF (image-based). "
-                "Try using OCR or convert it to text format first."
-            )
-        
-        print(f"📝 Extracted {total_chars} characters")
-        
-        # Configure text splitter with more lenient settings
-        splitter = RecursiveCharacterTextSplitter(
-            chunk_size=2000,
-            chunk_overlap=400,
-            length_function=len,
-            separators=["\n\n", "\n", ". ", " ", ""],
-            keep_separator=True
-        )
-        
-        # Split documents into chunks
-        chunks = splitter.split_documents(docs)
-        
-        # If still no chunks, create at least one from the full text
-        if len(chunks) == 0 and total_chars > 0:
-            print("⚠️ No chunks created with default settings, using full text as single chunk")
-            from langchain.schema import Document
-            chunks = [Document(page_content=total_text[:5000], metadata={"source": path})]
-        
+        with span("load", path=os.path.basename(path), ocr=use_ocr) as load_span:
+            chunks = list(iter_document_chunks(path, use_ocr=use_ocr))
+            load_span.set(chunks=len(chunks))
         print(f"✅ Created {len(chunks)} chunks")
-        
-        # Cleanup
-        del loader
-        del docs
-        gc.collect()
-        
         return chunks
-        
+
     except Exception as e:
         print(f"❌ Error loading document: {e}")
         raise
-        
-    finally:
-        # Ensure garbage collection
-        gc.collect()
 
 
 # Alias for backward compatibility
 def load_pdf(path, use_ocr=False):
     """Backward compatible function - calls load_document"""
     return load_document(path, use_ocr=use_ocr)
-
-
@@ -0,0 +1,229 @@
+from ingest.pdf_Ingest import get_loader, get_splitter
+from telemetry import record_span
+import threading
+import queue
+import time
+
+# Marks the end of a stage's output
+_DONE = object()
+
+
+class PipelineStats:
+    """Busy time per stage plus wall-clock time for one pipelined ingest"""
+
+    def __init__(self):
+        self.pages = 0
+        self.chars = 0
+        self.chunks = 0
+        self.batches = 0
+        self.busy = {"parse": 0.0, "split": 0.0, "embed": 0.0, "index": 0.0}
+        self.wall = 0.0
+        self._lock = threading.Lock()
+
+    def add_busy(self, stage, seconds):
+        with self._lock:
+            self.busy[stage] += seconds
+
+    def as_dict(self):
+        return {
+            "pages": self.pages,
+            "chars": self.chars,
+            "chunks": self.chunks,
+            "batches": self.batches,
+            "busy": dict(self.busy),
+            "wall": self.wall,
+        }
+
+
+def pipelined_ingest(path, embeddings=None, use_ocr=False, embed_batch_size=32,
+                     split_workers=1, embed_workers=1, queue_size=8, source_name=None,
+                     stats=None):
+    """
+    Parse, split, embed and index a document as overlapping stages.
+
+    One thread parses pages with the loader's ``lazy_load``, ``split_workers``
+    threads split them, a batcher groups chunks into ``embed_batch_size``
+    batches, ``embed_workers`` threads embed them and the calling thread adds
+    the vectors to a FAISS index. Stages are connected by queues bounded by
+    ``queue_size`` items, so early pages are embedded while later pages are
+    still being parsed and memory stays bounded.
+
+    Note that the shared embedding model serializes encode calls, so more
+    than one embed worker only helps with non-model work (cache lookups).
+
+    Args:
+        path (str): Path to the document file
+        embeddings (Embeddings): defaults to the cached shared model
+        use_ocr (bool): Use OCR for scanned PDFs
+        embed_batch_size (int): chunks per embedding call
+        split_workers (int): splitter threads
+        embed_workers (int): embedding threads
+        queue_size (int): capacity of each inter-stage queue
+        source_name (str): overrides the ``source`` metadata of every chunk
+        stats (PipelineStats): filled in with per-stage timings
+
+    Returns:
+        FAISS: vector store over the document's chunks
+    """
+    from langchain_community.vectorstores import FAISS
+    from retrieval.embedding_cache import get_cached_embeddings
+    from retrieval.bm25 import BM25Index, attach_bm25
+
+    embeddings = embeddings or get_cached_embeddings()
+    stats = stats or PipelineStats()
+    start = time.perf_counter()
+
+    page_q = queue.Queue(maxsize=queue_size)
+    chunk_q = queue.Queue(maxsize=queue_size)
+    batch_q = queue.Queue(maxsize=queue_size)
+    vector_q = queue.Queue(maxsize=queue_size)
+    errors = []
+    stop = threading.Event()
+
+    def put(q, item):
+        # Give up instead of blocking forever once another stage has failed
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def get(q):
+        while not stop.is_set():
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return _DONE
+
+    def guarded(stage_fn):
+        def run():
+            try:
+                stage_fn()
+            except Exception as e:
+                errors.append(e)
+                stop.set()
+        return run
+
+    def parse():
+        loader = get_loader(path, use_ocr=use_ocr)
+        pages = loader.lazy_load()
+        while True:
+            t = time.perf_counter()
+            page = next(pages, None)
+            stats.add_busy("parse", time.perf_counter() - t)
+            if page is None:
+                break
+            stats.pages += 1
+            stats.chars += len(page.page_content.strip())
+            if not put(page_q, page):
+                return
+        for _ in range(split_workers):
+            put(page_q, _DONE)
+
+    def split():
+        splitter = get_splitter()
+        while True:
+            page = get(page_q)
+            if page is _DONE:
+                put(chunk_q, _DONE)
+                return
+            t = time.perf_counter()
+            chunks = splitter.split_documents([page])
+            if source_name is not None:
+                for chunk in chunks:
+                    chunk.metadata["source"] = source_name
+            stats.add_busy("split", time.perf_counter() - t)
+            if chunks and not put(chunk_q, chunks):
+                return
+
+    def batch():
+        pending = []
+        finished = 0
+        while finished < split_workers:
+            chunks = get(chunk_q)
+            if chunks is _DONE:
+                if stop.is_set():
+                    return
+                finished += 1
+                continue
+            pending.extend(chunks)
+            while len(pending) >= embed_batch_size:
+                if not put(batch_q, pending[:embed_batch_size]):
+                    return
+                pending = pending[embed_batch_size:]
+        if pending:
+            put(batch_q, pending)
+        for _ in range(embed_workers):
+            put(batch_q, _DONE)
+
+    def embed():
+        while True:
+            chunks = get(batch_q)
+            if chunks is _DONE:
+                put(vector_q, _DONE)
+                return
+            t = time.perf_counter()
+            vectors = embeddings.embed_documents([c.page_content for c in chunks])
+            stats.add_busy("embed", time.perf_counter() - t)
+            if not put(vector_q, (chunks, vectors)):
+                return
+
+    threads = [threading.Thread(target=guarded(parse), daemon=True)]
+    threads += [threading.Thread(target=guarded(split), daemon=True) for _ in range(split_workers)]
+    threads += [threading.Thread(target=guarded(batch), daemon=True)]
+    threads += [threading.Thread(target=guarded(embed), daemon=True) for _ in range(embed_workers)]
+    for thread in threads:
+        thread.start()
+
+    # Index stage runs here: FAISS needs a single writer
+    vector_store = None
+    bm25 = BM25Index()
+    finished = 0
+    try:
+        while finished < embed_workers:
+            item = get(vector_q)
+            if item is _DONE:
+                if stop.is_set():
+                    break
+                finished += 1
+                continue
+            chunks, vectors = item
+            t = time.perf_counter()
+            text_embeddings = [(c.page_content, v) for c, v in zip(chunks, vectors)]
+            metadatas = [c.metadata for c in chunks]
+            if vector_store is None:
+                vector_store = FAISS.from_embeddings(text_embeddings, embeddings, metadatas=metadatas)
+                ids = list(vector_store.index_to_docstore_id.values())
+            else:
+                ids = vector_store.add_embeddings(text_embeddings, metadatas=metadatas)
+            # Lexical index built alongside the dense one
+            bm25.add(ids, [c.page_content for c in chunks])
+            stats.add_busy("index", time.perf_counter() - t)
+            stats.chunks += len(chunks)
+            stats.batches += 1
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+    stats.wall = time.perf_counter() - start
+    if errors:
+        raise errors[0]
+    if vector_store is None or stats.chars == 0:
+        raise ValueError(
+            "❌ No text extracted from the document. "
+            "This might be a scanned PDF (image-based). "
+            "Enable OCR for scanned pages or convert it to text format first."
+        )
+
+    attach_bm25(vector_store, bm25)
+    ingest_span = record_span("ingest", stats.wall, pages=stats.pages, chars=stats.chars,
+                              chunks=stats.chunks, batches=stats.batches)
+    # Stages overlap, so these are busy times rather than intervals
+    for stage, seconds in stats.busy.items():
+        record_span(stage, seconds, parent=ingest_span, busy=True)
+    print(f"✅ Indexed {stats.chunks} chunks from {stats.pages} page(s) in {stats.wall:.2f}s")
+    return vector_store
@@ -0,0 +1,604 @@
+from ingest.web_Ingestion import SPLITTER_CONFIG
+from langchain_core.documents import Document
+from urllib.parse import urljoin, urldefrag, urlparse
+from urllib.robotparser import RobotFileParser
+from telemetry import span
+import asyncio
+import copy
+import hashlib
+import time
+
+USER_AGENT = "KnowLensBot/1.0 (+https://github.com/Rajat2774/Document-Grounded-Q-A-System)"
+
+DEFAULT_MAX_DEPTH = 2
+DEFAULT_MAX_PAGES = 50
+DEFAULT_CONCURRENCY = 8
+DEFAULT_PER_HOST = 4
+DEFAULT_TIMEOUT = 20
+
+_HTML_TYPES = ("text/html", "application/xhtml+xml")
+
+
+class CrawlStats:
+    """Counters for one crawl"""
+
+    def __init__(self):
+        self.fetched = 0
+        self.not_modified = 0  # answered 304 to a conditional request
+        self.skipped = 0       # non-HTML, robots.txt disallowed, empty, or redirected away
+        self.disallowed = 0    # of which robots.txt disallowed
+        self.gone = 0          # 404 / 410
+        self.errors = 0
+        self.dropped = 0       # URLs left unvisited once max_pages was reached
+        self.bytes = 0
+        self.chunks = 0
+        self.wall = 0.0
+        self.failures = {}     # url -> error message
+
+    def as_dict(self):
+        return {
+            "fetched": self.fetched,
+            "not_modified": self.not_modified,
+            "skipped": self.skipped,
+            "disallowed": self.disallowed,
+            "gone": self.gone,
+            "errors": self.errors,
+            "dropped": self.dropped,
+            "bytes": self.bytes,
+            "chunks": self.chunks,
+            "wall": self.wall,
+        }
+
+
+def normalize_url(url):
+    """Absolute URL without fragment or trailing slash, for de-duplication"""
+    url, _ = urldefrag(url.strip())
+    parsed = urlparse(url)
+    path = parsed.path.rstrip("/") or "/"
+    return parsed._replace(scheme=parsed.scheme.lower(), netloc=parsed.netloc.lower(), path=path).geturl()
+
+
+def _in_scope(url, root, same_domain):
+    parsed = urlparse(url)
+    if parsed.scheme not in ("http", "https"):
+        return False
+    if not same_domain:
+        return True
+    # Subdomains of the start host are in scope (docs.example.com -> example.com/...)
+    host, root_host = parsed.hostname or "", urlparse(root).hostname or ""
+    return host == root_host or host.endswith("." + root_host)
+
+
+def content_hash(text):
+    """Hash of a page's extracted text; markup-only changes don't count"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def parse_html(html, url):
+    """
+    Visible text, title and outgoing links of an HTML page.
+
+    Returns:
+        tuple: (text, title, links)
+    """
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, "html.parser")
+    links = []
+    for anchor in soup.find_all("a", href=True):
+        links.append(urljoin(url, anchor["href"]))
+    for tag in soup(["script", "style", "noscript", "template"]):
+        tag.decompose()
+    title = soup.title.get_text(strip=True) if soup.title else ""
+    text = soup.get_text(separator="\n", strip=True)
+    return text, title, links
+
+
+class WebCrawler:
+    """
+    Breadth-first asyncio crawler for a documentation site.
+
+    A single ``aiohttp.ClientSession`` (and its connection pool) is reused
+    for every request. At most ``concurrency`` fetches run at once and at
+    most ``per_host`` against any single host. robots.txt is fetched once
+    per host and honoured for ``USER_AGENT``.
+
+    Args:
+        start_url (str): where to start
+        max_depth (int): link hops from the start page (0 = start page only)
+        max_pages (int): stop after this many fetched pages
+        same_domain (bool): only follow links on the start host and its subdomains
+        respect_robots (bool): skip URLs disallowed by robots.txt
+        concurrency (int): total concurrent requests
+        per_host (int): concurrent requests per host
+        timeout (float): per-request timeout in seconds
+        known (dict): url -> ``{"etag", "last_modified", "links"}`` from a
+            previous crawl; those pages are requested conditionally, and a
+            304 or a failed fetch follows the stored links
+    """
+
+    def __init__(self, start_url, max_depth=DEFAULT_MAX_DEPTH, max_pages=DEFAULT_MAX_PAGES,
+                 same_domain=True, respect_robots=True, concurrency=DEFAULT_CONCURRENCY,
+                 per_host=DEFAULT_PER_HOST, timeout=DEFAULT_TIMEOUT, stats=None, known=None):
+        self.start_url = normalize_url(start_url)
+        self.max_depth = max_depth
+        self.max_pages = max_pages
+        self.same_domain = same_domain
+        self.respect_robots = respect_robots
+        self.concurrency = concurrency
+        self.per_host = per_host
+        self.timeout = timeout
+        self.stats = stats or CrawlStats()
+        self.known = known or {}
+        self._robots = {}       # host -> RobotFileParser or None (allow all)
+        self._robots_locks = {}
+        self._host_limits = {}
+
+    def _host_limit(self, host):
+        if host not in self._host_limits:
+            self._host_limits[host] = asyncio.Semaphore(self.per_host)
+        return self._host_limits[host]
+
+    async def _allowed(self, session, url):
+        if not self.respect_robots:
+            return True
+        parsed = urlparse(url)
+        host = parsed.netloc
+        lock = self._robots_locks.setdefault(host, asyncio.Lock())
+        async with lock:
+            if host not in self._robots:
+                self._robots[host] = await self._fetch_robots(
+                    session, f"{parsed.scheme}://{host}/robots.txt"
+                )
+        parser = self._robots[host]
+        return parser is None or parser.can_fetch(USER_AGENT, url)
+
+    async def _fetch_robots(self, session, robots_url):
+        import aiohttp
+
+        try:
+            async with session.get(robots_url) as response:
+                if response.status >= 400:
+                    # No robots.txt (or unreadable): everything is allowed
+                    return None
+                body = await response.text(errors="replace")
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            return None
+        parser = RobotFileParser(robots_url)
+        parser.parse(body.splitlines())
+        return parser
+
+    async def _fetch(self, session, url):
+        """
+        Fetch one page.
+
+        Returns:
+            dict: ``{"status": "ok" | "not_modified" | "skipped" | "gone",
+            ...}``; "ok" and "not_modified" results carry ``final_url``
+            (after redirects), "ok" results also ``html``, ``etag`` and
+            ``last_modified``
+        """
+        headers = {}
+        previous = self.known.get(url)
+        if previous:
+            if previous.get("etag"):
+                headers["If-None-Match"] = previous["etag"]
+            if previous.get("last_modified"):
+                headers["If-Modified-Since"] = previous["last_modified"]
+
+        async with self._host_limit(urlparse(url).netloc):
+            async with session.get(url, headers=headers) as response:
+                if response.status == 304 and previous:
+                    return {"status": "not_modified", "final_url": str(response.url)}
+                if response.status in (404, 410):
+                    return {"status": "gone"}
+                response.raise_for_status()
+                content_type = response.headers.get("Content-Type", "")
+                if not content_type.startswith(_HTML_TYPES):
+                    return {"status": "skipped"}
+                body = await response.read()
+                self.stats.bytes += len(body)
+                charset = response.charset or "utf-8"
+                return {
+                    "status": "ok",
+                    "final_url": str(response.url),
+                    "html": body.decode(charset, errors="replace"),
+                    "etag": response.headers.get("ETag"),
+                    "last_modified": response.headers.get("Last-Modified"),
+                }
+
+    async def results(self):
+        """
+        Crawl and yield one result per visited URL as soon as it is known.
+
+        Each result is ``{"url", "status", "depth"}`` where status is one of
+        "ok", "not_modified", "gone", "skipped" or "error". "ok" results add
+        ``document`` (metadata: ``source``, ``title``, ``depth``), ``etag``,
+        ``last_modified``, ``hash`` and ``links``.
+        """
+        import aiohttp
+
+        start = time.perf_counter()
+        seen = {self.start_url}
+        # Where the site really is: the start page's final URL once a
+        # redirect of it is seen (www -> apex, http -> https elsewhere)
+        scope_root = [self.start_url]
+        frontier = asyncio.Queue()
+        frontier.put_nowait((self.start_url, 0))
+        results = asyncio.Queue()
+        # Budget of pages still allowed to be fetched
+        budget = [self.max_pages]
+
+        connector = aiohttp.TCPConnector(limit=self.concurrency, limit_per_host=self.per_host)
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+        headers = {"User-Agent": USER_AGENT}
+
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout, headers=headers) as session:
+
+            def follow(links, depth):
+                if depth >= self.max_depth:
+                    return
+                for link in links:
+                    link = normalize_url(link)
+                    if link not in seen and _in_scope(link, scope_root[0], self.same_domain):
+                        seen.add(link)
+                        frontier.put_nowait((link, depth + 1))
+
+            async def visit(url, depth):
+                try:
+                    return await fetch_page(url, depth)
+                except Exception as e:
+                    # Network errors, but also anything a malformed page
+                    # raises (an unknown charset, markup the parser rejects):
+                    # a worker that dies here would leave the crawl hanging
+                    self.stats.errors += 1
+                    self.stats.failures[url] = str(e) or type(e).__name__
+                    # A transient failure must not cut off the pages behind it
+                    follow(self.known.get(url, {}).get("links", []), depth)
+                    return {"url": url, "status": "error", "depth": depth}
+
+            async def fetch_page(url, depth):
+                if not await self._allowed(session, url):
+                    self.stats.skipped += 1
+                    self.stats.disallowed += 1
+                    return {"url": url, "status": "skipped", "depth": depth}
+                result = await self._fetch(session, url)
+                result.update(url=url, depth=depth)
+                if url == self.start_url and "final_url" in result:
+                    # The site lives where the start page ends up
+                    scope_root[0] = normalize_url(result["final_url"])
+                    seen.add(scope_root[0])
+
+                if result["status"] == "not_modified":
+                    self.stats.not_modified += 1
+                    follow(self.known[url].get("links", []), depth)
+                elif result["status"] == "gone":
+                    self.stats.gone += 1
+                elif result["status"] == "skipped":
+                    self.stats.skipped += 1
+                else:
+                    final_url = normalize_url(result["final_url"])
+                    if final_url != url and url != self.start_url:
+                        # Redirected: the target must be in scope too, and
+                        # is indexed once however many URLs lead to it
+                        if final_url in seen or not _in_scope(final_url, scope_root[0], self.same_domain):
+                            self.stats.skipped += 1
+                            return {"url": url, "status": "skipped", "depth": depth}
+                        seen.add(final_url)
+                    html = result.pop("html")
+                    text, title, links = parse_html(html, result["final_url"])
+                    self.stats.fetched += 1
+                    links = [normalize_url(link) for link in links]
+                    follow(links, depth)
+                    if not text:
+                        self.stats.skipped += 1
+                        result["status"] = "skipped"
+                        return result
+                    result["links"] = sorted(set(links))
+                    result["hash"] = content_hash(text)
+                    result["document"] = Document(
+                        page_content=text,
+                        metadata={"source": result.pop("final_url"), "title": title, "depth": depth},
+                    )
+                return result
+
+            async def worker():
+                while True:
+                    url, depth = await frontier.get()
+                    try:
+                        if budget[0] <= 0:
+                            self.stats.dropped += 1
+                            continue
+                        budget[0] -= 1
+                        await results.put(await visit(url, depth))
+                    finally:
+                        frontier.task_done()
+
+            workers = [asyncio.create_task(worker()) for _ in range(self.concurrency)]
+            done = asyncio.create_task(frontier.join())
+            try:
+                while True:
+                    getter = asyncio.create_task(results.get())
+                    finished, _ = await asyncio.wait({getter, done}, return_when=asyncio.FIRST_COMPLETED)
+                    if getter in finished:
+                        yield getter.result()
+                        continue
+                    getter.cancel()
+                    while not results.empty():
+                        yield results.get_nowait()
+                    break
+            finally:
+                done.cancel()
+                for task in workers:
+                    task.cancel()
+                await asyncio.gather(*workers, done, return_exceptions=True)
+                self.stats.wall = time.perf_counter() - start
+
+    async def pages(self):
+        """Crawl and yield each fetched page as a Document"""
+        async for result in self.results():
+            if result["status"] == "ok":
+                yield result["document"]
+
+
+class _StoreWriter:
+    """Embeds chunk batches off the event loop and appends them to a FAISS store"""
+
+    def __init__(self, embeddings, vector_store=None):
+        from retrieval.bm25 import BM25Index, get_bm25
+
+        self.embeddings = embeddings
+        self.vector_store = vector_store
+        self.bm25 = get_bm25(vector_store) if vector_store is not None else BM25Index()
+
+    async def add(self, chunks):
+        from langchain_community.vectorstores import FAISS
+
+        with span("embed", chunks=len(chunks)):
+            vectors = await asyncio.to_thread(
+                self.embeddings.embed_documents, [c.page_content for c in chunks]
+            )
+        with span("index", chunks=len(chunks)):
+            text_embeddings = [(c.page_content, v) for c, v in zip(chunks, vectors)]
+            metadatas = [c.metadata for c in chunks]
+            if self.vector_store is None:
+                self.vector_store = FAISS.from_embeddings(text_embeddings, self.embeddings, metadatas=metadatas)
+                ids = list(self.vector_store.index_to_docstore_id.values())
+            else:
+                ids = self.vector_store.add_embeddings(text_embeddings, metadatas=metadatas)
+            self.bm25.add(ids, [c.page_content for c in chunks])
+        return ids
+
+    def remove(self, ids):
+        from retrieval.ann_index import delete_from_store
+
+        if ids:
+            delete_from_store(self.vector_store, ids)
+            self.bm25.remove(ids)
+
+
+class _PageBatcher:
+    """Groups the chunks of many pages into embedding batches, tracking ids per page"""
+
+    def __init__(self, writer, batch_size, stats):
+        self.writer = writer
+        self.batch_size = batch_size
+        self.stats = stats
+        self.pending = []  # (page url, chunk)
+        self.ids = {}      # page url -> docstore ids
+
+    async def add(self, url, chunks):
+        self.ids.setdefault(url, [])
+        self.pending.extend((url, chunk) for chunk in chunks)
+        while len(self.pending) >= self.batch_size:
+            await self._flush(self.batch_size)
+
+    async def close(self):
+        if self.pending:
+            await self._flush(len(self.pending))
+
+    async def _flush(self, size):
+        batch, self.pending = self.pending[:size], self.pending[size:]
+        ids = await self.writer.add([chunk for _, chunk in batch])
+        for (url, _), doc_id in zip(batch, ids):
+            self.ids[url].append(doc_id)
+        self.stats.chunks += len(batch)
+
+
+def _get_splitter():
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+    return RecursiveCharacterTextSplitter(
+        chunk_size=SPLITTER_CONFIG["chunk_size"],
+        chunk_overlap=SPLITTER_CONFIG["chunk_overlap"]
+    )
+
+
+def _page_state(result):
+    return {
+        "etag": result.get("etag"),
+        "last_modified": result.get("last_modified"),
+        "hash": result["hash"],
+        "links": result["links"],
+        "ids": [],
+    }
+
+
+async def acrawl_website(url, embeddings=None, embed_batch_size=32, stats=None, on_page=None,
+                         **crawler_params):
+    """
+    Crawl a site and index it, chunking and embedding pages as they arrive.
+
+    Embedding runs in a worker thread, so fetching continues while earlier
+    pages are embedded. ``crawler_params`` are passed to WebCrawler.
+
+    The returned store carries a source state (retrieval.kb_store) with the
+    crawl settings and, per page, its ETag / Last-Modified, content hash,
+    links and chunk ids, so ``arefresh_website`` can update it incrementally.
+
+    Returns:
+        FAISS: vector store over every crawled page
+    """
+    from retrieval.embedding_cache import get_cached_embeddings
+    from retrieval.bm25 import attach_bm25
+    from retrieval.kb_store import set_source_state
+
+    embeddings = embeddings or get_cached_embeddings()
+    stats = stats or CrawlStats()
+    splitter = _get_splitter()
+
+    writer = _StoreWriter(embeddings)
+    batcher = _PageBatcher(writer, embed_batch_size, stats)
+    crawler = WebCrawler(url, stats=stats, **crawler_params)
+    pages = {}
+
+    async for result in crawler.results():
+        if result["status"] != "ok":
+            continue
+        page = result["document"]
+        if on_page is not None:
+            on_page(page)
+        pages[result["url"]] = _page_state(result)
+        await batcher.add(result["url"], splitter.split_documents([page]))
+    await batcher.close()
+
+    if writer.vector_store is None:
+        raise ValueError(f"❌ No text could be fetched from {url}")
+    for page_url, ids in batcher.ids.items():
+        pages[page_url]["ids"] = ids
+
+    attach_bm25(writer.vector_store, writer.bm25)
+    set_source_state(writer.vector_store, {
+        "url": url,
+        "crawler": {
+            "max_depth": crawler.max_depth,
+            "max_pages": crawler.max_pages,
+            "same_domain": crawler.same_domain,
+        },
+        "pages": pages,
+    })
+    print(f"✅ Crawled {stats.fetched} page(s), {stats.chunks} chunks in {stats.wall:.2f}s")
+    return writer.vector_store
+
+
+async def arefresh_website(vector_store, embeddings=None, embed_batch_size=32, stats=None,
+                           **crawler_params):
+    """
+    Bring a crawled site's vector store up to date in place.
+
+    Known pages are requested with If-None-Match / If-Modified-Since. Pages
+    answering 304, or whose extracted text hashes the same, keep their
+    chunks; changed pages are re-split and re-embedded; new pages are added;
+    pages that are gone (404/410) are removed. Pages that fail with other
+    errors are kept as they were, and their stored links are still followed.
+
+    Known pages the crawl no longer reached are removed only after a
+    complete crawl: one without fetch errors, robots.txt skips or URLs left
+    over when ``max_pages`` ran out. Otherwise they may just have been cut
+    off, so they are kept.
+
+    New chunks are embedded into a separate store while the crawl runs and
+    the store is only changed once everything succeeded, so a failed
+    refresh (an error while embedding, no pages left) leaves it as it was.
+
+    Returns:
+        dict: counts of ``unchanged``, ``changed``, ``added`` and ``removed``
+        pages
+    """
+    from retrieval.embedding_cache import get_cached_embeddings
+    from retrieval.kb_store import source_state, set_source_state
+
+    state = source_state(vector_store)
+    if state is None or "pages" not in state:
+        raise ValueError("Vector store was not built by the web crawler; rebuild it instead")
+
+    embeddings = embeddings or get_cached_embeddings()
+    stats = stats or CrawlStats()
+    splitter = _get_splitter()
+    known = state["pages"]
+    pages = copy.deepcopy(known)
+
+    # Changed and new pages go to a store of their own until the end
+    added = _StoreWriter(embeddings)
+    batcher = _PageBatcher(added, embed_batch_size, stats)
+    crawler = WebCrawler(state["url"], stats=stats, known=known,
+                         **{**state["crawler"], **crawler_params})
+
+    report = {"unchanged": 0, "changed": 0, "added": 0, "removed": 0}
+    keep, gone = set(), set()
+    stale_ids = []
+    async for result in crawler.results():
+        url, status = result["url"], result["status"]
+        if status == "gone":
+            gone.add(url)
+            continue
+        if status in ("not_modified", "error") and url in pages:
+            keep.add(url)
+            report["unchanged"] += status == "not_modified"
+            continue
+        if status != "ok":
+            continue
+
+        keep.add(url)
+        previous = pages.get(url)
+        if previous is not None and previous["hash"] == result["hash"]:
+            # Same text, new validators (e.g. a server without ETags)
+            previous.update(etag=result.get("etag"), last_modified=result.get("last_modified"),
+                            links=result["links"])
+            report["unchanged"] += 1
+            continue
+
+        if previous is not None:
+            stale_ids.extend(previous["ids"])
+            report["changed"] += 1
+        else:
+            report["added"] += 1
+        pages[url] = _page_state(result)
+        await batcher.add(url, splitter.split_documents([result["document"]]))
+    await batcher.close()
+
+    for url, ids in batcher.ids.items():
+        pages[url]["ids"] = ids
+    complete = not (stats.errors or stats.disallowed or stats.dropped)
+    for url in [u for u in pages if u in gone or (complete and u not in keep)]:
+        stale_ids.extend(pages.pop(url)["ids"])
+        report["removed"] += 1
+    if not pages:
+        raise ValueError(f"❌ No pages left at {state['url']}")
+
+    # Everything succeeded: apply the changes to the store
+    writer = _StoreWriter(embeddings, vector_store)
+    writer.remove(stale_ids)
+    if added.vector_store is not None:
+        writer.bm25.merge(added.bm25)
+        vector_store.merge_from(added.vector_store)
+    set_source_state(vector_store, {**state, "pages": pages})
+    print(f"🔄 Refreshed {state['url']}: {report}")
+    return report
+
+
+def _crawl_counters(stats):
+    return {key: value for key, value in stats.as_dict().items() if key != "wall"}
+
+
+def crawl_website(url, **params):
+    """Blocking wrapper around acrawl_website, for Streamlit and scripts"""
+    stats = params.setdefault("stats", CrawlStats())
+    with span("crawl", url=url) as crawl_span:
+        vector_store = asyncio.run(acrawl_website(url, **params))
+        crawl_span.set(**_crawl_counters(stats))
+    return vector_store
+
+
+def refresh_website(vector_store, **params):
+    """
+    Blocking wrapper around arefresh_website.
+
+    Returns:
+        bool: True if the store changed
+    """
+    stats = params.setdefault("stats", CrawlStats())
+    with span("refresh") as refresh_span:
+        report = asyncio.run(arefresh_website(vector_store, **params))
+        refresh_span.set(**_crawl_counters(stats))
+    return bool(report["changed"] or report["added"] or report["removed"])
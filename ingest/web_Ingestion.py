@@ -1,13 +1,19 @@
-from langchain_community.document_loaders import WebBaseLoader
-from langchain_text_splitters import RecursiveCharacterTextSplitter
+# Chunking settings; part of the knowledge-base version stamp
+SPLITTER_CONFIG = {
+    "chunk_size": 2000,
+    "chunk_overlap": 400,
+}
 
 def load_website(url):
+    from langchain_community.document_loaders import WebBaseLoader
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+
     loader = WebBaseLoader(url)
     docs = loader.load()
 
     splitter = RecursiveCharacterTextSplitter(
-        chunk_size=2000,
-        chunk_overlap=400
+        chunk_size=SPLITTER_CONFIG["chunk_size"],
+        chunk_overlap=SPLITTER_CONFIG["chunk_overlap"]
     )
 
     return splitter.split_documents(docs)
@@ -1,10 +1,10 @@
 # pages/1_PDF_QA.py
 import streamlit as st
-from ingest.pdf_Ingest import load_pdf
-from retrieval.retriever import create_vector_store
-from retrieval.qa_chain import build_qa_chain
-from utils import format_sources
-import os
+from service.client import new_knowledge_base
+from service.warmup import start_warmup
+from utils import timing_breakdown
+import shutil
+import uuid
 
 st.set_page_config(
     page_title="PDF Q&A",
@@ -114,30 +114,41 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 pdf_keys = [
-    "web_docs",
-    "web_vector_store",
-    "web_qa_chain",
-    "web_retriever",
-    "web_current_file",
+    "web_kb",
     "web_question",
-    "web_uploader"
+    "web_url_input",
+    "web_crawl",
+    "web_crawl_depth",
+    "web_crawl_pages",
+    "web_last_trace"
 ]
 
+# Leaving the other page: release its knowledge base (on the service too)
+if "web_kb" in st.session_state:
+    st.session_state.web_kb.close()
+
 for k in pdf_keys:
     if k in st.session_state:
         del st.session_state[k]
 
 # Initialize session state for PDF page ONLY
-if 'pdf_docs' not in st.session_state:
-    st.session_state.pdf_docs = []
-if 'pdf_vector_store' not in st.session_state:
-    st.session_state.pdf_vector_store = None
-if 'pdf_qa_chain' not in st.session_state:
-    st.session_state.pdf_qa_chain = None
-if 'pdf_retriever' not in st.session_state:
-    st.session_state.pdf_retriever = None
-if 'pdf_current_file' not in st.session_state:
-    st.session_state.pdf_current_file = None
+# The knowledge base is in-process, or on the HTTP service if KNOWLENS_API_URL is set
+# One id per session and page, so page visits reuse the same remote knowledge base
+if 'kb_session' not in st.session_state:
+    st.session_state.kb_session = uuid.uuid4().hex
+if 'pdf_kb' not in st.session_state:
+    st.session_state.pdf_kb = new_knowledge_base(f"{st.session_state.kb_session}-pdf")
+if 'pdf_files' not in st.session_state:
+    st.session_state.pdf_files = {}  # file_id -> source id (None if it failed)
+
+pdf_state_keys = [
+    "pdf_kb",
+    "pdf_files",
+    "pdf_question",
+    "pdf_uploader",
+    "pdf_ocr",
+    "pdf_last_trace"
+]
 
 
 st.markdown("<h2>📄 PDF Q&A System</h2>", unsafe_allow_html=True)
@@ -149,97 +160,55 @@ if st.button("← Back to Home"):
 st.markdown('<hr style="border: 0; border-top: 2px solid black; margin: 20px 0; background: transparent;">', unsafe_allow_html=True)
 
 # File uploader
-uploaded_pdf = st.file_uploader(
-    "Upload a PDF document",
+uploaded_files = st.file_uploader(
+    "Upload documents",
     type=["pdf", "txt", "doc", "docx", "csv"],
-    help="Select a PDF, TXT, DOC, DOCX, or CSV file to analyze",
+    help="Select one or more PDF, TXT, DOC, DOCX, or CSV files to analyze",
+    accept_multiple_files=True,
     key="pdf_uploader"
 )
 
-if uploaded_pdf:
-    file_id = f"{uploaded_pdf.name}_{uploaded_pdf.size}"
-    
-    # Check if it's a DIFFERENT file (new upload)
-    if file_id != st.session_state.pdf_current_file:
-        # Clear old PDF context completely
-        st.session_state.pdf_docs = []
-        st.session_state.pdf_vector_store = None
-        st.session_state.pdf_qa_chain = None
-        st.session_state.pdf_retriever = None
-        
-        with st.spinner("📄 Processing PDF..."):
-            import time
-            temp_filename = f"temp_pdf_{int(time.time())}.pdf"
-            
-            try:
-                # Save file
-                with open(temp_filename, "wb") as f:
-                    f.write(uploaded_pdf.read())
-                
-                # Load and process NEW PDF
-                st.session_state.pdf_docs = load_pdf(temp_filename)
-                st.session_state.pdf_current_file = file_id
-                
-                if len(st.session_state.pdf_docs) == 0:
-                    st.error("❌ No text could be extracted from this document. This might be:")
-                    st.error("• A scanned PDF (image-based) - needs OCR")
-                    st.error("• An encrypted/protected PDF")
-                    st.error("• A corrupted file")
-                    st.info("💡 Try converting the PDF to a searchable format or use a text-based version.")
-                    
-                    # Clear the failed attempt
-                    st.session_state.pdf_docs = []
-                    st.session_state.pdf_current_file = None
-                    st.session_state.pdf_vector_store = None
-                    st.session_state.pdf_qa_chain = None
-                    st.session_state.pdf_retriever = None
-                else:
-                    # Success - set the current file
-                    st.session_state.pdf_current_file = file_id
-                # Vector store will be rebuilt in the next section
-                
-                # Cleanup temp file
-                try:
-                    os.remove(temp_filename)
-                except:
-                    pass
-                
-                st.success(f"✅ Successfully loaded {len(st.session_state.pdf_docs)} chunks from NEW PDF!")
-                st.rerun()
-            except Exception as e:
-                st.error(f"❌ Error: {str(e)}")
-                if os.path.exists(temp_filename):
-                    try:
-                        os.remove(temp_filename)
-                    except:
-                        pass
-elif not uploaded_pdf and st.session_state.pdf_docs:
-    keys_to_clear = [
-        "pdf_docs",
-        "pdf_vector_store",
-        "pdf_qa_chain",
-        "pdf_retriever",
-        "pdf_current_file",
-        "pdf_question",
-        "pdf_uploader"
-    ]
-
-    for k in keys_to_clear:
-        if k in st.session_state:
-            del st.session_state[k]
-
-    st.rerun()
+use_ocr = st.checkbox(
+    "🔍 OCR scanned pages",
+    # On by default only where the Tesseract binary is installed
+    value=shutil.which("tesseract") is not None,
+    help="Pages without a text layer are read with OCR; pages with text are not affected",
+    key="pdf_ocr"
+)
+
+kb = st.session_state.pdf_kb
+current_files = {f"{f.name}_{f.size}": f for f in uploaded_files or []}
+
+# Files removed from the uploader: drop only their vectors
+for file_id in list(st.session_state.pdf_files):
+    if file_id not in current_files:
+        source_id = st.session_state.pdf_files.pop(file_id)
+        # The same content may still be uploaded under another name
+        if source_id is not None and source_id not in st.session_state.pdf_files.values():
+            kb.remove(source_id)
+
+# New files: reopen their saved index or build it, then append to the knowledge base
+for file_id, uploaded_file in current_files.items():
+    if file_id in st.session_state.pdf_files:
+        continue
+
+    with st.spinner(f"📄 Processing {uploaded_file.name}..."):
+        try:
+            result = kb.add_file(uploaded_file.name, uploaded_file.getvalue(), use_ocr=use_ocr)
+            st.session_state.pdf_files[file_id] = result["source_id"]
+            st.success(f"✅ Added {uploaded_file.name} ({result['chunks']} chunks)")
+        except Exception as e:
+            # Remember the failure so the file is not re-processed on every rerun
+            st.session_state.pdf_files[file_id] = None
+            st.error(f"❌ {uploaded_file.name}: {str(e)}")
 
 
 # Display status and Q&A section
-if st.session_state.pdf_docs:
-    st.markdown(f"<div class='info-msg'><strong>Current PDF:</strong> {uploaded_pdf.name if uploaded_pdf else 'Loaded'}<br><strong>Chunks:</strong> {len(st.session_state.pdf_docs)} text chunks ready</div>", unsafe_allow_html=True)
-    
-    # Build vector store
-    if st.session_state.pdf_vector_store is None:
-        with st.spinner("🔧 Building knowledge base..."):
-            st.session_state.pdf_vector_store = create_vector_store(st.session_state.pdf_docs)
-            st.session_state.pdf_qa_chain, st.session_state.pdf_retriever = build_qa_chain(st.session_state.pdf_vector_store)
+if kb.chunks:
+    source_names = "<br>".join(
+        f"• {source['name']} ({source['chunks']} chunks)" for source in kb.sources()
+    )
+    st.markdown(f"<div class='info-msg'><strong>Documents:</strong><br>{source_names}<br><strong>Chunks:</strong> {kb.chunks} text chunks ready</div>", unsafe_allow_html=True)
     
     st.markdown('<hr style="border: 0; border-top: 2px solid black; margin: 20px 0; background: transparent;">', unsafe_allow_html=True)
 
@@ -258,17 +227,8 @@ if st.session_state.pdf_docs:
     
     with col2:
         if st.button("🔄 Clear", use_container_width=True):
-            keys_to_clear = [
-                "pdf_docs",
-                "pdf_vector_store",
-                "pdf_qa_chain",
-                "pdf_retriever",
-                "pdf_current_file",
-                "pdf_question",
-                "pdf_uploader"
-            ]
-
-            for k in keys_to_clear:
+            st.session_state.pdf_kb.close()
+            for k in pdf_state_keys:
                 if k in st.session_state:
                     del st.session_state[k]
 
@@ -276,65 +236,93 @@ if st.session_state.pdf_docs:
 
     
     if question and ask_button:
+        # Display answer
+        st.markdown('<h3 style="color: black;">💡 Answer</h3>', unsafe_allow_html=True)
+        answer_placeholder = st.empty()
+        result = ""
+
         with st.spinner("🤔 Thinking..."):
-            result = st.session_state.pdf_qa_chain.invoke(question)
-            
-            # Display answer
-            st.markdown('<h3 style="color: black;">💡 Answer</h3>', unsafe_allow_html=True)
-            st.markdown(f"""
-            <div style='background:#262626; 
-                        padding: 1.5rem; 
-                        border-radius: 12px; 
-                        color: white; 
-                        font-size: 1.1rem;
-                        line-height: 1.6;'>
-                {result}
-            </div>
-            """, unsafe_allow_html=True)
-            
-            # Display sources
-            st.markdown('<h3 style="color: black;">📚 Sources</h3>', unsafe_allow_html=True)
-            source_docs = st.session_state.pdf_retriever.invoke(question)
-            sources = format_sources(source_docs)
-            
-            for i, src in enumerate(sources, 1):
-                st.markdown(f"""
-                <div style='background: #262626 ; 
+            # Sources arrive first, then answer tokens as they are generated
+            for event in kb.stream(question):
+                if event["type"] == "sources":
+                    if event["cached"]:
+                        st.caption("⚡ Answered from cache (similar question asked before)")
+                    # Display sources
+                    st.markdown('<h3 style="color: black;">📚 Sources</h3>', unsafe_allow_html=True)
+                    sources = event["sources"]
+
+                    for i, src in enumerate(sources, 1):
+                        st.markdown(f"""
+                        <div style='background: #262626 ; 
+                                    padding: 1.5rem; 
+                                    border-radius: 12px;
+                                    color:white; 
+                                    border-left: 8px solid #ffdd57; 
+                                    margin: 1rem 0;'>
+                            <div style='display: flex; align-items: center; margin-bottom: 0.5rem;'>
+                                <span style='background: #262626; 
+                                             color: white; 
+                                             border-radius: 50%; 
+                                             width: 30px; 
+                                             height: 30px; 
+                                             display: inline-flex; 
+                                             align-items: center; 
+                                             justify-content: center; 
+                                             margin-right: 0.5rem;
+                                             font-weight: bold;'>{i}</span>
+                                <strong style='color: #fafafa;'>📄 {src['source']}</strong>
+                            </div>
+                            <div style='color: #fafafa; margin-bottom: 0.5rem;'>
+                                📍 {src['location']}
+                            </div>
+                            <div style='background: white; 
+                                        padding: 1rem; 
+                                        border-radius: 8px; 
+                                        font-family: monospace;
+                                        color: #555;
+                                        border-left: 3px solid #e0e0e0;
+                                        white-space: pre-wrap;'>
+                                "{src['excerpt']}"
+                            </div>
+                        </div>
+                        """, unsafe_allow_html=True)
+                    continue
+
+                if event["type"] == "trace":
+                    st.session_state.pdf_last_trace = event["trace"]
+                    continue
+
+                result += event["content"]
+                answer_placeholder.markdown(f"""
+                <div style='background:#262626; 
                             padding: 1.5rem; 
-                            border-radius: 12px;
-                            color:white; 
-                            border-left: 8px solid #ffdd57; 
-                            margin: 1rem 0;'>
-                    <div style='display: flex; align-items: center; margin-bottom: 0.5rem;'>
-                        <span style='background: #262626; 
-                                     color: white; 
-                                     border-radius: 50%; 
-                                     width: 30px; 
-                                     height: 30px; 
-                                     display: inline-flex; 
-                                     align-items: center; 
-                                     justify-content: center; 
-                                     margin-right: 0.5rem;
-                                     font-weight: bold;'>{i}</span>
-                        <strong style='color: #fafafa;'>📄 {src['source']}</strong>
-                    </div>
-                    <div style='color: #fafafa; margin-bottom: 0.5rem;'>
-                        📍 Page {src['page']} of {src['total_pages']}
-                    </div>
-                    <div style='background: white; 
-                                padding: 1rem; 
-                                border-radius: 8px; 
-                                font-family: monospace;
-                                color: #555;
-                                border-left: 3px solid #e0e0e0;
-                                white-space: pre-wrap;'>
-                        "{src['excerpt']}"
-                    </div>
+                            border-radius: 12px; 
+                            color: white; 
+                            font-size: 1.1rem;
+                            line-height: 1.6;'>
+                    {result}
                 </div>
                 """, unsafe_allow_html=True)
 
+    # Timing breakdown of the last question
+    if st.session_state.get("pdf_last_trace"):
+        breakdown = timing_breakdown(st.session_state.pdf_last_trace)
+        with st.expander("🐞 Debug: timing of the last question"):
+            col1, col2, col3, col4 = st.columns(4)
+            ttft = breakdown["time_to_first_token_ms"]
+            col1.metric("Total", f"{breakdown['total_ms']:.0f} ms")
+            col2.metric("First token", f"{ttft:.0f} ms" if ttft is not None else "–")
+            col3.metric("Prompt tokens", breakdown["prompt_tokens"] if breakdown["prompt_tokens"] is not None else "–")
+            col4.metric("Answer tokens", breakdown["completion_tokens"] if breakdown["completion_tokens"] is not None else "–")
+            if breakdown["cached"]:
+                st.caption("⚡ Answered from cache: no retrieval or LLM call")
+            st.dataframe(breakdown["rows"], use_container_width=True, hide_index=True)
+
 else:
-    st.info("👆 Upload a PDF document above to get started")
+    st.info("👆 Upload one or more documents above to get started")
 
 st.markdown('<hr style="border: 0; border-top: 2px solid black; margin: 20px 0; background: transparent;">', unsafe_allow_html=True)
-st.markdown("<p style='text-align: center; color: black; opacity: 0.8;'>PDF Q&A • Powered by AI</p>", unsafe_allow_html=True)
\ No newline at end of file
+st.markdown("<p style='text-align: center; color: black; opacity: 0.8;'>PDF Q&A • Powered by AI</p>", unsafe_allow_html=True)
+
+# Opened directly (not via the landing page): warm up once rendered
+start_warmup()
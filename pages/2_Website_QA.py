@@ -1,9 +1,9 @@
 # pages/2_Website_QA.py
 import streamlit as st
-from ingest.web_Ingestion import load_website
-from retrieval.retriever import create_vector_store
-from retrieval.qa_chain import build_qa_chain
-from utils import format_sources
+from service.client import new_knowledge_base
+from service.warmup import start_warmup
+from utils import timing_breakdown
+import uuid
 
 st.set_page_config(
     page_title="Website Q&A",
@@ -118,31 +118,40 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 pdf_keys = [
-    "pdf_docs",
-    "pdf_vector_store",
-    "pdf_qa_chain",
-    "pdf_retriever",
-    "pdf_current_file",
+    "pdf_kb",
+    "pdf_files",
     "pdf_question",
-    "pdf_uploader"
+    "pdf_uploader",
+    "pdf_ocr",
+    "pdf_last_trace"
 ]
 
+# Leaving the other page: release its knowledge base (on the service too)
+if "pdf_kb" in st.session_state:
+    st.session_state.pdf_kb.close()
+
 for k in pdf_keys:
     if k in st.session_state:
         del st.session_state[k]
 
 
 # Initialize session state for Website page
-if 'web_docs' not in st.session_state:
-    st.session_state.web_docs = []
-if 'web_vector_store' not in st.session_state:
-    st.session_state.web_vector_store = None
-if 'web_qa_chain' not in st.session_state:
-    st.session_state.web_qa_chain = None
-if 'web_retriever' not in st.session_state:
-    st.session_state.web_retriever = None
-if 'web_current_url' not in st.session_state:
-    st.session_state.web_current_url = None
+# The knowledge base is in-process, or on the HTTP service if KNOWLENS_API_URL is set
+# One id per session and page, so page visits reuse the same remote knowledge base
+if 'kb_session' not in st.session_state:
+    st.session_state.kb_session = uuid.uuid4().hex
+if 'web_kb' not in st.session_state:
+    st.session_state.web_kb = new_knowledge_base(f"{st.session_state.kb_session}-web")
+
+web_state_keys = [
+    "web_kb",
+    "web_question",
+    "web_url_input",
+    "web_crawl",
+    "web_crawl_depth",
+    "web_crawl_pages",
+    "web_last_trace"
+]
 
 st.markdown("<h2>🌐 Website Q&A System</h2>", unsafe_allow_html=True)
 
@@ -156,44 +165,64 @@ st.markdown('<hr style="border: 0; border-top: 2px solid black; margin: 20px 0;
 url = st.text_input(
     "Enter website URL",
     placeholder="https://example.com",
-    help="Provide a website URL to extract content",
+    help="Provide a website URL to extract content; each loaded site is added to the knowledge base",
     key="web_url_input"
 )
 
+crawl = st.checkbox("🕸️ Crawl linked pages on the same site", key="web_crawl")
+if crawl:
+    col_depth, col_pages = st.columns(2)
+    with col_depth:
+        crawl_depth = st.number_input("Link depth", min_value=1, max_value=5, value=2, key="web_crawl_depth")
+    with col_pages:
+        crawl_pages = st.number_input("Max pages", min_value=1, max_value=500, value=50, key="web_crawl_pages")
 
 load_btn = st.button("🔍 Load Website")
 
-if url and load_btn and url != st.session_state.web_current_url:
-
-    # Check if it's a DIFFERENT URL (new website)
-    if url != st.session_state.web_current_url:
-        # Clear old website context completely
-        st.session_state.web_docs = []
-        st.session_state.web_vector_store = None
-        st.session_state.web_qa_chain = None
-        st.session_state.web_retriever = None
-        
-        with st.spinner("🌐 Fetching website content..."):
-            try:
-                st.session_state.web_docs = load_website(url)
-                st.session_state.web_current_url = url
-                
-                st.success(f"✅ Successfully loaded {len(st.session_state.web_docs)} chunks from NEW website!")
-                st.rerun()
-            except Exception as e:
-                st.error(f"❌ Error loading website: {str(e)}")
-    else:
-        st.info("ℹ️ This URL is already loaded")
+kb = st.session_state.web_kb
+
+if url and load_btn:
+    with st.spinner("🌐 Fetching website content..."):
+        try:
+            # Indexed before: the saved index is reopened, and refreshed if old
+            result = kb.add_website(
+                url,
+                max_depth=int(crawl_depth) if crawl else 0,
+                max_pages=int(crawl_pages) if crawl else 1,
+            )
+            if result["added"]:
+                st.success(f"✅ Added {result['chunks']} chunks from {result['name']}")
+            else:
+                st.info("ℹ️ This URL is already loaded")
+        except Exception as e:
+            st.error(f"❌ Error loading website: {str(e)}")
+
+# Loaded websites, each removable or refreshable without rebuilding the others
+sites_changed = False
+for source in kb.sources():
+    source_id = source["source_id"]
+    col_name, col_refresh, col_remove = st.columns([4, 1, 1])
+    with col_name:
+        st.markdown(f"<div class='info-msg'>🌐 {source['name']} ({source['chunks']} chunks)</div>", unsafe_allow_html=True)
+    with col_refresh:
+        if st.button("🔄 Refresh", key=f"web_refresh_{source_id}"):
+            with st.spinner("🌐 Checking for changed pages..."):
+                try:
+                    sites_changed = kb.refresh_website(source_id)
+                    if not sites_changed:
+                        st.info("ℹ️ No pages changed")
+                except Exception as e:
+                    st.error(f"❌ Error refreshing website: {str(e)}")
+    with col_remove:
+        if st.button("✖ Remove", key=f"web_remove_{source_id}"):
+            sites_changed = kb.remove(source_id)
+
+if sites_changed:
+    st.rerun()
 
 # Display status and Q&A section
-if st.session_state.web_docs:
-    st.markdown(f"<div class='info-msg'><strong>Current Website:</strong> {st.session_state.web_current_url}<br><strong>Chunks:</strong> {len(st.session_state.web_docs)} text chunks ready</div>", unsafe_allow_html=True)
-    
-    # Build vector store
-    if st.session_state.web_vector_store is None:
-        with st.spinner("🔧 Building knowledge base..."):
-            st.session_state.web_vector_store = create_vector_store(st.session_state.web_docs)
-            st.session_state.web_qa_chain, st.session_state.web_retriever = build_qa_chain(st.session_state.web_vector_store)
+if kb.chunks:
+    st.markdown(f"<div class='info-msg'><strong>Websites:</strong> {len(kb.sources())}<br><strong>Chunks:</strong> {kb.chunks} text chunks ready</div>", unsafe_allow_html=True)
     
     st.markdown('<hr style="border: 0; border-top: 2px solid black; margin: 20px 0; background: transparent;">', unsafe_allow_html=True)
     st.markdown('<h3 style="color: black;">💬 Ask Your Question</h3>', unsafe_allow_html=True)
@@ -212,17 +241,8 @@ if st.session_state.web_docs:
     
     with col2:
         if st.button("🔄 Clear", use_container_width=True):
-            keys_to_clear = [
-                "web_docs",
-                "web_vector_store",
-                "web_qa_chain",
-                "web_retriever",
-                "web_current_url",
-                "web_question",
-                "web_url_input"
-            ]
-
-            for k in keys_to_clear:
+            st.session_state.web_kb.close()
+            for k in web_state_keys:
                 if k in st.session_state:
                     del st.session_state[k]
 
@@ -230,61 +250,89 @@ if st.session_state.web_docs:
 
     
     if question and ask_button:
+        # Display answer
+        st.markdown('<h3 style="color: black;">💡 Answer</h3>', unsafe_allow_html=True)
+        answer_placeholder = st.empty()
+        result = ""
+
         with st.spinner("🤔 Thinking..."):
-            result = st.session_state.web_qa_chain.invoke(question)
-            
-            # Display answer
-            st.markdown('<h3 style="color: black;">💡 Answer</h3>', unsafe_allow_html=True)
-            st.markdown(f"""
-            <div style='background:#262626; 
-                        padding: 1.5rem; 
-                        border-radius: 12px; 
-                        color: white; 
-                        font-size: 1.1rem;
-                        line-height: 1.6;'>
-                {result}
-            </div>
-            """, unsafe_allow_html=True)
-            
-            # Display sources
-            st.markdown('<h3 style="color: black;">📚 Sources</h3>', unsafe_allow_html=True)
-            source_docs = st.session_state.web_retriever.invoke(question)
-            sources = format_sources(source_docs)
-            
-            for i, src in enumerate(sources, 1):
-                st.markdown(f"""
-                <div style='background: #262626; 
+            # Sources arrive first, then answer tokens as they are generated
+            for event in kb.stream(question):
+                if event["type"] == "sources":
+                    if event["cached"]:
+                        st.caption("⚡ Answered from cache (similar question asked before)")
+                    # Display sources
+                    st.markdown('<h3 style="color: black;">📚 Sources</h3>', unsafe_allow_html=True)
+                    sources = event["sources"]
+
+                    for i, src in enumerate(sources, 1):
+                        st.markdown(f"""
+                        <div style='background: #262626; 
+                                    padding: 1.5rem; 
+                                    border-radius: 12px; 
+                                    border-left: 8px solid #ffdd57; 
+                                    margin: 1rem 0;'>
+                            <div style='display: flex; align-items: center; margin-bottom: 0.5rem;'>
+                                <span style='background: #262626; 
+                                             color: white; 
+                                             border-radius: 50%; 
+                                             width: 30px; 
+                                             height: 30px; 
+                                             display: inline-flex; 
+                                             align-items: center; 
+                                             justify-content: center; 
+                                             margin-right: 0.5rem;
+                                             font-weight: bold;'>{i}</span>
+                                <strong style='color: #fafafa;'>🌐 {src['source']}</strong>
+                            </div>
+                            <div style='background: white; 
+                                        padding: 1rem; 
+                                        border-radius: 8px; 
+                                        font-family: monospace;
+                                        color: #555;
+                                        border-left: 3px solid #e0e0e0;
+                                        white-space: pre-wrap;'>
+                                "{src['excerpt']}"
+                            </div>
+                        </div>
+                        """, unsafe_allow_html=True)
+                    continue
+
+                if event["type"] == "trace":
+                    st.session_state.web_last_trace = event["trace"]
+                    continue
+
+                result += event["content"]
+                answer_placeholder.markdown(f"""
+                <div style='background:#262626; 
                             padding: 1.5rem; 
                             border-radius: 12px; 
-                            border-left: 8px solid #ffdd57; 
-                            margin: 1rem 0;'>
-                    <div style='display: flex; align-items: center; margin-bottom: 0.5rem;'>
-                        <span style='background: #262626; 
-                                     color: white; 
-                                     border-radius: 50%; 
-                                     width: 30px; 
-                                     height: 30px; 
-                                     display: inline-flex; 
-                                     align-items: center; 
-                                     justify-content: center; 
-                                     margin-right: 0.5rem;
-                                     font-weight: bold;'>{i}</span>
-                        <strong style='color: #fafafa;'>🌐 {src['source']}</strong>
-                    </div>
-                    <div style='background: white; 
-                                padding: 1rem; 
-                                border-radius: 8px; 
-                                font-family: monospace;
-                                color: #555;
-                                border-left: 3px solid #e0e0e0;
-                                white-space: pre-wrap;'>
-                        "{src['excerpt']}"
-                    </div>
+                            color: white; 
+                            font-size: 1.1rem;
+                            line-height: 1.6;'>
+                    {result}
                 </div>
                 """, unsafe_allow_html=True)
 
+    # Timing breakdown of the last question
+    if st.session_state.get("web_last_trace"):
+        breakdown = timing_breakdown(st.session_state.web_last_trace)
+        with st.expander("🐞 Debug: timing of the last question"):
+            col1, col2, col3, col4 = st.columns(4)
+            ttft = breakdown["time_to_first_token_ms"]
+            col1.metric("Total", f"{breakdown['total_ms']:.0f} ms")
+            col2.metric("First token", f"{ttft:.0f} ms" if ttft is not None else "–")
+            col3.metric("Prompt tokens", breakdown["prompt_tokens"] if breakdown["prompt_tokens"] is not None else "–")
+            col4.metric("Answer tokens", breakdown["completion_tokens"] if breakdown["completion_tokens"] is not None else "–")
+            if breakdown["cached"]:
+                st.caption("⚡ Answered from cache: no retrieval or LLM call")
+            st.dataframe(breakdown["rows"], use_container_width=True, hide_index=True)
+
 else:
     st.info("👆 Enter a website URL above and click Load Website to get started")
 
 st.markdown('<hr style="border: 0; border-top: 2px solid black; margin: 20px 0; background: transparent;">', unsafe_allow_html=True)
-st.markdown("<p style='text-align: center; color: black; opacity: 0.8;'>Website Q&A • Powered by AI</p>", unsafe_allow_html=True)
\ No newline at end of file
+st.markdown("<p style='text-align: center; color: black; opacity: 0.8;'>Website Q&A • Powered by AI</p>", unsafe_allow_html=True)
+
+# Opened directly (not via the landing page): warm up once rendered
+start_warmup()
@@ -0,0 +1,395 @@
+import numpy as np
+import math
+import time
+
+INDEX_TYPES = ("flat", "ivf", "hnsw", "ivfpq", "sq8", "fp16", "pq")
+
+# Compact storage: int8 / fp16 scalar quantization or product quantization.
+# A refine stage re-scores the top ``k_factor * k`` candidates against
+# higher-precision copies: "flat" is exact but keeps float32 vectors in RAM,
+# "fp16" is near-exact at half the float32 size.
+QUANTIZED_TYPES = ("sq8", "fp16", "pq")
+REFINE_TYPES = (None, "flat", "fp16")
+DEFAULT_K_FACTOR = 4
+
+# Automatic selection thresholds (vector counts)
+FLAT_MAX_VECTORS = 20_000
+IVF_MAX_VECTORS = 1_000_000
+
+DEFAULT_NPROBE = 8
+DEFAULT_MAX_TRAIN_POINTS = 100_000
+DEFAULT_EF_SEARCH = 64
+
+# A PQ codebook of 2**pq_bits centroids wants PQ_TRAIN_POINTS training
+# vectors per centroid (faiss refuses fewer than one). Smaller corpora get
+# fewer bits, and below 2**MIN_PQ_BITS centroids no PQ at all
+PQ_TRAIN_POINTS = 39
+MIN_PQ_BITS = 4
+
+
+def select_index_type(n_vectors):
+    """
+    Pick an index type for a corpus size.
+
+    Exact flat search up to FLAT_MAX_VECTORS, IVF up to IVF_MAX_VECTORS and
+    IVF-PQ beyond. HNSW is never picked automatically because it cannot
+    remove vectors, which corpora rely on.
+    """
+    if n_vectors <= FLAT_MAX_VECTORS:
+        return "flat"
+    if n_vectors <= IVF_MAX_VECTORS:
+        return "ivf"
+    return "ivfpq"
+
+
+def default_nlist(n_vectors):
+    """~4*sqrt(n) inverted lists, keeping >= 39 training points per list"""
+    return max(1, min(int(4 * math.sqrt(n_vectors)), n_vectors // 39))
+
+
+def _default_pq_m(dim):
+    # Sub-quantizers must divide the dimension; aim for ~8 dims each
+    for m in (64, 48, 32, 24, 16, 12, 8, 4, 2, 1):
+        if dim % m == 0 and dim // m >= 4:
+            return m
+    return 1
+
+
+def _training_sample(vectors, max_points):
+    if max_points is None or len(vectors) <= max_points:
+        return vectors
+    rows = np.random.default_rng(0).choice(len(vectors), max_points, replace=False)
+    return vectors[np.sort(rows)]
+
+
+def fit_index_type(index_type, n_vectors, pq_bits=8, max_train_points=DEFAULT_MAX_TRAIN_POINTS):
+    """
+    The (index_type, pq_bits) build_index really builds for ``n_vectors``.
+
+    "auto" is resolved by size. PQ types get fewer bits per code when there
+    are too few training vectors (see PQ_TRAIN_POINTS), or no PQ at all
+    (sq8 for "pq", plain IVF for "ivfpq") when even MIN_PQ_BITS would be
+    too many.
+    """
+    if index_type == "auto":
+        index_type = select_index_type(n_vectors)
+    n_train = min(n_vectors, max_train_points or n_vectors)
+    if index_type not in ("pq", "ivfpq") or n_train >= PQ_TRAIN_POINTS * 2 ** pq_bits:
+        return index_type, pq_bits
+    bits = int(math.log2(n_train / PQ_TRAIN_POINTS)) if n_train >= PQ_TRAIN_POINTS else 0
+    if bits >= MIN_PQ_BITS:
+        return index_type, bits
+    return ("sq8" if index_type == "pq" else "ivf"), pq_bits
+
+
+def _factory_string(index_type, n_vectors, dim, nlist=None, hnsw_m=32, pq_m=None, pq_bits=8,
+                    refine=None):
+    if refine not in REFINE_TYPES:
+        raise ValueError(f"Unknown refine type: {refine}. Supported: flat, fp16")
+    suffix = {None: "", "flat": ",RFlat", "fp16": ",Refine(SQfp16)"}[refine]
+
+    if index_type == "sq8":
+        return "SQ8" + suffix
+    if index_type == "fp16":
+        return "SQfp16" + suffix
+    if index_type == "pq":
+        return f"PQ{pq_m or _default_pq_m(dim)}x{pq_bits}" + suffix
+    if suffix:
+        raise ValueError("refine only applies to quantized index types (sq8, fp16, pq)")
+
+    if index_type == "flat":
+        return "Flat"
+    if index_type == "hnsw":
+        return f"HNSW{hnsw_m}"
+    nlist = nlist or default_nlist(n_vectors)
+    if index_type == "ivf":
+        return f"IVF{nlist},Flat"
+    if index_type == "ivfpq":
+        return f"IVF{nlist},PQ{pq_m or _default_pq_m(dim)}x{pq_bits}"
+    raise ValueError(f"Unknown index type: {index_type}. Supported: {', '.join(INDEX_TYPES)}")
+
+
+def build_index(vectors, index_type="auto", nlist=None, nprobe=DEFAULT_NPROBE,
+                hnsw_m=32, ef_construction=80, ef_search=DEFAULT_EF_SEARCH,
+                pq_m=None, pq_bits=8, refine=None, k_factor=DEFAULT_K_FACTOR,
+                max_train_points=DEFAULT_MAX_TRAIN_POINTS):
+    """
+    Build, train and fill a FAISS index (L2 metric, like the flat default).
+
+    Args:
+        vectors (np.ndarray): (n, d) float32 vectors
+        index_type (str): "auto", "flat", "ivf", "hnsw", "ivfpq", or the
+            compact "sq8" (int8), "fp16" and "pq" storage types
+        nlist (int): IVF inverted lists (default ~4*sqrt(n))
+        nprobe (int): IVF lists visited per query
+        hnsw_m (int): HNSW graph degree
+        ef_construction (int): HNSW build-time beam width
+        ef_search (int): HNSW query-time beam width
+        pq_m (int): PQ sub-quantizers (must divide d)
+        pq_bits (int): bits per PQ code; lowered when there are too few
+            vectors to train them (see PQ_TRAIN_POINTS)
+        refine (str): re-score candidates of a quantized index with "flat"
+            (exact) or "fp16" vectors
+        k_factor (int): candidates re-scored per requested neighbour
+        max_train_points (int): train on a random sample of at most this many
+            vectors
+
+    Returns:
+        faiss.Index: populated index
+    """
+    import faiss
+
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    n, dim = vectors.shape
+    if index_type == "auto":
+        index_type = select_index_type(n)
+    fitted, fitted_bits = fit_index_type(index_type, n, pq_bits, max_train_points)
+    if fitted != index_type:
+        print(f"⚠️ {n} vectors are too few to train PQ codes; using {fitted} instead of {index_type}")
+    elif fitted_bits != pq_bits:
+        print(f"⚠️ {n} vectors are too few to train {pq_bits}-bit PQ codes; using {fitted_bits} bits")
+    index_type, pq_bits = fitted, fitted_bits
+
+    factory = _factory_string(index_type, n, dim, nlist=nlist, hnsw_m=hnsw_m,
+                              pq_m=pq_m, pq_bits=pq_bits, refine=refine)
+    index = faiss.index_factory(dim, factory, faiss.METRIC_L2)
+    if index_type == "hnsw":
+        index.hnsw.efConstruction = ef_construction
+    if not index.is_trained:
+        index.train(_training_sample(vectors, max_train_points))
+    index.add(vectors)
+    set_search_params(index, nprobe=nprobe, ef_search=ef_search, k_factor=k_factor)
+    return index
+
+
+def index_type_of(index):
+    """Inverse of build_index's index_type for an existing index"""
+    import faiss
+
+    index = faiss.downcast_index(index)
+    if isinstance(index, faiss.IndexRefine):
+        return index_type_of(index.base_index)
+    if isinstance(index, faiss.IndexScalarQuantizer):
+        return "fp16" if index.sq.qtype == faiss.ScalarQuantizer.QT_fp16 else "sq8"
+    if isinstance(index, faiss.IndexPQ):
+        return "pq"
+    if isinstance(index, faiss.IndexFlat):
+        return "flat"
+    if isinstance(index, faiss.IndexHNSW):
+        return "hnsw"
+    if isinstance(index, faiss.IndexIVFPQ):
+        return "ivfpq"
+    if isinstance(index, faiss.IndexIVF):
+        return "ivf"
+    return type(index).__name__
+
+
+def pq_bits_of(index):
+    """Bits per PQ code of a "pq" or "ivfpq" index, else None"""
+    import faiss
+
+    kind = index_type_of(index)
+    if kind == "ivfpq":
+        return faiss.downcast_index(faiss.extract_index_ivf(index)).pq.nbits
+    if kind == "pq":
+        index = faiss.downcast_index(index)
+        if isinstance(index, faiss.IndexRefine):
+            index = faiss.downcast_index(index.base_index)
+        return index.pq.nbits
+    return None
+
+
+def _refine_of(index):
+    import faiss
+
+    index = faiss.downcast_index(index)
+    if not isinstance(index, faiss.IndexRefine):
+        return None
+    return "fp16" if index_type_of(index.refine_index) == "fp16" else "flat"
+
+
+def set_search_params(index, nprobe=None, ef_search=None, k_factor=None):
+    """Set the query-time knobs that apply to this index type"""
+    import faiss
+
+    if k_factor is not None and _refine_of(index) is not None:
+        faiss.downcast_index(index).k_factor = k_factor
+
+    kind = index_type_of(index)
+    if kind in ("ivf", "ivfpq") and nprobe is not None:
+        faiss.extract_index_ivf(index).nprobe = nprobe
+    if kind == "hnsw" and ef_search is not None:
+        faiss.downcast_index(index).hnsw.efSearch = ef_search
+
+
+def search_params(index):
+    """Current query-time knobs of an index"""
+    import faiss
+
+    kind = index_type_of(index)
+    params = {"index_type": kind, "ntotal": index.ntotal}
+    if kind in ("ivf", "ivfpq"):
+        ivf = faiss.extract_index_ivf(index)
+        params.update(nlist=ivf.nlist, nprobe=ivf.nprobe)
+    elif kind == "hnsw":
+        params.update(ef_search=faiss.downcast_index(index).hnsw.efSearch)
+    if kind in ("pq", "ivfpq"):
+        params.update(pq_bits=pq_bits_of(index))
+    refine = _refine_of(index)
+    if refine is not None:
+        params.update(refine=refine, k_factor=faiss.downcast_index(index).k_factor)
+    return params
+
+
+def reconstruct_all(index):
+    """All stored vectors in position order (approximate for quantized storage)"""
+    import faiss
+
+    if index.ntotal == 0:
+        return np.zeros((0, index.d), dtype=np.float32)
+    if index_type_of(index) in ("ivf", "ivfpq"):
+        faiss.extract_index_ivf(index).make_direct_map()
+    return index.reconstruct_n(0, index.ntotal)
+
+
+def convert_store(vector_store, index_type="auto", **index_params):
+    """
+    Replace a FAISS vector store's index with one of another type in place.
+
+    Vector positions are preserved, so ``index_to_docstore_id`` stays valid.
+    """
+    vectors = reconstruct_all(vector_store.index)
+    vector_store.index = build_index(vectors, index_type=index_type, **index_params)
+    return vector_store
+
+
+def delete_from_store(vector_store, ids):
+    """
+    Delete documents by docstore id from a store with any index type.
+
+    Flat indexes use ``FAISS.delete``. IVF and HNSW indexes keep explicit ids
+    instead of compacting on removal, which would break the position mapping,
+    so the remaining vectors are re-added in order to the same (already
+    trained) index instead. Nothing is re-embedded.
+    """
+    if index_type_of(vector_store.index) == "flat":
+        return vector_store.delete(ids)
+
+    ids = set(ids)
+    index = vector_store.index
+    old_map = vector_store.index_to_docstore_id
+    keep = [pos for pos in range(index.ntotal) if old_map[pos] not in ids]
+    vectors = reconstruct_all(index)[keep]
+
+    index.reset()
+    if len(keep):
+        index.add(vectors)
+    vector_store.index_to_docstore_id = {new: old_map[pos] for new, pos in enumerate(keep)}
+    vector_store.docstore.delete(list(ids))
+    return True
+
+
+def recall_report(index, vectors, queries, k=10, nprobe_values=(1, 4, 8, 16, 32, 64),
+                  ef_search_values=(16, 32, 64, 128, 256)):
+    """
+    Recall@k and latency of an ANN index against exact search.
+
+    Args:
+        index (faiss.Index): index built over ``vectors``
+        vectors (np.ndarray): the indexed vectors, for the exact baseline
+        queries (np.ndarray): (q, d) query vectors
+        k (int): neighbours per query
+
+    Returns:
+        list: one dict per tested setting with ``params``, ``recall`` and
+        ``ms_per_query``; the first entry is the exact baseline
+    """
+    import faiss
+
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    queries = np.ascontiguousarray(queries, dtype=np.float32)
+
+    exact = faiss.IndexFlatL2(vectors.shape[1])
+    exact.add(vectors)
+    t = time.perf_counter()
+    _, truth = exact.search(queries, k)
+    exact_ms = (time.perf_counter() - t) * 1000 / len(queries)
+
+    report = [{"params": {"index_type": "flat"}, "recall": 1.0, "ms_per_query": exact_ms}]
+
+    kind = index_type_of(index)
+    if kind in ("ivf", "ivfpq"):
+        nlist = faiss.extract_index_ivf(index).nlist
+        settings = [{"nprobe": n} for n in nprobe_values if n <= nlist]
+    elif kind == "hnsw":
+        settings = [{"ef_search": ef} for ef in ef_search_values]
+    else:
+        settings = [{}]
+
+    original = search_params(index)
+    for params in settings:
+        set_search_params(index, **params)
+        t = time.perf_counter()
+        _, found = index.search(queries, k)
+        ms = (time.perf_counter() - t) * 1000 / len(queries)
+        hits = sum(len(set(f[f >= 0]) & set(tr)) for f, tr in zip(found, truth))
+        report.append({
+            "params": {"index_type": kind, **params},
+            "recall": hits / (k * len(queries)),
+            "ms_per_query": ms,
+        })
+    set_search_params(index, nprobe=original.get("nprobe"), ef_search=original.get("ef_search"))
+    return report
+
+
+def index_bytes(index):
+    """Serialized size of an index, a close proxy for its memory footprint"""
+    import faiss
+
+    return int(faiss.serialize_index(index).nbytes)
+
+
+def quantization_report(vectors, queries, k=10,
+                        configs=(("flat", None), ("fp16", None), ("sq8", None), ("sq8", "fp16"),
+                                 ("pq", None), ("pq", "fp16"), ("pq", "flat")),
+                        k_factor=DEFAULT_K_FACTOR, **index_params):
+    """
+    Measured memory and recall@k of compact storage modes vs float32 flat.
+
+    Args:
+        vectors (np.ndarray): (n, d) vectors to index
+        queries (np.ndarray): (q, d) query vectors
+        k (int): neighbours per query
+        configs (tuple): (index_type, refine) pairs to compare
+
+    Returns:
+        list: one dict per config with the ``index_type``, ``refine`` and
+        ``pq_bits`` actually built (PQ may fall back on few vectors, see
+        fit_index_type), ``bytes_per_vector``, ``compression`` (vs flat), ``recall`` and
+        ``ms_per_query``
+    """
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    queries = np.ascontiguousarray(queries, dtype=np.float32)
+
+    exact = build_index(vectors, "flat")
+    _, truth = exact.search(queries, k)
+    flat_bytes = index_bytes(exact)
+
+    report = []
+    for index_type, refine in configs:
+        index = build_index(vectors, index_type, refine=refine, k_factor=k_factor, **index_params)
+        t = time.perf_counter()
+        _, found = index.search(queries, k)
+        ms = (time.perf_counter() - t) * 1000 / len(queries)
+        hits = sum(len(set(f[f >= 0]) & set(tr)) for f, tr in zip(found, truth))
+        size = index_bytes(index)
+        report.append({
+            "index_type": index_type_of(index),
+            "refine": _refine_of(index),
+            "pq_bits": pq_bits_of(index),
+            "bytes_per_vector": size / len(vectors),
+            "compression": flat_bytes / size,
+            "recall": hits / (k * len(queries)),
+            "ms_per_query": ms,
+        })
+    return report
@@ -0,0 +1,137 @@
+from collections import OrderedDict
+import numpy as np
+import threading
+import time
+import os
+
+DEFAULT_SIMILARITY_THRESHOLD = float(os.getenv("KNOWLENS_ANSWER_CACHE_THRESHOLD", "0.95"))
+DEFAULT_TTL = float(os.getenv("KNOWLENS_ANSWER_CACHE_TTL", "3600"))
+DEFAULT_MAX_ENTRIES = int(os.getenv("KNOWLENS_ANSWER_CACHE_MAX_ENTRIES", "2048"))
+
+
+def _unit(vector):
+    vector = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class SemanticAnswerCache:
+    """
+    Answer cache keyed by index fingerprint plus question embedding.
+
+    A lookup returns a cached answer when a previous question over the same
+    index has cosine similarity of at least ``threshold`` to the new one, so
+    rephrasings of an FAQ skip the LLM call. Entries expire after ``ttl``
+    seconds and the least recently used are evicted past ``max_entries``.
+    """
+
+    def __init__(self, threshold=DEFAULT_SIMILARITY_THRESHOLD, ttl=DEFAULT_TTL,
+                 max_entries=DEFAULT_MAX_ENTRIES):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()  # entry id -> entry dict, LRU order
+        self._by_index = {}            # index key -> {entry id: unit vector}
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _drop(self, entry_id):
+        entry = self._entries.pop(entry_id)
+        vectors = self._by_index[entry["index_key"]]
+        del vectors[entry_id]
+        if not vectors:
+            del self._by_index[entry["index_key"]]
+
+    def lookup(self, index_key, question_vector):
+        """
+        Best cached answer for a question over an index.
+
+        Returns:
+            dict or None: ``{"question", "answer", "source_documents",
+            "scores", "similarity"}`` on a hit
+        """
+        query = _unit(question_vector)
+        now = time.time()
+        with self._lock:
+            candidates = self._by_index.get(index_key, {})
+            expired = [i for i in candidates if now - self._entries[i]["created"] > self.ttl]
+            for entry_id in expired:
+                self._drop(entry_id)
+                self.evictions += 1
+
+            best_id, best_sim = None, -1.0
+            if index_key in self._by_index:
+                ids = list(self._by_index[index_key])
+                sims = np.stack([self._by_index[index_key][i] for i in ids]) @ query
+                pos = int(np.argmax(sims))
+                best_id, best_sim = ids[pos], float(sims[pos])
+
+            if best_id is None or best_sim < self.threshold:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self._entries.move_to_end(best_id)
+            entry = self._entries[best_id]
+            return {**entry["result"], "similarity": best_sim}
+
+    def store(self, index_key, question_vector, result):
+        """Cache a chain result (answer, source_documents, scores)"""
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = {
+                "index_key": index_key,
+                "created": time.time(),
+                "result": {
+                    "question": result.get("question"),
+                    "answer": result["answer"],
+                    "source_documents": result["source_documents"],
+                    "scores": result["scores"],
+                },
+            }
+            self._by_index.setdefault(index_key, {})[entry_id] = _unit(question_vector)
+
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate(self, index_key=None):
+        """Drop the entries of one index, or everything"""
+        with self._lock:
+            if index_key is None:
+                self._entries.clear()
+                self._by_index.clear()
+                return
+            for entry_id in list(self._by_index.get(index_key, {})):
+                self._drop(entry_id)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_answer_cache():
+    """Return the process-wide answer cache, shared by all sessions"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = SemanticAnswerCache()
+    return _cache
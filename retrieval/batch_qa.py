@@ -0,0 +1,162 @@
+from retrieval.retriever import search_many, DEFAULT_LEXICAL_WEIGHT
+from retrieval.context_builder import context_budget
+from utils import format_sources
+import argparse
+import asyncio
+import json
+import time
+import os
+
+# Concurrent LLM generations in a batch run
+DEFAULT_CONCURRENCY = int(os.getenv("KNOWLENS_BATCH_CONCURRENCY", "8"))
+
+
+def read_questions(path):
+    """
+    Questions from a ``.txt`` file (one per line) or a ``.jsonl`` file.
+
+    JSONL records need a ``question`` field and may carry an ``id``; any
+    other fields (``expected``, ...) are passed through to the output under
+    ``input``.
+
+    Returns:
+        list: dicts with at least ``id`` and ``question``
+    """
+    records = []
+    with open(path, encoding="utf-8") as f:
+        for number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            if path.lower().endswith(".jsonl"):
+                record = json.loads(line)
+                if "question" not in record:
+                    raise ValueError(f"{path}:{number}: record has no 'question' field")
+            else:
+                record = {"question": line}
+            record.setdefault("id", len(records) + 1)
+            records.append(record)
+    return records
+
+
+async def abatch_answer(vector_store, records, k=3, lexical_weight=DEFAULT_LEXICAL_WEIGHT,
+                        concurrency=DEFAULT_CONCURRENCY, context_tokens=None):
+    """
+    Answer many questions against one vector store.
+
+    All questions are embedded in one encoder call and retrieved with one
+    batched FAISS search; generations then run concurrently, at most
+    ``concurrency`` at a time. A failed generation is reported in its
+    record's ``error`` field instead of stopping the run.
+
+    Each output record is ``{"id", "question", "input", "answer",
+    "sources", "error"}``; ``input`` holds the record's other fields, so
+    they can never clash with the output's own.
+
+    Args:
+        vector_store (FAISS): index to answer from
+        records (list): dicts with a ``question`` field (see read_questions)
+
+    Returns:
+        tuple: (output records in input order, timing dict)
+    """
+    from retrieval.qa_chain import build_answer_chain
+
+    questions = [record["question"] for record in records]
+    timing = {"questions": len(questions)}
+
+    start = time.perf_counter()
+    # Embedding and FAISS are CPU-bound; keep the event loop free
+    hits = await asyncio.to_thread(
+        search_many, vector_store, questions, k=k, lexical_weight=lexical_weight
+    )
+    timing["retrieval_seconds"] = time.perf_counter() - start
+
+    answer_chain = build_answer_chain(context_tokens or context_budget(k))
+    inputs = [
+        {"question": question, "source_documents": [doc for doc, _ in question_hits]}
+        for question, question_hits in zip(questions, hits)
+    ]
+    start = time.perf_counter()
+    answers = await answer_chain.abatch(
+        inputs, config={"max_concurrency": concurrency}, return_exceptions=True
+    )
+    timing["generation_seconds"] = time.perf_counter() - start
+
+    outputs = []
+    for record, question_hits, answer in zip(records, hits, answers):
+        failed = isinstance(answer, Exception)
+        outputs.append({
+            "id": record.get("id"),
+            "question": record["question"],
+            "input": {key: value for key, value in record.items() if key not in ("id", "question")},
+            "answer": None if failed else answer,
+            "sources": format_sources(
+                [doc for doc, _ in question_hits], [score for _, score in question_hits]
+            ),
+            "error": f"{type(answer).__name__}: {answer}" if failed else None,
+        })
+    timing["errors"] = sum(1 for output in outputs if output["error"])
+    return outputs, timing
+
+
+def batch_answer(vector_store, records, **params):
+    """Blocking wrapper around abatch_answer"""
+    return asyncio.run(abatch_answer(vector_store, records, **params))
+
+
+def write_jsonl(records, path):
+    with open(path, "w", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Answer a file of questions against documents")
+    parser.add_argument("questions", help=".txt (one question per line) or .jsonl with a 'question' field")
+    parser.add_argument("--docs", nargs="*", default=[], help="files or folders to answer from")
+    parser.add_argument("--url", nargs="*", default=[], help="websites to answer from")
+    parser.add_argument("--out", default="answers.jsonl", help="output JSONL path")
+    parser.add_argument("--k", type=int, default=3, help="chunks retrieved per question")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+                        help="concurrent LLM generations")
+    parser.add_argument("--lexical-weight", type=float, default=DEFAULT_LEXICAL_WEIGHT,
+                        help="BM25 share of the hybrid ranking (0 = dense only)")
+    parser.add_argument("--ocr", action="store_true", help="OCR scanned PDF pages")
+    args = parser.parse_args(argv)
+
+    from ingest.batch_Ingest import collect_files
+    from service.knowledge_base import KnowledgeBase
+
+    # Saved indexes are reused, so repeated nightly runs skip re-embedding
+    kb = KnowledgeBase()
+    for path in collect_files(args.docs):
+        with open(path, "rb") as f:
+            kb.add_file(os.path.basename(path), f.read(), use_ocr=args.ocr)
+    for url in args.url:
+        kb.add_website(url)
+    if kb.corpus.vector_store is None:
+        parser.error("nothing to answer from; pass --docs and/or --url")
+
+    records = read_questions(args.questions)
+    print(f"❓ Answering {len(records)} question(s) over {kb.chunks} chunks")
+    outputs, timing = batch_answer(
+        kb.corpus.vector_store,
+        records,
+        k=args.k,
+        lexical_weight=args.lexical_weight,
+        concurrency=args.concurrency,
+    )
+    write_jsonl(outputs, args.out)
+
+    total = timing["retrieval_seconds"] + timing["generation_seconds"]
+    print(
+        f"✅ {timing['questions'] - timing['errors']} answered, {timing['errors']} failed in "
+        f"{total:.1f}s (retrieval {timing['retrieval_seconds']:.2f}s, "
+        f"generation {timing['generation_seconds']:.1f}s) → {args.out}"
+    )
+    return 1 if timing["errors"] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
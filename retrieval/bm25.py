@@ -0,0 +1,263 @@
+from collections import defaultdict
+import heapq
+import math
+import pickle
+import re
+import threading
+
+# Keeps identifiers whole: part numbers (AB-1234), error codes (ERR_42),
+# versions (v1.2.3) and dotted names are single tokens
+TOKEN_RE = re.compile(r"[a-z0-9]+(?:[-_./:][a-z0-9]+)*")
+
+_ATTR = "_bm25_index"
+
+# Postings per term put in impact order on first use; a query that reads
+# further grows the list by IMPACT_GROWTH each time
+IMPACT_DEPTH = 64
+IMPACT_GROWTH = 4
+
+
+def tokenize(text):
+    """Lowercased word and identifier tokens"""
+    tokens = TOKEN_RE.findall(text.lower())
+    # Also index the parts of compound identifiers so "1234" finds "AB-1234"
+    parts = [p for t in tokens if not t.isalnum() for p in re.split(r"[-_./:]", t) if p]
+    return tokens + parts
+
+
+class BM25Index:
+    """
+    Okapi BM25 inverted index keyed by docstore id.
+
+    Postings map each term to ``{doc_id: term frequency}``, so a query only
+    touches the postings of its own terms; search cost is independent of
+    corpus size for rare terms such as identifiers and error codes.
+
+    Common terms would still mean scoring most of the corpus, so search
+    stops early instead (Fagin's threshold algorithm): each term's postings
+    are read in order of BM25 impact, highest first, and reading stops once
+    no unread document can beat the current top k. The ranking is exact.
+    Impact-ordered postings are built only as deep as queries have needed
+    (see IMPACT_DEPTH) and kept until the index changes; common terms have
+    low ceilings, so they are read last and usually not at all. Queries
+    whose terms are all about equally common cannot stop early; once they
+    have scored enough documents to make it cheaper, they finish by
+    scoring every posting instead.
+    """
+
+    def __init__(self, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings = defaultdict(dict)  # term -> {doc_id: tf}
+        self.doc_len = {}                  # doc_id -> token count
+        self.doc_terms = {}                # doc_id -> unique terms, for removal
+        self.total_len = 0
+        self._impacts = {}                 # term -> [(impact, doc_id)], best first, maybe partial
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.doc_len)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_lock"]
+        state.pop("_impacts", None)
+        state["postings"] = dict(self.postings)
+        return state
+
+    def __setstate__(self, state):
+        postings = state.pop("postings")
+        self.__dict__.update(state)
+        self.postings = defaultdict(dict, postings)
+        self._impacts = {}
+        self._lock = threading.Lock()
+
+    def add(self, doc_ids, texts):
+        with self._lock:
+            for doc_id, text in zip(doc_ids, texts):
+                if doc_id in self.doc_len:
+                    continue
+                counts = defaultdict(int)
+                tokens = tokenize(text)
+                for token in tokens:
+                    counts[token] += 1
+                for term, tf in counts.items():
+                    self.postings[term][doc_id] = tf
+                self.doc_len[doc_id] = len(tokens)
+                self.doc_terms[doc_id] = tuple(counts)
+                self.total_len += len(tokens)
+            # Impacts depend on every document length through the average
+            self._impacts = {}
+
+    def merge(self, other):
+        """Add another index's documents without re-tokenizing"""
+        with self._lock:
+            for doc_id, terms in other.doc_terms.items():
+                if doc_id in self.doc_len:
+                    continue
+                for term in terms:
+                    self.postings[term][doc_id] = other.postings[term][doc_id]
+                self.doc_len[doc_id] = other.doc_len[doc_id]
+                self.doc_terms[doc_id] = terms
+                self.total_len += other.doc_len[doc_id]
+            self._impacts = {}
+
+    def remove(self, doc_ids):
+        with self._lock:
+            for doc_id in doc_ids:
+                terms = self.doc_terms.pop(doc_id, None)
+                if terms is None:
+                    continue
+                for term in terms:
+                    postings = self.postings[term]
+                    postings.pop(doc_id, None)
+                    if not postings:
+                        del self.postings[term]
+                self.total_len -= self.doc_len.pop(doc_id)
+            self._impacts = {}
+
+    def _impact_list(self, term, idf, avg_len, depth):
+        """
+        At least a term's ``depth`` highest-impact postings (all of them if
+        it has fewer) as (impact, doc_id), best first
+        """
+        impacts = self._impacts.get(term)
+        postings = self.postings[term]
+        if impacts is None or len(impacts) < min(depth, len(postings)):
+            k1, b = self.k1, self.b
+            impacts = heapq.nlargest(depth, (
+                (idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * self.doc_len[doc_id] / avg_len)), doc_id)
+                for doc_id, tf in postings.items()
+            ))
+            self._impacts[term] = impacts
+        return impacts
+
+    def _score_all(self, terms, k, avg_len):
+        """Exhaustive top k: every posting of every term"""
+        k1, b = self.k1, self.b
+        scores = defaultdict(float)
+        for _, postings, idf, _, _ in terms:
+            for doc_id, tf in postings.items():
+                scores[doc_id] += idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * self.doc_len[doc_id] / avg_len))
+        return heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+
+    def search(self, query, k=10):
+        """
+        Top-k documents for a query, exactly as BM25 ranks them.
+
+        Returns:
+            list: (doc_id, score) pairs, best first
+        """
+        n_docs = len(self.doc_len)
+        if n_docs == 0 or k <= 0:
+            return []
+        avg_len = self.total_len / n_docs
+        k1, b = self.k1, self.b
+
+        # [term, postings, idf, impact list or None, read position]
+        terms = []
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if postings:
+                df = len(postings)
+                terms.append([term, postings, math.log(1 + (n_docs - df + 0.5) / (df + 0.5)), None, 0])
+
+        def bound(entry):
+            # Highest impact still unread. Before the list is built, the BM25
+            # ceiling idf * (k1 + 1); past the end of a partial list, the
+            # last impact read (the rest are no higher)
+            _, postings, idf, impacts, position = entry
+            if impacts is None:
+                return idf * (k1 + 1)
+            if position < len(impacts):
+                return impacts[position][0]
+            return impacts[-1][0] if len(impacts) < len(postings) else 0.0
+
+        # Scoring a document costs one lookup per term; past this many
+        # documents, accumulating every posting once is cheaper
+        max_scored = sum(len(entry[1]) for entry in terms) // (4 * max(len(terms), 1))
+        top = []  # min-heap of (score, doc_id)
+        scored = set()
+        while terms:
+            if len(scored) > max_scored:
+                return self._score_all(terms, k, avg_len)
+            bounds = [bound(entry) for entry in terms]
+            best = max(range(len(terms)), key=bounds.__getitem__)
+            if not bounds[best] or (len(top) == k and sum(bounds) <= top[0][0]):
+                break
+            entry = terms[best]
+            if entry[3] is None or entry[4] == len(entry[3]):
+                depth = IMPACT_DEPTH if entry[3] is None else len(entry[3]) * IMPACT_GROWTH
+                entry[3] = self._impact_list(entry[0], entry[2], avg_len, max(depth, k))
+                continue
+            doc_id = entry[3][entry[4]][1]
+            entry[4] += 1
+            if doc_id in scored:
+                continue
+            scored.add(doc_id)
+
+            norm = k1 * (1 - b + b * self.doc_len[doc_id] / avg_len)
+            score = 0.0
+            for _, postings, idf, _, _ in terms:
+                tf = postings.get(doc_id)
+                if tf:
+                    score += idf * tf * (k1 + 1) / (tf + norm)
+            if len(top) < k:
+                heapq.heappush(top, (score, doc_id))
+            elif score > top[0][0]:
+                heapq.heapreplace(top, (score, doc_id))
+
+        return [(doc_id, score) for score, doc_id in sorted(top, reverse=True)]
+
+    def save(self, path):
+        with open(path, "wb") as f:
+            pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def load(path):
+        with open(path, "rb") as f:
+            return pickle.load(f)
+
+    @classmethod
+    def from_vector_store(cls, vector_store):
+        """Index every document held by a FAISS store"""
+        index = cls()
+        docstore = vector_store.docstore
+        doc_ids = list(vector_store.index_to_docstore_id.values())
+        index.add(doc_ids, [docstore.search(i).page_content for i in doc_ids])
+        return index
+
+
+def attach_bm25(vector_store, index):
+    """Keep a BM25 index alongside a FAISS vector store"""
+    setattr(vector_store, _ATTR, index)
+    return index
+
+
+def get_bm25(vector_store):
+    """The BM25 index attached to a vector store, built on first use if missing"""
+    index = getattr(vector_store, _ATTR, None)
+    if index is None:
+        index = attach_bm25(vector_store, BM25Index.from_vector_store(vector_store))
+    return index
+
+
+def reciprocal_rank_fusion(dense_ids, lexical_ids, lexical_weight=0.5, rrf_k=60):
+    """
+    Fuse two ranked id lists with weighted reciprocal-rank fusion.
+
+    Args:
+        dense_ids (list): ids ranked by vector similarity
+        lexical_ids (list): ids ranked by BM25
+        lexical_weight (float): 0 = dense only, 1 = lexical only
+        rrf_k (int): rank damping constant
+
+    Returns:
+        list: (id, fused score) pairs, best first
+    """
+    fused = defaultdict(float)
+    for rank, doc_id in enumerate(dense_ids):
+        fused[doc_id] += (1 - lexical_weight) / (rrf_k + rank + 1)
+    for rank, doc_id in enumerate(lexical_ids):
+        fused[doc_id] += lexical_weight / (rrf_k + rank + 1)
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)
@@ -0,0 +1,192 @@
+from ingest.web_Ingestion import SPLITTER_CONFIG
+import os
+import re
+
+# Characters per token. This is an estimate, not a tokenizer count: Llama 3
+# averages about four characters of English text per token, fewer for
+# numbers, code and non-Latin scripts, and the Groq-hosted model's
+# tokenizer is not available locally.
+CHARS_PER_TOKEN = 4
+
+# Chunks retrieved per question (build_qa_chain's default k)
+DEFAULT_K = 3
+
+# Room for one "[n] source, p. X" header line and the section separator
+HEADER_TOKENS = 32
+
+# Fixed prompt budget for retrieved text; unset, it follows k (context_budget)
+CONTEXT_TOKENS = int(os.getenv("KNOWLENS_CONTEXT_TOKENS", "0"))
+
+# Shortest suffix/prefix match treated as splitter overlap rather than chance
+MIN_OVERLAP_CHARS = 40
+
+# Don't bother adding a section truncated below this many tokens
+MIN_SECTION_TOKENS = 64
+
+_BLANK_LINES_RE = re.compile(r"\n\s*\n+")
+_SPACES_RE = re.compile(r"[ \t\f\v]+")
+
+
+def estimate_tokens(text):
+    """Approximate token count of a text for the target model (see CHARS_PER_TOKEN)"""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def context_budget(k=DEFAULT_K, chunk_size=SPLITTER_CONFIG["chunk_size"]):
+    """
+    Prompt budget for the text of ``k`` retrieved chunks.
+
+    Large enough for ``k`` whole chunks and their headers, so nothing is
+    cut unless merged sections run longer than that; merging and
+    de-duplication are where the tokens are saved. KNOWLENS_CONTEXT_TOKENS
+    sets a fixed budget instead.
+    """
+    if CONTEXT_TOKENS:
+        return CONTEXT_TOKENS
+    return k * (estimate_tokens("x" * chunk_size) + HEADER_TOKENS)
+
+
+DEFAULT_CONTEXT_TOKENS = context_budget()
+
+
+def compact_text(text):
+    """Collapse runs of spaces and blank lines left by PDF and HTML extraction"""
+    text = _SPACES_RE.sub(" ", text)
+    text = _BLANK_LINES_RE.sub("\n\n", text)
+    return "\n".join(line.strip() for line in text.split("\n")).strip()
+
+
+def _overlap(left, right):
+    """Length of the longest suffix of ``left`` that is a prefix of ``right``"""
+    probe = right[:MIN_OVERLAP_CHARS]
+    if len(probe) < MIN_OVERLAP_CHARS:
+        return 0
+    # Earliest match in the tail gives the longest overlap
+    start = left.find(probe, max(0, len(left) - len(right)))
+    while start != -1:
+        if right.startswith(left[start:]):
+            return len(left) - start
+        start = left.find(probe, start + 1)
+    return 0
+
+
+def _merge(left, right):
+    """Merge two texts if one contains or overlaps the other, else None"""
+    if right in left:
+        return left
+    if left in right:
+        return right
+    overlap = _overlap(left, right)
+    if overlap:
+        return left + right[overlap:]
+    overlap = _overlap(right, left)
+    if overlap:
+        return right + left[overlap:]
+    return None
+
+
+def merge_hits(documents):
+    """
+    Merge retrieved chunks that overlap or repeat each other.
+
+    Chunks are grouped by source and page (splitting never crosses a page),
+    adjacent or overlapping chunks of a group are stitched into one span and
+    exact repeats are dropped. Sections keep the rank of their best chunk.
+
+    Returns:
+        list: ``{"source", "page", "rows", "text"}`` sections, best first
+    """
+    sections = []
+    for doc in documents:
+        meta = doc.metadata
+        source, page = meta.get("source", "Unknown source"), meta.get("page")
+        rows = (meta["row_start"], meta["row_end"]) if "row_start" in meta else None
+        text = compact_text(doc.page_content)
+        if not text:
+            continue
+
+        merged = False
+        for section in sections:
+            # CSV row blocks never overlap; keep them apart for citations
+            if rows is not None or (section["source"], section["page"], section["rows"]) != (source, page, None):
+                continue
+            joined = _merge(section["text"], text)
+            if joined is not None:
+                section["text"] = joined
+                merged = True
+                break
+        if not merged:
+            sections.append({"source": source, "page": page, "rows": rows, "text": text})
+
+    # A later chunk can bridge two sections of the same page
+    changed = True
+    while changed:
+        changed = False
+        for i, first in enumerate(sections):
+            for second in sections[i + 1:]:
+                if first["rows"] is not None or second["rows"] is not None:
+                    continue
+                if (first["source"], first["page"]) != (second["source"], second["page"]):
+                    continue
+                joined = _merge(first["text"], second["text"])
+                if joined is not None:
+                    first["text"] = joined
+                    sections.remove(second)
+                    changed = True
+                    break
+            if changed:
+                break
+    return sections
+
+
+def _truncate(text, max_tokens):
+    limit = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= limit:
+        return text
+    cut = text[:limit]
+    # End on a sentence or at least a word boundary
+    for boundary in (". ", "\n", " "):
+        pos = cut.rfind(boundary)
+        if pos > limit // 2:
+            return cut[:pos + 1].rstrip() + " …"
+    return cut + " …"
+
+
+def _header(number, section):
+    header = f"[{number}] {os.path.basename(str(section['source']))}"
+    if section["page"] is not None:
+        header += f", p. {section['page'] + 1}"
+    elif section.get("rows"):
+        header += f", rows {section['rows'][0]}-{section['rows'][1]}"
+    return header
+
+
+def build_context(documents, max_tokens=DEFAULT_CONTEXT_TOKENS):
+    """
+    Pack retrieved chunks into a compact prompt context.
+
+    Overlapping chunks are merged (see ``merge_hits``), each section gets a
+    one-line ``[n] source, p. X`` header instead of the document's metadata
+    dump, and sections are added best first until ``max_tokens`` is used.
+    The section that crosses the budget is truncated at a sentence boundary.
+
+    Args:
+        documents (list): retrieved Documents, best first
+        max_tokens (int): token budget for the whole context
+
+    Returns:
+        str: the context text
+    """
+    parts = []
+    remaining = max_tokens
+    for number, section in enumerate(merge_hits(documents), 1):
+        header = _header(number, section)
+        available = remaining - estimate_tokens(header) - 1
+        if available < MIN_SECTION_TOKENS and parts:
+            break
+        text = _truncate(section["text"], max(available, 1))
+        parts.append(f"{header}\n{text}")
+        remaining -= estimate_tokens(parts[-1]) + 1
+        if remaining <= 0:
+            break
+    return "\n\n".join(parts)
@@ -0,0 +1,215 @@
+from retrieval.embedding_cache import get_cached_embeddings
+from retrieval.bm25 import BM25Index, attach_bm25, get_bm25
+from retrieval.retriever import ReadWriteLock, attach_lock, set_index_fingerprint
+import hashlib
+from retrieval.ann_index import (
+    select_index_type, fit_index_type, index_type_of, pq_bits_of, convert_store, delete_from_store,
+    reconstruct_all
+)
+
+
+class Corpus:
+    """
+    A growing knowledge base made of many documents (files or URLs).
+
+    Each document is indexed on its own and its vectors are appended to the
+    corpus index with ``FAISS.merge_from``, so adding a document never
+    re-embeds the ones already there. Removing a document deletes its vectors
+    by id. Every mutation bumps ``version``.
+
+    With ``index_type="auto"`` the corpus starts on an exact flat index and
+    is retrained onto IVF / IVF-PQ as it crosses the size thresholds in
+    retrieval.ann_index, so query latency stays flat as it grows.
+
+    The corpus index is changed in place while other threads may be
+    searching it. Every mutation holds the write side of a reader/writer
+    lock that retriever.search takes for reading, so a search sees the
+    corpus either before or after a change, never halfway through.
+    """
+
+    # Automatic selection only ever moves up this ladder
+    _AUTO_ORDER = ("flat", "ivf", "ivfpq")
+
+    def __init__(self, embeddings=None, index_type="auto", **index_params):
+        self._embeddings = embeddings
+        self.index_type = index_type
+        self.index_params = index_params
+        self.vector_store = None
+        self.sources = {}  # source_id -> {"name": str, "ids": [docstore ids]}
+        self.version = 0
+        self._lock = ReadWriteLock()
+
+    @property
+    def embeddings(self):
+        # Resolved on first use: an empty knowledge base must not load the model
+        if self._embeddings is None:
+            self._embeddings = get_cached_embeddings()
+        return self._embeddings
+
+    def __contains__(self, source_id):
+        return source_id in self.sources
+
+    def __len__(self):
+        return self.vector_store.index.ntotal if self.vector_store is not None else 0
+
+    def _empty_store(self, dim):
+        from langchain_community.vectorstores import FAISS
+        from langchain_community.docstore.in_memory import InMemoryDocstore
+        import faiss
+
+        store = FAISS(
+            embedding_function=self.embeddings,
+            index=faiss.IndexFlatL2(dim),
+            docstore=InMemoryDocstore(),
+            index_to_docstore_id={},
+        )
+        attach_bm25(store, BM25Index())
+        attach_lock(store, self._lock)
+        return store
+
+    def add_document(self, source_id, vector_store, name=None):
+        """
+        Append a document's own index to the corpus.
+
+        Args:
+            source_id (str): stable id, e.g. the document fingerprint
+            vector_store (FAISS): index holding only this document's chunks
+            name (str): display name
+
+        Returns:
+            bool: False if the source was already in the corpus
+        """
+        with self._lock.write():
+            if source_id in self.sources:
+                return False
+            self._add(source_id, vector_store, name)
+            self._changed()
+            return True
+
+    def _add(self, source_id, vector_store, name):
+        ids = [
+            vector_store.index_to_docstore_id[i]
+            for i in range(vector_store.index.ntotal)
+        ]
+        if self.vector_store is None:
+            self.vector_store = self._empty_store(vector_store.index.d)
+
+        if index_type_of(self.vector_store.index) == "flat":
+            self.vector_store.merge_from(vector_store)
+        else:
+            # Trained ANN indexes cannot merge a flat index; add its
+            # stored vectors instead (still no re-embedding)
+            docs = [vector_store.docstore.search(i) for i in ids]
+            vectors = reconstruct_all(vector_store.index)
+            self.vector_store.add_embeddings(
+                [(d.page_content, v) for d, v in zip(docs, vectors)],
+                metadatas=[d.metadata for d in docs],
+                ids=ids,
+            )
+
+        # Document indexes carry their own BM25 postings; no re-tokenizing
+        get_bm25(self.vector_store).merge(get_bm25(vector_store))
+
+        self.sources[source_id] = {"name": name or source_id, "ids": ids}
+        self._maybe_reindex()
+
+    def _maybe_reindex(self):
+        current = index_type_of(self.vector_store.index)
+        if self.index_type == "auto":
+            wanted = select_index_type(len(self))
+            if self._AUTO_ORDER.index(wanted) <= self._AUTO_ORDER.index(current):
+                return
+        else:
+            # What build_index would really build at this size: small corpora
+            # get fewer PQ bits or no PQ, and rebuilding for the requested
+            # type would just fall back again
+            wanted, bits = fit_index_type(
+                self.index_type, len(self),
+                **{key: self.index_params[key] for key in ("pq_bits", "max_train_points")
+                   if key in self.index_params}
+            )
+            if wanted == current and pq_bits_of(self.vector_store.index) in (None, bits):
+                return
+            wanted = self.index_type
+        print(f"🔁 Re-indexing corpus of {len(self)} vectors as {wanted}")
+        try:
+            convert_store(self.vector_store, wanted, **self.index_params)
+        except Exception as e:
+            # The new document is already in the current index; keep serving it
+            print(f"⚠️ Could not re-index as {wanted}, keeping {current}: {e}")
+
+    def add_chunks(self, source_id, chunks, name=None):
+        """Embed a document's chunks and append them to the corpus"""
+        if source_id in self.sources:
+            return False
+        from langchain_community.vectorstores import FAISS
+
+        return self.add_document(
+            source_id, FAISS.from_documents(chunks, self.embeddings), name=name
+        )
+
+    def remove(self, source_id):
+        """Delete a document's vectors without touching the rest"""
+        with self._lock.write():
+            if not self._remove(source_id):
+                return False
+            self._changed()
+            return True
+
+    def _remove(self, source_id):
+        entry = self.sources.pop(source_id, None)
+        if entry is None:
+            return False
+        if entry["ids"]:
+            delete_from_store(self.vector_store, entry["ids"])
+            get_bm25(self.vector_store).remove(entry["ids"])
+        if not self.sources:
+            self.vector_store = None
+        return True
+
+    @property
+    def fingerprint(self):
+        """
+        Content identity: the same documents give the same value.
+
+        Chunk ids are included, so a source re-added after an incremental
+        refresh (new chunks under the same source id) changes it too.
+        """
+        h = hashlib.sha256()
+        for source_id in sorted(self.sources):
+            h.update(source_id.encode("utf-8"))
+            h.update("|".join(self.sources[source_id]["ids"]).encode("utf-8"))
+        return "corpus-" + h.hexdigest()
+
+    def replace(self, source_id, vector_store, name=None):
+        """Swap in a new version of a document (e.g. a refreshed website)"""
+        with self._lock.write():
+            name = name or self.sources.get(source_id, {}).get("name")
+            # One write section: searches never see the source missing
+            self._remove(source_id)
+            self._add(source_id, vector_store, name)
+            self._changed()
+            return True
+
+    def _changed(self):
+        self.version += 1
+        if self.vector_store is not None:
+            set_index_fingerprint(self.vector_store, self.fingerprint)
+
+    def documents(self, source_id=None):
+        """Stored chunks, for the whole corpus or a single source"""
+        with self._lock.read():
+            if self.vector_store is None:
+                return []
+            if source_id is None:
+                ids = [i for entry in self.sources.values() for i in entry["ids"]]
+            else:
+                ids = self.sources.get(source_id, {}).get("ids", [])
+            return [self.vector_store.docstore.search(i) for i in ids]
+
+    def list_sources(self):
+        """[(source_id, name, chunk count)] in insertion order"""
+        return [
+            (source_id, entry["name"], len(entry["ids"]))
+            for source_id, entry in self.sources.items()
+        ]
@@ -0,0 +1,206 @@
+from langchain_core.embeddings import Embeddings
+from retrieval.embeddings import get_embeddings, DEFAULT_EMBEDDING_MODEL
+import numpy as np
+import hashlib
+import sqlite3
+import threading
+import time
+import os
+
+DEFAULT_CACHE_DIR = os.getenv("KNOWLENS_CACHE_DIR", ".cache")
+DEFAULT_MAX_ENTRIES = int(os.getenv("KNOWLENS_EMBED_CACHE_MAX_ENTRIES", "500000"))
+
+# SQLite caps the number of bound parameters per statement
+_LOOKUP_BATCH = 500
+
+
+def chunk_hash(text):
+    """Content address of a chunk: sha256 of its UTF-8 text"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Persistent embedding cache keyed by (model name, normalize flag, chunk hash).
+
+    Vectors are stored as raw float32 bytes in a single SQLite file, so a
+    384-dim MiniLM vector costs 1.5 KB on disk. Entries carry a last-access
+    timestamp and the least recently used ones are evicted once the cache
+    grows past ``max_entries``.
+    """
+
+    def __init__(self, path=None, max_entries=DEFAULT_MAX_ENTRIES):
+        if path is None:
+            os.makedirs(DEFAULT_CACHE_DIR, exist_ok=True)
+            path = os.path.join(DEFAULT_CACHE_DIR, "embeddings.sqlite")
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS embeddings (
+                model TEXT NOT NULL,
+                normalized INTEGER NOT NULL,
+                hash TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                last_access REAL NOT NULL,
+                PRIMARY KEY (model, normalized, hash)
+            )"""
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_embeddings_last_access ON embeddings (last_access)"
+        )
+        self._conn.commit()
+
+    def get_many(self, model_name, normalize, hashes):
+        """
+        Batch lookup.
+
+        Returns:
+            dict: hash -> np.ndarray(float32) for every hash found
+        """
+        found = {}
+        unique = list(dict.fromkeys(hashes))
+        now = time.time()
+        with self._lock:
+            for start in range(0, len(unique), _LOOKUP_BATCH):
+                batch = unique[start:start + _LOOKUP_BATCH]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT hash, vector FROM embeddings "
+                    f"WHERE model = ? AND normalized = ? AND hash IN ({placeholders})",
+                    [model_name, int(normalize), *batch],
+                ).fetchall()
+                for h, blob in rows:
+                    found[h] = np.frombuffer(blob, dtype=np.float32)
+
+                # Touch hits so LRU eviction keeps them
+                hit_keys = [h for h in batch if h in found]
+                if hit_keys:
+                    self._conn.executemany(
+                        "UPDATE embeddings SET last_access = ? "
+                        "WHERE model = ? AND normalized = ? AND hash = ?",
+                        [(now, model_name, int(normalize), h) for h in hit_keys],
+                    )
+            self._conn.commit()
+            self.hits += sum(1 for h in hashes if h in found)
+            self.misses += sum(1 for h in hashes if h not in found)
+        return found
+
+    def put_many(self, model_name, normalize, items):
+        """Store (hash, vector) pairs and evict LRU entries if over capacity"""
+        now = time.time()
+        rows = [
+            (model_name, int(normalize), h, np.asarray(v, dtype=np.float32).tobytes(), now)
+            for h, v in items
+        ]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, normalized, hash, vector, last_access) "
+                "VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        if not self.max_entries:
+            return
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+        excess = count - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM embeddings WHERE rowid IN "
+                "(SELECT rowid FROM embeddings ORDER BY last_access ASC LIMIT ?)",
+                (excess,),
+            )
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM embeddings")
+            self._conn.commit()
+
+    def stats(self):
+        with self._lock:
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+        total = self.hits + self.misses
+        return {
+            "entries": count,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "path": self.path,
+        }
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings that consult an EmbeddingCache before calling the model.
+
+    Only chunks whose hash is not cached are sent through the underlying
+    model; re-ingesting a known document costs one batched cache lookup.
+    Query embeddings are not cached.
+    """
+
+    def __init__(self, underlying, cache, model_name, normalize):
+        self.underlying = underlying
+        self.cache = cache
+        self.model_name = model_name
+        self.normalize = normalize
+
+    def embed_documents(self, texts):
+        hashes = [chunk_hash(t) for t in texts]
+        found = self.cache.get_many(self.model_name, self.normalize, hashes)
+
+        missing = {}
+        for h, t in zip(hashes, texts):
+            if h not in found and h not in missing:
+                missing[h] = t
+
+        if missing:
+            new_vectors = self.underlying.embed_documents(list(missing.values()))
+            new_items = list(zip(missing.keys(), new_vectors))
+            self.cache.put_many(self.model_name, self.normalize, new_items)
+            for h, v in new_items:
+                found[h] = np.asarray(v, dtype=np.float32)
+
+        return [found[h].tolist() for h in hashes]
+
+    def embed_query(self, text):
+        return self.underlying.embed_query(text)
+
+
+_cache = None
+_cached_embeddings = {}
+_lock = threading.RLock()
+
+
+def get_embedding_cache():
+    """Return the process-wide on-disk embedding cache"""
+    global _cache
+    if _cache is None:
+        with _lock:
+            if _cache is None:
+                _cache = EmbeddingCache()
+    return _cache
+
+
+def get_cached_embeddings(model_name=DEFAULT_EMBEDDING_MODEL, normalize=True):
+    """Shared model from the registry, fronted by the on-disk cache"""
+    key = (model_name, normalize)
+    embeddings = _cached_embeddings.get(key)
+    if embeddings is None:
+        with _lock:
+            embeddings = _cached_embeddings.get(key)
+            if embeddings is None:
+                embeddings = CachedEmbeddings(
+                    get_embeddings(model_name, normalize),
+                    get_embedding_cache(),
+                    model_name,
+                    normalize,
+                )
+                _cached_embeddings[key] = embeddings
+    return embeddings
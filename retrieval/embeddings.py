@@ -0,0 +1,87 @@
+from langchain_core.embeddings import Embeddings
+import threading
+import os
+
+DEFAULT_EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+DEFAULT_BATCH_SIZE = 32
+
+# Process-wide registry: one loaded model per (model_name, normalize) pair,
+# shared by every Streamlit session and page running in this process.
+_registry = {}
+_registry_lock = threading.Lock()
+
+
+class SharedEmbeddings(Embeddings):
+    """
+    Thread-safe wrapper around a single loaded HuggingFaceEmbeddings model.
+
+    sentence-transformers models are not guaranteed to be safe under
+    concurrent ``encode`` calls, so every call is serialized on a per-model
+    lock. The model itself is loaded once and reused.
+    """
+
+    def __init__(self, model, model_name, normalize):
+        self.model = model
+        self.model_name = model_name
+        self.normalize = normalize
+        self._lock = threading.Lock()
+
+    def embed_documents(self, texts):
+        with self._lock:
+            return self.model.embed_documents(texts)
+
+    def embed_query(self, text):
+        with self._lock:
+            return self.model.embed_query(text)
+
+
+def _load_model(model_name, normalize, batch_size):
+    from langchain_huggingface import HuggingFaceEmbeddings
+
+    print(f"🧠 Loading embedding model: {model_name}")
+    return HuggingFaceEmbeddings(
+        model_name=model_name,
+        model_kwargs={"device": "cpu",
+                    "token": os.getenv("HF_TOKEN"),
+                      },
+        encode_kwargs={
+            "batch_size": batch_size,
+            "normalize_embeddings": normalize
+        }
+    )
+
+
+def get_embeddings(model_name=DEFAULT_EMBEDDING_MODEL, normalize=True, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Return the process-wide embedding model for ``model_name``.
+
+    The model is loaded on first use and shared afterwards, so repeated
+    uploads and concurrent sessions do not pay for model initialization
+    or hold their own copy of the weights.
+
+    Args:
+        model_name (str): sentence-transformers model name
+        normalize (bool): L2-normalize embeddings
+        batch_size (int): encode batch size (only used on first load)
+
+    Returns:
+        SharedEmbeddings: thread-safe embeddings instance
+    """
+    key = (model_name, normalize)
+    embeddings = _registry.get(key)
+    if embeddings is not None:
+        return embeddings
+
+    with _registry_lock:
+        # Another thread may have finished loading while we waited
+        embeddings = _registry.get(key)
+        if embeddings is None:
+            model = _load_model(model_name, normalize, batch_size)
+            embeddings = SharedEmbeddings(model, model_name, normalize)
+            _registry[key] = embeddings
+    return embeddings
+
+
+def loaded_models():
+    """List the (model_name, normalize) pairs currently loaded in this process"""
+    return list(_registry.keys())
@@ -0,0 +1,347 @@
+from retrieval.embedding_cache import get_cached_embeddings
+from retrieval.embeddings import DEFAULT_EMBEDDING_MODEL
+from retrieval.bm25 import BM25Index, attach_bm25, get_bm25
+from retrieval.retriever import set_index_fingerprint
+from telemetry import span
+import hashlib
+import json
+import shutil
+import threading
+import time
+import os
+
+DEFAULT_KB_DIR = os.getenv("KNOWLENS_KB_DIR", "vectorstore")
+
+# Bump when the on-disk layout or index contents change incompatibly
+KB_FORMAT_VERSION = 1
+
+_META_FILE = "meta.json"
+_BM25_FILE = "bm25.pkl"
+_SOURCE_STATE_FILE = "source_state.json"
+
+_SOURCE_STATE_ATTR = "_kb_source_state"
+
+
+def fingerprint_bytes(data):
+    """Content fingerprint of an uploaded file"""
+    return hashlib.sha256(data).hexdigest()
+
+
+def fingerprint_file(path, block_size=1 << 20):
+    """Content fingerprint of a file on disk, read in blocks"""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def fingerprint_url(url, variant=""):
+    """
+    Fingerprint of a website source.
+
+    The URL is normalized as the crawler does (web_Crawler.normalize_url):
+    scheme and host are case-insensitive, paths and queries are not.
+    ``variant`` tells apart different sources at the same URL, e.g. a crawl
+    and the single page.
+    """
+    from ingest.web_Crawler import normalize_url
+
+    return hashlib.sha256((variant + normalize_url(url)).encode("utf-8")).hexdigest()
+
+
+def index_stamp(splitter_config, model_name=DEFAULT_EMBEDDING_MODEL, normalize=True):
+    """
+    Version stamp for a saved index: chunking config + embedding model.
+
+    An index saved under a different stamp is never reopened, so changing
+    the splitter settings or the model forces a rebuild.
+    """
+    return {
+        "format": KB_FORMAT_VERSION,
+        "splitter": splitter_config,
+        "model": model_name,
+        "normalize": normalize,
+    }
+
+
+def set_source_state(vector_store, state):
+    """
+    Attach refresh state to a vector store (JSON-serializable dict).
+
+    Saved and restored with the index, e.g. the HTTP validators and content
+    hashes of crawled pages used by incremental website refresh.
+    """
+    setattr(vector_store, _SOURCE_STATE_ATTR, state)
+
+
+def source_state(vector_store):
+    """Refresh state attached to a vector store, or None"""
+    return getattr(vector_store, _SOURCE_STATE_ATTR, None)
+
+
+def _stamp_hash(stamp):
+    blob = json.dumps(stamp, sort_keys=True).encode("utf-8")
+    return hashlib.sha256(blob).hexdigest()[:12]
+
+
+def stored_documents(vector_store):
+    """Documents held by a FAISS store, in index order"""
+    docstore = vector_store.docstore
+    return [
+        docstore.search(doc_id)
+        for _, doc_id in sorted(vector_store.index_to_docstore_id.items())
+    ]
+
+
+class KnowledgeBaseStore:
+    """
+    Saved FAISS indexes keyed by document fingerprint and version stamp.
+
+    Each entry lives in ``<root>/<fingerprint>-<stamp hash>/`` and holds the
+    ``index.faiss`` / ``index.pkl`` pair written by ``FAISS.save_local``, the
+    BM25 index in ``bm25.pkl``, the optional source state in
+    ``source_state.json`` and a ``meta.json`` with the source name, stamp
+    and usage times.
+    """
+
+    def __init__(self, root=DEFAULT_KB_DIR):
+        self.root = root
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def _entry_dir(self, fingerprint, stamp):
+        return os.path.join(self.root, f"{fingerprint}-{_stamp_hash(stamp)}")
+
+    def _read_meta(self, entry_dir):
+        try:
+            with open(os.path.join(entry_dir, _META_FILE), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_meta(self, entry_dir, meta):
+        tmp = os.path.join(entry_dir, _META_FILE + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(meta, f, indent=2)
+        os.replace(tmp, os.path.join(entry_dir, _META_FILE))
+
+    def exists(self, fingerprint, stamp):
+        return self._read_meta(self._entry_dir(fingerprint, stamp)) is not None
+
+    def age(self, fingerprint, stamp):
+        """Seconds since an entry was saved or last checked fresh, or None"""
+        meta = self._read_meta(self._entry_dir(fingerprint, stamp))
+        if meta is None:
+            return None
+        return time.time() - max(meta["created"], meta.get("checked", 0))
+
+    def mark_checked(self, fingerprint, stamp):
+        """Record that an entry was found up to date, resetting its age"""
+        entry_dir = self._entry_dir(fingerprint, stamp)
+        with self._lock:
+            meta = self._read_meta(entry_dir)
+            if meta is not None:
+                meta["checked"] = time.time()
+                self._write_meta(entry_dir, meta)
+
+    def load(self, fingerprint, stamp, max_age=None):
+        """
+        Reopen a saved index.
+
+        Args:
+            fingerprint (str): document fingerprint
+            stamp (dict): version stamp from index_stamp()
+            max_age (float): ignore entries older than this many seconds
+
+        Returns:
+            FAISS or None: the saved vector store, or None if not stored
+        """
+        from langchain_community.vectorstores import FAISS
+
+        entry_dir = self._entry_dir(fingerprint, stamp)
+        meta = self._read_meta(entry_dir)
+        if meta is None:
+            return None
+        if max_age is not None and time.time() - max(meta["created"], meta.get("checked", 0)) > max_age:
+            return None
+
+        vector_store = FAISS.load_local(
+            entry_dir,
+            get_cached_embeddings(stamp["model"], stamp["normalize"]),
+            allow_dangerous_deserialization=True,  # only our own files
+        )
+        bm25_path = os.path.join(entry_dir, _BM25_FILE)
+        if os.path.exists(bm25_path):
+            attach_bm25(vector_store, BM25Index.load(bm25_path))
+        state_path = os.path.join(entry_dir, _SOURCE_STATE_FILE)
+        if os.path.exists(state_path):
+            with open(state_path, encoding="utf-8") as f:
+                set_source_state(vector_store, json.load(f))
+        # Entries are rewritten in place by refreshes; include the save time
+        set_index_fingerprint(vector_store, f"{os.path.basename(entry_dir)}@{meta['created']}")
+        meta["last_used"] = time.time()
+        with self._lock:
+            self._write_meta(entry_dir, meta)
+        print(f"📂 Reopened saved index for {meta.get('source')}")
+        return vector_store
+
+    def save(self, fingerprint, vector_store, stamp, source=None):
+        """Persist a vector store under (fingerprint, stamp)"""
+        entry_dir = self._entry_dir(fingerprint, stamp)
+        tmp_dir = entry_dir + f".tmp{os.getpid()}_{threading.get_ident()}"
+        vector_store.save_local(tmp_dir)
+        get_bm25(vector_store).save(os.path.join(tmp_dir, _BM25_FILE))
+        state = source_state(vector_store)
+        if state is not None:
+            with open(os.path.join(tmp_dir, _SOURCE_STATE_FILE), "w", encoding="utf-8") as f:
+                json.dump(state, f)
+
+        now = time.time()
+        self._write_meta(tmp_dir, {
+            "fingerprint": fingerprint,
+            "source": source,
+            "stamp": stamp,
+            "chunks": vector_store.index.ntotal,
+            "created": now,
+            "last_used": now,
+        })
+        with self._lock:
+            if os.path.isdir(entry_dir):
+                shutil.rmtree(entry_dir)
+            os.replace(tmp_dir, entry_dir)
+        set_index_fingerprint(vector_store, f"{os.path.basename(entry_dir)}@{now}")
+        return entry_dir
+
+    def list(self):
+        """Metadata of every stored index, most recently used first"""
+        entries = []
+        for name in os.listdir(self.root):
+            entry_dir = os.path.join(self.root, name)
+            if not os.path.isdir(entry_dir):
+                continue
+            meta = self._read_meta(entry_dir)
+            if meta is None:
+                continue
+            meta["path"] = entry_dir
+            meta["bytes"] = _dir_size(entry_dir)
+            entries.append(meta)
+        entries.sort(key=lambda m: m["last_used"], reverse=True)
+        return entries
+
+    def invalidate(self, fingerprint):
+        """Remove every stored version of a document. Returns count removed"""
+        removed = 0
+        with self._lock:
+            for name in os.listdir(self.root):
+                if name.startswith(fingerprint + "-"):
+                    shutil.rmtree(os.path.join(self.root, name), ignore_errors=True)
+                    removed += 1
+        return removed
+
+    def gc(self, current_stamps=None, max_age=None, max_total_bytes=None):
+        """
+        Garbage-collect stored indexes.
+
+        Args:
+            current_stamps (list): stamps still in use; entries saved under any
+                other stamp are removed
+            max_age (float): remove entries unused for this many seconds
+            max_total_bytes (int): then drop least recently used entries until
+                the store fits
+
+        Returns:
+            list: paths of removed entries
+        """
+        now = time.time()
+        keep_hashes = None
+        if current_stamps is not None:
+            keep_hashes = {_stamp_hash(s) for s in current_stamps}
+
+        removed = []
+        survivors = []
+        for meta in self.list():
+            stale = (
+                (keep_hashes is not None and _stamp_hash(meta["stamp"]) not in keep_hashes)
+                or (max_age is not None and now - meta["last_used"] > max_age)
+            )
+            if stale:
+                removed.append(meta["path"])
+            else:
+                survivors.append(meta)
+
+        if max_total_bytes is not None:
+            total = sum(m["bytes"] for m in survivors)
+            # survivors are most recently used first; drop from the tail
+            while survivors and total > max_total_bytes:
+                meta = survivors.pop()
+                total -= meta["bytes"]
+                removed.append(meta["path"])
+
+        with self._lock:
+            for path in removed:
+                shutil.rmtree(path, ignore_errors=True)
+
+        # Half-written entries from crashed saves
+        for name in os.listdir(self.root):
+            if ".tmp" in name and os.path.isdir(os.path.join(self.root, name)):
+                path = os.path.join(self.root, name)
+                if now - os.path.getmtime(path) > 3600:
+                    shutil.rmtree(path, ignore_errors=True)
+                    removed.append(path)
+        return removed
+
+
+def _dir_size(path):
+    return sum(
+        os.path.getsize(os.path.join(path, f))
+        for f in os.listdir(path)
+        if os.path.isfile(os.path.join(path, f))
+    )
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_kb_store():
+    """Return the process-wide knowledge-base store"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = KnowledgeBaseStore()
+    return _store
+
+
+def open_or_build(fingerprint, stamp, build, source=None, max_age=None, refresh=None):
+    """
+    Reopen the saved index for a document, or build and save it.
+
+    Args:
+        fingerprint (str): document fingerprint
+        stamp (dict): version stamp from index_stamp()
+        build (callable): returns a FAISS store for the document
+        source (str): display name stored in the metadata
+        max_age (float): treat older saved entries as missing
+        refresh (callable): updates an older saved store in place instead of
+            rebuilding it; returns True if anything changed
+
+    Returns:
+        FAISS: the document's vector store
+    """
+    store = get_kb_store()
+    with span("load_index") as load_span:
+        vector_store = store.load(fingerprint, stamp, max_age=None if refresh else max_age)
+        load_span.set(found=vector_store is not None)
+    if vector_store is None:
+        vector_store = build()
+        with span("save_index"):
+            store.save(fingerprint, vector_store, stamp, source=source)
+    elif refresh is not None and max_age is not None and store.age(fingerprint, stamp) > max_age:
+        if refresh(vector_store):
+            with span("save_index"):
+                store.save(fingerprint, vector_store, stamp, source=source)
+        else:
+            store.mark_checked(fingerprint, stamp)
+    return vector_store
@@ -1,23 +1,17 @@
-from langchain_groq import ChatGroq
 from langchain_core.prompts import PromptTemplate
-from langchain_core.runnables import RunnablePassthrough
+from langchain_core.runnables import RunnableLambda, RunnablePassthrough
 from langchain_core.output_parsers import StrOutputParser
+from retrieval.retriever import search, embed_query, index_fingerprint, DEFAULT_LEXICAL_WEIGHT
+from retrieval.context_builder import build_context, context_budget, estimate_tokens, DEFAULT_CONTEXT_TOKENS
+from telemetry import span, get_llm_trace_handler
+from operator import itemgetter
+import threading
 import os
 from dotenv import load_dotenv
 
 load_dotenv()
 
-def build_qa_chain(vector_store):
-    llm = ChatGroq(
-        model="llama-3.1-8b-instant",
-        temperature=0,
-        max_tokens=512
-    )
-
-    retriever = vector_store.as_retriever(search_kwargs={"k": 3})
-
-    prompt = PromptTemplate.from_template(
-        """You are an AI assistant helping users find information from their documents.
+PROMPT_TEMPLATE = """You are an AI assistant helping users find information from their documents.
 
 Using the context below, provide a clear and accurate answer to the question.
 
@@ -32,17 +26,175 @@ Context:
 Question: {question}
 
 Answer:"""
-    )
 
-    # LCEL pipeline (no deprecated imports)
-    rag_chain = (
+
+_llm = None
+_llm_lock = threading.Lock()
+
+
+def get_llm():
+    """
+    The process-wide Groq chat model answers are generated with.
+
+    Created on first use (or by the background warm-up, see service.warmup)
+    and shared by every chain, so its HTTP connection pool is reused.
+    """
+    global _llm
+    if _llm is None:
+        with _llm_lock:
+            if _llm is None:
+                from langchain_groq import ChatGroq
+
+                _llm = ChatGroq(
+                    model="llama-3.1-8b-instant",
+                    temperature=0,
+                    max_tokens=512
+                )
+    return _llm
+
+
+def build_answer_chain(context_tokens=DEFAULT_CONTEXT_TOKENS, llm=None):
+    """
+    The generation half of the RAG chain.
+
+    Takes ``{"question", "source_documents"}`` and returns the answer text;
+    used by build_qa_chain and by batch QA (retrieval.batch_qa). ``llm``
+    defaults to get_llm(); benchmarks pass a local stub.
+    """
+    llm = llm or get_llm()
+
+    prompt = PromptTemplate.from_template(PROMPT_TEMPLATE)
+
+    def context(docs):
+        with span("prompt", chunks=len(docs)) as prompt_span:
+            text = build_context(docs, max_tokens=context_tokens)
+            prompt_span.set(context_tokens=estimate_tokens(text))
+        return text
+
+    return (
         {
-            "context": retriever,
-            "question": RunnablePassthrough()
+            "context": itemgetter("source_documents") | RunnableLambda(context),
+            "question": itemgetter("question")
         }
         | prompt
-        | llm
+        # Each call becomes an "llm" span with time to first token and token counts
+        | llm.with_config(callbacks=[get_llm_trace_handler()])
         | StrOutputParser()
     )
 
+
+def build_qa_chain(vector_store, k=3, lexical_weight=DEFAULT_LEXICAL_WEIGHT, answer_cache=None,
+                   context_tokens=None, llm=None):
+    """
+    Build the RAG chain over a vector store.
+
+    The chain retrieves once per question and its output carries everything
+    the caller needs, so sources never require a second search:
+    ``{"question", "answer", "source_documents", "scores"}``.
+
+    Retrieval is hybrid dense + BM25 (see retrieval.retriever.search);
+    ``lexical_weight=0`` gives pure dense search with L2-distance scores.
+
+    Retrieved chunks reach the prompt through retrieval.context_builder:
+    overlapping chunks are merged and the context is packed into
+    ``context_tokens`` (default: room for ``k`` whole chunks, see
+    context_builder.context_budget). Sources still list the original
+    chunks.
+
+    With an ``answer_cache`` (retrieval.answer_cache), a question close
+    enough to one already answered over the same index returns the cached
+    answer and sources without retrieval or an LLM call; the output then
+    also has ``"cached": True``.
+
+    Returns:
+        tuple: (rag_chain, retriever)
+    """
+    retriever = vector_store.as_retriever(search_kwargs={"k": k})
+
+    def retrieve(question):
+        query_vector = None
+        if isinstance(question, dict):
+            question, query_vector = question["question"], question["question_vector"]
+        with span("retrieve", k=k) as retrieve_span:
+            hits = search(vector_store, question, k=k, lexical_weight=lexical_weight,
+                          query_vector=query_vector)
+            retrieve_span.set(hits=len(hits))
+        return {
+            "question": question,
+            "source_documents": [doc for doc, _ in hits],
+            "scores": [float(score) for _, score in hits],
+        }
+
+    answer_chain = build_answer_chain(context_tokens or context_budget(k), llm=llm)
+
+    # LCEL pipeline (no deprecated imports): retrieve once, then answer
+    # from exactly the documents that are returned as sources
+    rag_chain = RunnableLambda(retrieve) | RunnablePassthrough.assign(answer=answer_chain)
+
+    if answer_cache is not None:
+        rag_chain = _with_answer_cache(rag_chain, vector_store, answer_cache, k, lexical_weight)
+
     return rag_chain, retriever
+
+
+def _with_answer_cache(rag_chain, vector_store, answer_cache, k, lexical_weight):
+    def route(question):
+        # Fingerprint is read per question: corpora change in place
+        index_key = f"{index_fingerprint(vector_store)}:k={k}:lex={lexical_weight}"
+        with span("answer_cache", hit=False) as cache_span:
+            with span("embed_query"):
+                question_vector = embed_query(vector_store, question)
+            hit = answer_cache.lookup(index_key, question_vector)
+            cache_span.set(hit=hit is not None)
+        if hit is not None:
+            return RunnableLambda(lambda q: {**hit, "question": q, "cached": True})
+
+        def store(run):
+            answer_cache.store(index_key, question_vector, run.outputs)
+
+        # Reuse the question embedding for retrieval; the listener caches the
+        # final (aggregated) output, so streaming is unaffected
+        return (
+            RunnableLambda(lambda q: {"question": q, "question_vector": question_vector})
+            | rag_chain
+        ).with_listeners(on_end=store)
+
+    # A RunnableLambda that returns a Runnable runs it (and streams it)
+    # with the same input
+    return RunnableLambda(route)
+
+
+def _to_events(chunk):
+    # RunnablePassthrough.assign streams the retrieval output first as one
+    # chunk, then the assigned "answer" key token by token. A cached answer
+    # arrives as a single chunk holding both.
+    events = []
+    if "source_documents" in chunk:
+        events.append({
+            "type": "sources",
+            "source_documents": chunk["source_documents"],
+            "scores": chunk["scores"],
+            "cached": chunk.get("cached", False),
+        })
+    if "answer" in chunk:
+        events.append({"type": "token", "content": chunk["answer"]})
+    return events
+
+
+def stream_answer(rag_chain, question):
+    """
+    Stream a chain built by build_qa_chain.
+
+    Yields a single ``{"type": "sources", "source_documents", "scores",
+    "cached"}`` event as soon as retrieval finishes, then one
+    ``{"type": "token", "content"}`` event per generated token.
+    """
+    for chunk in rag_chain.stream(question):
+        yield from _to_events(chunk)
+
+
+async def astream_answer(rag_chain, question):
+    """Async version of stream_answer, for use from an event loop"""
+    async for chunk in rag_chain.astream(question):
+        for event in _to_events(chunk):
+            yield event
@@ -1,21 +1,143 @@
-from langchain_huggingface import HuggingFaceEmbeddings
-from langchain_community.vectorstores import FAISS
-import os
-
-def create_vector_store(documents):
-    embeddings = HuggingFaceEmbeddings(
-        model_name="all-MiniLM-L6-v2",
-        model_kwargs={"device": "cpu",
-                    "token": os.getenv("HF_TOKEN"),
-                      },
-        encode_kwargs={
-            "batch_size": 32,
-            "normalize_embeddings": True
-        }
-    )
+from retrieval.embedding_cache import get_cached_embeddings
+from retrieval.ann_index import convert_store
+from retrieval.bm25 import BM25Index, attach_bm25, get_bm25, reciprocal_rank_fusion
+from retrieval.search_cache import get_search_cache, normalize_query
+from langchain_core.documents import Document
+from telemetry import span
+import numpy as np
+import contextlib
+import threading
+
+# Share of the fused ranking given to BM25 (0 = dense only)
+DEFAULT_LEXICAL_WEIGHT = 0.5
+
+_FINGERPRINT_ATTR = "_kb_fingerprint"
+_LOCK_ATTR = "_kb_lock"
+
+
+class ReadWriteLock:
+    """
+    Many readers or one writer at a time.
+
+    A waiting writer holds back new readers, so a steady stream of searches
+    cannot starve an ingest. Not reentrant.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._readers = 0
+        self._writing = False
+        self._writers_waiting = 0
+
+    @contextlib.contextmanager
+    def read(self):
+        with self._condition:
+            while self._writing or self._writers_waiting:
+                self._condition.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._readers -= 1
+                if not self._readers:
+                    self._condition.notify_all()
+
+    @contextlib.contextmanager
+    def write(self):
+        with self._condition:
+            self._writers_waiting += 1
+            while self._writing or self._readers:
+                self._condition.wait()
+            self._writers_waiting -= 1
+            self._writing = True
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._writing = False
+                self._condition.notify_all()
+
+
+def attach_lock(vector_store, lock):
+    """Make searches of a store that is changed in place take ``lock.read()``"""
+    setattr(vector_store, _LOCK_ATTR, lock)
+
+
+def _reading(vector_store):
+    lock = getattr(vector_store, _LOCK_ATTR, None)
+    return lock.read() if lock is not None else contextlib.nullcontext()
+
+
+def set_index_fingerprint(vector_store, fingerprint):
+    """Record what a vector store holds; changes whenever its contents change"""
+    setattr(vector_store, _FINGERPRINT_ATTR, fingerprint)
+
+
+def index_fingerprint(vector_store):
+    """
+    Identity of a vector store's contents, used to key caches.
+
+    Stores opened from the knowledge-base store or managed by a Corpus carry
+    a content fingerprint, so sessions over the same documents share cache
+    entries. Other stores fall back to a per-object id.
+    """
+    fingerprint = getattr(vector_store, _FINGERPRINT_ATTR, None)
+    if fingerprint is None:
+        fingerprint = f"mem-{id(vector_store)}-{vector_store.index.ntotal}"
+    return fingerprint
+
+def create_vector_store(documents, index_type="flat", **index_params):
+    """
+    Embed documents into a FAISS vector store.
+
+    Args:
+        documents (list): chunks to index
+        index_type (str): "flat" (exact), "ivf", "hnsw", "ivfpq" or "auto"
+            to choose by vector count; see retrieval.ann_index
+        **index_params: tuning knobs passed to ann_index.build_index
+            (nlist, nprobe, hnsw_m, ef_search, pq_m, ...)
+    """
+    from langchain_community.vectorstores import FAISS
+
+    # Shared, process-wide model fronted by the on-disk embedding cache:
+    # only chunks not seen before are sent through the model
+    embeddings = get_cached_embeddings()
 
     # ALWAYS build fresh vector store
     vectorstore = FAISS.from_documents(documents, embeddings)
+    if index_type != "flat":
+        convert_store(vectorstore, index_type, **index_params)
+    # Lexical index built alongside the dense one
+    attach_bm25(vectorstore, BM25Index.from_vector_store(vectorstore))
+    return vectorstore
+
+
+def create_vector_store_from_batches(batches):
+    """
+    Build a vector store incrementally from an iterable of chunk batches.
+
+    Each batch is embedded and added as it arrives, so the full list of
+    chunks never has to exist in memory at once.
+    """
+    from langchain_community.vectorstores import FAISS
+
+    embeddings = get_cached_embeddings()
+
+    vectorstore = None
+    bm25 = BM25Index()
+    for batch in batches:
+        if vectorstore is None:
+            vectorstore = FAISS.from_documents(batch, embeddings)
+            ids = list(vectorstore.index_to_docstore_id.values())
+        else:
+            ids = vectorstore.add_documents(batch)
+        bm25.add(ids, [doc.page_content for doc in batch])
+
+    if vectorstore is not None:
+        attach_bm25(vectorstore, bm25)
+    if vectorstore is None:
+        raise ValueError("No chunks to index")
     return vectorstore
 
 
@@ -24,3 +146,122 @@ def get_retriever(vector_store):
         search_type="similarity",
         search_kwargs={"k": 3}
     )
+
+
+def embed_query(vector_store, query):
+    """Embed a query with the vector store's own embedding model"""
+    embeddings = vector_store.embeddings
+    if embeddings is not None:
+        return embeddings.embed_query(query)
+    return vector_store.embedding_function(query)
+
+
+def _dense_hits(vector_store, distances, positions):
+    """(docstore id, L2 distance) pairs from one query's row of FAISS results"""
+    id_map = vector_store.index_to_docstore_id
+    return [
+        (id_map[int(pos)], float(dist))
+        for pos, dist in zip(positions, distances)
+        if pos != -1
+    ]
+
+
+def _dense_search(vector_store, query, k, query_vector=None):
+    if query_vector is None:
+        with span("embed_query"):
+            query_vector = embed_query(vector_store, query)
+    distances, positions = vector_store.index.search(
+        np.array([query_vector], dtype=np.float32), k
+    )
+    return _dense_hits(vector_store, distances[0], positions[0])
+
+
+def _fuse(vector_store, query, dense_hits, k, lexical_weight, fetch_k):
+    """
+    Final (docstore id, score) hits from a query's dense hits: the top k as
+    they are, or fused with BM25 (dense_hits then holds fetch_k candidates).
+    """
+    if not lexical_weight:
+        return dense_hits[:k]
+    lexical_ids = [doc_id for doc_id, _ in get_bm25(vector_store).search(query, fetch_k)]
+    dense_ids = [doc_id for doc_id, _ in dense_hits]
+    return reciprocal_rank_fusion(dense_ids, lexical_ids, lexical_weight=lexical_weight)[:k]
+
+
+def _search_ids(vector_store, query, k, lexical_weight, fetch_k, query_vector):
+    dense_hits = _dense_search(vector_store, query, fetch_k if lexical_weight else k, query_vector)
+    return _fuse(vector_store, query, dense_hits, k, lexical_weight, fetch_k)
+
+
+def search(vector_store, query, k=3, lexical_weight=DEFAULT_LEXICAL_WEIGHT, fetch_k=None,
+           query_vector=None, use_cache=True):
+    """
+    Hybrid dense + BM25 search.
+
+    Both indexes return ``fetch_k`` candidates that are fused with weighted
+    reciprocal-rank fusion. With ``lexical_weight=0`` this is plain dense
+    search and the scores are FAISS L2 distances (lower is closer);
+    otherwise they are fused RRF scores (higher is better). Pass
+    ``query_vector`` if the query has already been embedded.
+
+    Results are kept in the process-wide search cache (retrieval.search_cache)
+    keyed by the index fingerprint, so a repeated query over unchanged
+    contents costs neither an embedding nor a search.
+
+    Returns:
+        list: (Document, score) pairs, best first
+    """
+    fetch_k = fetch_k or max(20, 4 * k)
+    docstore = vector_store.docstore
+
+    with span("search", k=k, lexical_weight=lexical_weight, cached=False) as search_span, \
+            _reading(vector_store):
+        if use_cache:
+            cache = get_search_cache()
+            fingerprint = index_fingerprint(vector_store)
+            key = (normalize_query(query), k, lexical_weight, fetch_k)
+            hits = cache.get(id(vector_store), fingerprint, key)
+            if hits is not None:
+                docs = [docstore.search(doc_id) for doc_id, _ in hits]
+                # Docstore lookups return a message string for unknown ids
+                if all(isinstance(doc, Document) for doc in docs):
+                    search_span.set(cached=True)
+                    return [(doc, score) for doc, (_, score) in zip(docs, hits)]
+
+        hits = _search_ids(vector_store, query, k, lexical_weight, fetch_k, query_vector)
+        if use_cache:
+            cache.put(id(vector_store), fingerprint, key, hits)
+        return [(docstore.search(doc_id), score) for doc_id, score in hits]
+
+
+def search_many(vector_store, queries, k=3, lexical_weight=DEFAULT_LEXICAL_WEIGHT, fetch_k=None,
+                query_vectors=None):
+    """
+    ``search`` for many queries at once.
+
+    Queries are embedded in one ``embed_documents`` call (the embedding
+    model has no query instruction, so this matches ``embed_query``) and
+    the FAISS index is searched once with the whole query matrix. BM25 and
+    fusion then run per query. The search cache is bypassed.
+
+    Returns:
+        list: one list of (Document, score) pairs per query
+    """
+    if not queries:
+        return []
+    fetch_k = fetch_k or max(20, 4 * k)
+    if query_vectors is None:
+        query_vectors = vector_store.embeddings.embed_documents(list(queries))
+
+    with _reading(vector_store):
+        distances, positions = vector_store.index.search(
+            np.array(query_vectors, dtype=np.float32), fetch_k if lexical_weight else k
+        )
+        docstore = vector_store.docstore
+
+        results = []
+        for query, row_distances, row_positions in zip(queries, distances, positions):
+            dense_hits = _dense_hits(vector_store, row_distances, row_positions)
+            hits = _fuse(vector_store, query, dense_hits, k, lexical_weight, fetch_k)
+            results.append([(docstore.search(doc_id), score) for doc_id, score in hits])
+    return results
@@ -0,0 +1,108 @@
+from collections import OrderedDict
+import threading
+import os
+
+DEFAULT_MAX_ENTRIES = int(os.getenv("KNOWLENS_SEARCH_CACHE_MAX_ENTRIES", "4096"))
+
+
+def normalize_query(query):
+    """Case- and whitespace-insensitive form of a query, used in cache keys"""
+    return " ".join(query.lower().split())
+
+
+class SearchResultCache:
+    """
+    LRU cache of retrieval results.
+
+    Keys are ``(index fingerprint, normalized query, k, search type)`` and
+    values are the ranked ``(docstore id, score)`` pairs, so a repeated query
+    skips both the query embedding and the FAISS / BM25 search. Documents
+    themselves are not copied; they are resolved from the store's docstore
+    on a hit.
+
+    The fingerprint changes whenever a store's contents change, so stale
+    results are never returned. The cache also remembers the last
+    fingerprint seen for each store object and purges the old entries as
+    soon as it moves on.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()  # key -> [(doc_id, score)]
+        self._current = {}             # id(vector store) -> last fingerprint seen
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _observe(self, store_id, fingerprint):
+        previous = self._current.get(store_id)
+        if previous == fingerprint:
+            return
+        self._current[store_id] = fingerprint
+        # Other live stores may still hold the old contents (shared corpora)
+        if previous is not None and previous not in self._current.values():
+            self._purge(previous)
+
+    def _purge(self, fingerprint):
+        stale = [key for key in self._entries if key[0] == fingerprint]
+        for key in stale:
+            del self._entries[key]
+        self.evictions += len(stale)
+
+    def get(self, store_id, fingerprint, key):
+        """Cached ``[(doc_id, score)]`` for ``(fingerprint, *key)``, or None"""
+        with self._lock:
+            self._observe(store_id, fingerprint)
+            hits = self._entries.get((fingerprint, *key))
+            if hits is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end((fingerprint, *key))
+            return hits
+
+    def put(self, store_id, fingerprint, key, hits):
+        with self._lock:
+            self._observe(store_id, fingerprint)
+            self._entries[(fingerprint, *key)] = list(hits)
+            self._entries.move_to_end((fingerprint, *key))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, fingerprint=None):
+        """Drop the entries of one index, or everything"""
+        with self._lock:
+            if fingerprint is None:
+                self._entries.clear()
+                self._current.clear()
+            else:
+                self._purge(fingerprint)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_search_cache():
+    """Return the process-wide search cache, shared by all sessions"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = SearchResultCache()
+    return _cache
@@ -0,0 +1,206 @@
+"""
+Headless HTTP service for ingestion and question answering.
+
+Run with:
+    uvicorn service.api:app --host 0.0.0.0 --port 8000
+
+Prometheus metrics are served at ``/metrics`` and recent request traces
+(per-stage timings, token counts, time to first token) at ``/traces``.
+
+Knowledge bases live in this process and are shared by every request (and
+every client) that uses the same ``kb_id``; saved indexes, the embedding
+model and the caches are shared by all of them. A knowledge base nobody has
+used for KB_IDLE_TTL seconds is dropped (its saved per-document indexes
+stay on disk, so loading the same files again is cheap).
+"""
+from fastapi import FastAPI, File, Form, HTTPException, UploadFile
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from pydantic import BaseModel
+from service.knowledge_base import KnowledgeBase
+from service.warmup import start_warmup
+from telemetry import render_metrics, recent_traces
+import contextlib
+import asyncio
+import json
+import threading
+import time
+import uuid
+import os
+
+# Concurrent LLM generations; further questions wait for a slot
+LLM_CONCURRENCY = int(os.getenv("KNOWLENS_LLM_CONCURRENCY", "4"))
+
+# Concurrent ingestion jobs (parsing + embedding run in worker threads)
+INGEST_CONCURRENCY = int(os.getenv("KNOWLENS_INGEST_CONCURRENCY", "2"))
+
+# Knowledge bases idle for longer than this (seconds) are dropped; 0 keeps them
+KB_IDLE_TTL = float(os.getenv("KNOWLENS_KB_IDLE_TTL", str(2 * 3600)))
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    # Serve (and answer /health) at once; the model loads in the background
+    start_warmup()
+    yield
+
+
+app = FastAPI(title="KnowLens", description="Document-grounded Q&A service", lifespan=lifespan)
+
+_knowledge_bases = {}
+_last_used = {}  # kb_id -> time.monotonic() of the last request
+_kb_lock = threading.Lock()
+_llm_slots = asyncio.Semaphore(LLM_CONCURRENCY)
+_ingest_slots = asyncio.Semaphore(INGEST_CONCURRENCY)
+
+
+class WebsiteRequest(BaseModel):
+    url: str
+    max_depth: int = 0
+    max_pages: int = 50
+
+
+class QueryRequest(BaseModel):
+    question: str
+
+
+def _evict_idle(now):
+    # Called with _kb_lock held
+    if not KB_IDLE_TTL:
+        return
+    for kb_id in [kb_id for kb_id, used in _last_used.items() if now - used > KB_IDLE_TTL]:
+        del _knowledge_bases[kb_id], _last_used[kb_id]
+        print(f"🧹 Dropped knowledge base {kb_id} (idle)")
+
+
+def _get_kb(kb_id, create=False):
+    with _kb_lock:
+        now = time.monotonic()
+        _evict_idle(now)
+        kb = _knowledge_bases.get(kb_id)
+        if kb is None:
+            if not create:
+                raise HTTPException(status_code=404, detail=f"Unknown knowledge base: {kb_id}")
+            kb = _knowledge_bases[kb_id] = KnowledgeBase()
+        _last_used[kb_id] = now
+        return kb
+
+
+def _describe(kb_id, kb):
+    return {"kb_id": kb_id, "version": kb.version, "chunks": kb.chunks, "sources": kb.sources()}
+
+
+async def _ingest(fn, *args, **kwargs):
+    """Run a blocking ingestion call in a worker thread, bounded and with clean errors"""
+    async with _ingest_slots:
+        try:
+            return await asyncio.to_thread(fn, *args, **kwargs)
+        except KeyError as e:
+            raise HTTPException(status_code=404, detail=f"Unknown source: {e}")
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.get("/health")
+async def health():
+    return {"status": "ok", "knowledge_bases": len(_knowledge_bases)}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/traces")
+async def traces(limit: int = 20, name: str = None):
+    """Most recent finished traces first (``name``: question, add_file, add_website, ...)"""
+    return {"traces": recent_traces(limit, name)}
+
+
+@app.post("/kb")
+async def create_kb():
+    kb_id = uuid.uuid4().hex
+    return _describe(kb_id, _get_kb(kb_id, create=True))
+
+
+@app.put("/kb/{kb_id}")
+async def open_kb(kb_id: str):
+    """Create a knowledge base under a caller-chosen id, or return the existing one"""
+    return _describe(kb_id, _get_kb(kb_id, create=True))
+
+
+@app.get("/kb/{kb_id}")
+async def get_kb(kb_id: str):
+    return _describe(kb_id, _get_kb(kb_id))
+
+
+@app.delete("/kb/{kb_id}")
+async def delete_kb(kb_id: str):
+    with _kb_lock:
+        _last_used.pop(kb_id, None)
+        if _knowledge_bases.pop(kb_id, None) is None:
+            raise HTTPException(status_code=404, detail=f"Unknown knowledge base: {kb_id}")
+    return {"deleted": kb_id}
+
+
+@app.post("/kb/{kb_id}/files")
+async def add_file(kb_id: str, file: UploadFile = File(...), use_ocr: bool = Form(False)):
+    kb = _get_kb(kb_id, create=True)
+    data = await file.read()
+    return await _ingest(kb.add_file, file.filename, data, use_ocr=use_ocr)
+
+
+@app.post("/kb/{kb_id}/websites")
+async def add_website(kb_id: str, request: WebsiteRequest):
+    kb = _get_kb(kb_id, create=True)
+    return await _ingest(kb.add_website, request.url, max_depth=request.max_depth,
+                         max_pages=request.max_pages)
+
+
+@app.post("/kb/{kb_id}/sources/{source_id}/refresh")
+async def refresh_source(kb_id: str, source_id: str):
+    kb = _get_kb(kb_id)
+    changed = await _ingest(kb.refresh_website, source_id)
+    return {"changed": changed, **_describe(kb_id, kb)}
+
+
+@app.delete("/kb/{kb_id}/sources/{source_id}")
+async def remove_source(kb_id: str, source_id: str):
+    kb = _get_kb(kb_id)
+    if not await asyncio.to_thread(kb.remove, source_id):
+        raise HTTPException(status_code=404, detail=f"Unknown source: {source_id}")
+    return _describe(kb_id, kb)
+
+
+@app.post("/kb/{kb_id}/query")
+async def query(kb_id: str, request: QueryRequest):
+    kb = _get_kb(kb_id)
+    async with _llm_slots:
+        try:
+            return await kb.aask(request.question)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.post("/kb/{kb_id}/query/stream")
+async def query_stream(kb_id: str, request: QueryRequest):
+    """
+    Stream an answer as newline-delimited JSON events: one ``sources``
+    event, then ``token`` events, a ``trace`` event with the timing
+    breakdown, then ``{"type": "done"}``.
+    """
+    kb = _get_kb(kb_id)
+    if kb.chunks == 0:
+        raise HTTPException(status_code=400, detail="The knowledge base is empty")
+
+    async def events():
+        async with _llm_slots:
+            try:
+                async for event in kb.astream(request.question):
+                    yield json.dumps(event) + "\n"
+            except Exception as e:
+                # Headers are already sent; report the failure in-band
+                yield json.dumps({"type": "error", "detail": str(e)}) + "\n"
+                return
+        yield json.dumps({"type": "done"}) + "\n"
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
@@ -0,0 +1,125 @@
+import json
+import os
+
+# When set, the Streamlit pages talk to this service instead of indexing in-process
+API_URL = os.getenv("KNOWLENS_API_URL")
+
+DEFAULT_TIMEOUT = 600
+
+
+class RemoteKnowledgeBase:
+    """
+    Client for one knowledge base on the HTTP service (service.api).
+
+    Same interface as service.knowledge_base.KnowledgeBase, so the pages
+    can use either. The service keeps the state; this object only holds
+    the ``kb_id`` and a pooled HTTP session.
+    """
+
+    def __init__(self, base_url=API_URL, kb_id=None, timeout=DEFAULT_TIMEOUT):
+        import requests
+
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self._session = requests.Session()
+        info = self._call("POST", "/kb") if kb_id is None else self._call("PUT", f"/kb/{kb_id}")
+        self.kb_id = info["kb_id"]
+        self._info = info
+
+    def _call(self, method, path, **kwargs):
+        response = self._session.request(method, self.base_url + path, timeout=self.timeout, **kwargs)
+        if response.status_code >= 400:
+            try:
+                detail = response.json().get("detail", response.text)
+            except ValueError:
+                detail = response.text
+            raise ValueError(detail)
+        return response.json()
+
+    def _update(self, info):
+        self._info = {key: info[key] for key in ("kb_id", "version", "chunks", "sources") if key in info}
+        return info
+
+    def _refresh_info(self):
+        return self._update(self._call("GET", f"/kb/{self.kb_id}"))
+
+    @property
+    def version(self):
+        return self._info["version"]
+
+    @property
+    def chunks(self):
+        return self._info["chunks"]
+
+    def sources(self):
+        return self._info["sources"]
+
+    def add_file(self, name, data, use_ocr=False):
+        result = self._call(
+            "POST", f"/kb/{self.kb_id}/files",
+            files={"file": (name, data)},
+            data={"use_ocr": str(use_ocr).lower()},
+        )
+        self._refresh_info()
+        return result
+
+    def add_website(self, url, max_depth=0, max_pages=50):
+        result = self._call(
+            "POST", f"/kb/{self.kb_id}/websites",
+            json={"url": url, "max_depth": max_depth, "max_pages": max_pages},
+        )
+        self._refresh_info()
+        return result
+
+    def refresh_website(self, source_id):
+        return self._update(self._call("POST", f"/kb/{self.kb_id}/sources/{source_id}/refresh"))["changed"]
+
+    def remove(self, source_id):
+        try:
+            self._update(self._call("DELETE", f"/kb/{self.kb_id}/sources/{source_id}"))
+        except ValueError:
+            return False
+        return True
+
+    def close(self):
+        """Delete the knowledge base on the service"""
+        try:
+            self._call("DELETE", f"/kb/{self.kb_id}")
+        except ValueError:
+            # Already gone (deleted elsewhere or dropped as idle)
+            pass
+
+    def stream(self, question):
+        """Answer events, as KnowledgeBase.stream"""
+        with self._session.post(
+            f"{self.base_url}/kb/{self.kb_id}/query/stream",
+            json={"question": question},
+            stream=True,
+            timeout=self.timeout,
+        ) as response:
+            if response.status_code >= 400:
+                raise ValueError(response.json().get("detail", response.text))
+            for line in response.iter_lines(decode_unicode=True):
+                if not line:
+                    continue
+                event = json.loads(line)
+                if event["type"] == "done":
+                    return
+                if event["type"] == "error":
+                    raise RuntimeError(event["detail"])
+                yield event
+
+
+def new_knowledge_base(kb_id=None):
+    """
+    A local KnowledgeBase, or a remote one when KNOWLENS_API_URL is set.
+
+    ``kb_id`` names the remote knowledge base, so a caller that keeps its id
+    (e.g. per Streamlit session) reuses one knowledge base on the service
+    instead of creating another each time. Local knowledge bases ignore it.
+    """
+    if API_URL:
+        return RemoteKnowledgeBase(API_URL, kb_id=kb_id)
+    from service.knowledge_base import KnowledgeBase
+
+    return KnowledgeBase()
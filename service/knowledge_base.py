@@ -0,0 +1,262 @@
+from ingest.web_Ingestion import SPLITTER_CONFIG as WEB_SPLITTER_CONFIG
+from retrieval.kb_store import open_or_build, fingerprint_bytes, fingerprint_url, index_stamp, get_kb_store
+from retrieval.corpus import Corpus
+from retrieval.answer_cache import get_answer_cache
+from telemetry import trace, get_metrics
+from utils import format_sources
+import tempfile
+import threading
+import os
+
+# Website content changes; saved indexes older than this are refreshed
+# with conditional requests (only changed pages are re-embedded)
+WEB_INDEX_MAX_AGE = 24 * 3600
+
+# Site indexes carry crawl state for incremental refresh
+WEB_INDEX_STAMP = index_stamp({**WEB_SPLITTER_CONFIG, "loader": "crawler"})
+
+
+def _sources_event(event):
+    """Stream event with Documents replaced by display-ready source dicts"""
+    if event["type"] != "sources":
+        return event
+    return {
+        "type": "sources",
+        "sources": format_sources(event["source_documents"], event["scores"]),
+        "cached": event["cached"],
+    }
+
+
+def _observe(root, event):
+    """Note cache use and time to first token on a question's trace"""
+    if event["type"] == "sources":
+        root.set(cached=event["cached"], sources=len(event["sources"]))
+        get_metrics().inc("knowlens_questions_total", cached=str(event["cached"]).lower())
+    elif event["type"] == "token" and "time_to_first_token_ms" not in root.attributes:
+        ttft = root.duration
+        root.set(time_to_first_token_ms=round(ttft * 1000, 3))
+        get_metrics().observe("knowlens_time_to_first_token_seconds", ttft, scope="question")
+
+
+class KnowledgeBase:
+    """
+    A corpus of files and websites plus the QA chain over it.
+
+    This is everything the Streamlit pages and the HTTP service
+    (service.api) do with a knowledge base: ingest a file or a site, refresh
+    or remove it, and answer questions. Stream events carry display-ready
+    sources (utils.format_sources), so local and remote knowledge bases
+    (service.client.RemoteKnowledgeBase) look the same to callers.
+    """
+
+    def __init__(self):
+        self.corpus = Corpus()
+        self._chain = None
+        self._chain_version = None
+        self._lock = threading.Lock()
+
+    @property
+    def version(self):
+        return self.corpus.version
+
+    @property
+    def chunks(self):
+        return len(self.corpus)
+
+    def sources(self):
+        """[{"source_id", "name", "chunks"}] in insertion order"""
+        return [
+            {"source_id": source_id, "name": name, "chunks": count}
+            for source_id, name, count in self.corpus.list_sources()
+        ]
+
+    def add_file(self, name, data, use_ocr=False):
+        """
+        Index an uploaded file (reusing its saved index) and add it.
+
+        Returns:
+            dict: ``{"source_id", "name", "chunks", "added"}``; ``added`` is
+            False if the same content was already in the knowledge base
+        """
+        with trace("add_file", name=name, bytes=len(data), ocr=use_ocr) as root:
+            result = self._add_file(name, data, use_ocr)
+            root.set(chunks=result["chunks"], added=result["added"])
+        return result
+
+    def _add_file(self, name, data, use_ocr):
+        from ingest.pdf_Ingest import ingest_config
+        from ingest.pipeline_Ingest import pipelined_ingest
+
+        source_id = fingerprint_bytes(data)
+        if source_id in self.corpus:
+            return {"source_id": source_id, "name": name, "added": False,
+                    "chunks": len(self.corpus.sources[source_id]["ids"])}
+
+        def build():
+            # Loaders dispatch on the extension; cite the uploaded name
+            _, extension = os.path.splitext(name)
+            fd, temp_path = tempfile.mkstemp(suffix=extension.lower())
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(data)
+                return pipelined_ingest(temp_path, use_ocr=use_ocr, source_name=name)
+            finally:
+                try:
+                    os.remove(temp_path)
+                except OSError:
+                    pass
+
+        store = open_or_build(source_id, index_stamp(ingest_config(use_ocr, name)), build, source=name)
+        # Counted first: merging into a flat corpus index moves the vectors out
+        chunks = store.index.ntotal
+        added = self.corpus.add_document(source_id, store, name=name)
+        return {"source_id": source_id, "name": name, "chunks": chunks, "added": added}
+
+    def add_website(self, url, max_depth=0, max_pages=50):
+        """
+        Fetch (or crawl) a website and add it.
+
+        ``max_depth=0`` loads the single page. Saved indexes are reopened and,
+        once older than WEB_INDEX_MAX_AGE, refreshed incrementally.
+
+        Returns:
+            dict: ``{"source_id", "name", "chunks", "added"}``
+        """
+        with trace("add_website", url=url, max_depth=max_depth) as root:
+            result = self._add_website(url, max_depth, max_pages)
+            root.set(chunks=result["chunks"], added=result["added"])
+        return result
+
+    def _add_website(self, url, max_depth, max_pages):
+        from ingest.web_Crawler import crawl_website, refresh_website
+
+        if max_depth:
+            # A crawl is a different source from the single page at the same URL
+            source_id = fingerprint_url(url, variant=f"crawl:{max_depth}:{max_pages}:")
+            name = f"{url} (crawl, depth {max_depth})"
+        else:
+            source_id = fingerprint_url(url)
+            name = url
+        if source_id in self.corpus:
+            return {"source_id": source_id, "name": name, "added": False,
+                    "chunks": len(self.corpus.sources[source_id]["ids"])}
+
+        store = open_or_build(
+            source_id,
+            WEB_INDEX_STAMP,
+            lambda: crawl_website(url, max_depth=max_depth, max_pages=max_pages),
+            source=name,
+            max_age=WEB_INDEX_MAX_AGE,
+            refresh=refresh_website,
+        )
+        chunks = store.index.ntotal
+        added = self.corpus.add_document(source_id, store, name=name)
+        return {"source_id": source_id, "name": name, "chunks": chunks, "added": added}
+
+    def refresh_website(self, source_id):
+        """
+        Re-check a loaded website and swap in its updated index.
+
+        Returns:
+            bool: True if any page changed
+        """
+        with trace("refresh_website", source_id=source_id) as root:
+            changed = self._refresh_website(source_id)
+            root.set(changed=changed)
+        return changed
+
+    def _refresh_website(self, source_id):
+        from ingest.web_Crawler import refresh_website
+
+        if source_id not in self.corpus:
+            raise KeyError(source_id)
+        kb_store = get_kb_store()
+        store = kb_store.load(source_id, WEB_INDEX_STAMP)
+        if store is None:
+            raise ValueError("Saved index not found; remove the site and load it again")
+        if not refresh_website(store):
+            kb_store.mark_checked(source_id, WEB_INDEX_STAMP)
+            return False
+        name = self.corpus.sources[source_id]["name"]
+        kb_store.save(source_id, store, WEB_INDEX_STAMP, source=name)
+        return self.corpus.replace(source_id, store, name=name)
+
+    def remove(self, source_id):
+        return self.corpus.remove(source_id)
+
+    def close(self):
+        """Drop every source, releasing the in-memory index"""
+        with self._lock:
+            self.corpus = Corpus()
+            self._chain = None
+            self._chain_version = None
+
+    def chain(self):
+        """QA chain over the current corpus, rebuilt after it changes"""
+        from retrieval.qa_chain import build_qa_chain
+
+        with self._lock:
+            if self._chain_version != self.corpus.version:
+                if self.corpus.vector_store is None:
+                    self._chain = None
+                else:
+                    self._chain, _ = build_qa_chain(
+                        self.corpus.vector_store, answer_cache=get_answer_cache()
+                    )
+                self._chain_version = self.corpus.version
+            return self._chain
+
+    def _require_chain(self):
+        chain = self.chain()
+        if chain is None:
+            raise ValueError("The knowledge base is empty; add a document or website first")
+        return chain
+
+    def stream(self, question):
+        """
+        Answer a question as events.
+
+        Yields ``{"type": "sources", "sources", "cached"}`` once, then
+        ``{"type": "token", "content"}`` per generated token, then
+        ``{"type": "trace", "trace"}`` with the question's timing breakdown
+        (see telemetry).
+        """
+        from retrieval.qa_chain import stream_answer
+
+        chain = self._require_chain()
+        with trace("question", question_chars=len(question), chunks=self.chunks) as root:
+            for event in stream_answer(chain, question):
+                event = _sources_event(event)
+                _observe(root, event)
+                yield event
+        yield {"type": "trace", "trace": root.as_dict()}
+
+    async def astream(self, question):
+        """Async version of ``stream``"""
+        from retrieval.qa_chain import astream_answer
+
+        chain = self._require_chain()
+        with trace("question", question_chars=len(question), chunks=self.chunks) as root:
+            async for event in astream_answer(chain, question):
+                event = _sources_event(event)
+                _observe(root, event)
+                yield event
+        yield {"type": "trace", "trace": root.as_dict()}
+
+    async def aask(self, question):
+        """
+        Answer a question in one piece.
+
+        Returns:
+            dict: ``{"answer", "sources", "cached", "trace"}``
+        """
+        result = {"answer": "", "sources": [], "cached": False, "trace": None}
+        async for event in self.astream(question):
+            if event["type"] == "sources":
+                result["sources"] = event["sources"]
+                result["cached"] = event["cached"]
+            elif event["type"] == "trace":
+                result["trace"] = event["trace"]
+            else:
+                result["answer"] += event["content"]
+        return result
@@ -0,0 +1,71 @@
+import threading
+import time
+import os
+
+# Set KNOWLENS_WARMUP=0 to skip the background warm-up (scripts, CI)
+WARMUP_ENABLED = os.getenv("KNOWLENS_WARMUP", "1") != "0"
+
+_thread = None
+_lock = threading.Lock()
+
+
+def _import_pipeline():
+    # Everything the first upload and the first question import
+    import ingest.pipeline_Ingest  # noqa: F401
+    import ingest.web_Crawler  # noqa: F401
+    import retrieval.qa_chain  # noqa: F401
+    import langchain_community.vectorstores  # noqa: F401
+    import langchain_text_splitters  # noqa: F401
+    import faiss  # noqa: F401
+
+
+def _load_embeddings():
+    from retrieval.embeddings import get_embeddings
+
+    # One encode call initializes the model's runtime, not only its weights
+    get_embeddings().embed_query("warm-up")
+
+
+def _create_llm():
+    from retrieval.qa_chain import get_llm
+
+    get_llm()
+
+
+def _warm_up():
+    start = time.perf_counter()
+    for step, fn in (
+        ("pipeline imports", _import_pipeline),
+        ("embedding model", _load_embeddings),
+        ("LLM client", _create_llm),
+    ):
+        try:
+            fn()
+        except Exception as e:
+            # First use will raise it again, where the user can see it
+            print(f"⚠️ Warm-up of the {step} failed: {e}")
+    print(f"🔥 Warm-up finished in {time.perf_counter() - start:.1f}s")
+
+
+def start_warmup():
+    """
+    Load the ML stack in a background thread, once per process.
+
+    Called after the landing page (or a page) has rendered, so the page is
+    interactive before the embedding model and LLM client are ready; the
+    first upload or question then finds them loaded. Nothing is loaded
+    when the pages talk to the HTTP service (KNOWLENS_API_URL).
+
+    Returns:
+        threading.Thread or None: the warm-up thread, if one was started
+    """
+    global _thread
+    from service.client import API_URL
+
+    if not WARMUP_ENABLED or API_URL:
+        return None
+    with _lock:
+        if _thread is None:
+            _thread = threading.Thread(target=_warm_up, name="knowlens-warmup", daemon=True)
+            _thread.start()
+    return _thread
@@ -0,0 +1,386 @@
+"""
+Tracing spans and metrics for ingestion and question answering.
+
+Code under measurement opens spans::
+
+    with trace("question", question_chars=len(question)) as root:
+        with span("retrieve", k=k) as s:
+            ...
+            s.set(hits=len(hits))
+
+Spans nest through a context variable, so they follow the work across
+LangChain runnables, ``asyncio`` tasks and ``asyncio.to_thread``. Every
+finished span is observed in the ``knowlens_stage_duration_seconds``
+histogram; a finished ``trace`` is also kept in memory (recent_traces) and
+appended as one JSON line to TRACE_LOG. ``render_metrics`` returns all
+metrics in the Prometheus text format (served by service.api at /metrics).
+
+LLM calls are traced by LLMTraceHandler, a LangChain callback that records
+time to first token and prompt / completion token counts.
+"""
+from langchain_core.callbacks import BaseCallbackHandler
+from retrieval.context_builder import CHARS_PER_TOKEN
+import contextlib
+import contextvars
+import collections
+import threading
+import json
+import time
+import os
+
+# JSON lines, one finished trace per line; empty disables the log
+TRACE_LOG = os.getenv(
+    "KNOWLENS_TRACE_LOG", os.path.join(os.getenv("KNOWLENS_CACHE_DIR", ".cache"), "traces.jsonl")
+)
+
+# The log is rotated to ``<TRACE_LOG>.1`` past this size
+TRACE_LOG_MAX_BYTES = int(os.getenv("KNOWLENS_TRACE_LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+
+# Finished traces kept in memory for /traces and the debug panels
+RECENT_TRACES = 100
+
+# Histogram buckets (seconds): sub-millisecond searches up to long ingests
+DURATION_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+
+METRIC_HELP = {
+    "knowlens_stage_duration_seconds": ("histogram", "Duration of traced pipeline stages"),
+    "knowlens_time_to_first_token_seconds": ("histogram", "Time to the first answer token"),
+    "knowlens_llm_tokens_total": ("counter", "LLM tokens by kind (prompt or completion)"),
+    "knowlens_traces_total": ("counter", "Finished traces by name and status"),
+    "knowlens_questions_total": ("counter", "Answered questions by answer-cache use"),
+}
+
+_current = contextvars.ContextVar("knowlens_span", default=None)
+
+
+class Span:
+    """One timed unit of work with attributes and child spans"""
+
+    def __init__(self, name, /, **attributes):
+        self.name = name
+        self.attributes = attributes
+        self.children = []
+        self.started_at = time.time()
+        self.start = time.perf_counter()
+        self.end = None
+        self.status = "ok"
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    @property
+    def duration(self):
+        return (self.end if self.end is not None else time.perf_counter()) - self.start
+
+    def finish(self, error=None):
+        if self.end is not None:
+            return
+        self.end = time.perf_counter()
+        if error is not None:
+            self.status = "error"
+            self.attributes["error"] = f"{type(error).__name__}: {error}"
+        get_metrics().observe("knowlens_stage_duration_seconds", self.duration, stage=self.name)
+
+    def as_dict(self, origin=None):
+        origin = self.start if origin is None else origin
+        return {
+            "name": self.name,
+            "start_ms": round((self.start - origin) * 1000, 3),
+            "duration_ms": round(self.duration * 1000, 3),
+            "status": self.status,
+            "attributes": self.attributes,
+            "children": [child.as_dict(origin) for child in self.children],
+        }
+
+
+def current_span():
+    """The innermost open span in this context, or None"""
+    return _current.get()
+
+
+def _attach(child):
+    parent = _current.get()
+    if parent is not None:
+        # list.append is atomic; spans from worker threads may land concurrently
+        parent.children.append(child)
+    return parent
+
+
+@contextlib.contextmanager
+def _open(new_span):
+    token = _current.set(new_span)
+    try:
+        yield new_span
+    except BaseException as e:
+        new_span.finish(error=e if isinstance(e, Exception) else None)
+        raise
+    finally:
+        new_span.finish()
+        try:
+            _current.reset(token)
+        except ValueError:
+            # A generator closed from another context; the variable dies with it
+            pass
+
+
+@contextlib.contextmanager
+def span(name, /, **attributes):
+    """Time a stage as a child of the current span (metrics only if there is none)"""
+    new_span = Span(name, **attributes)
+    _attach(new_span)
+    with _open(new_span):
+        yield new_span
+
+
+@contextlib.contextmanager
+def trace(name, /, **attributes):
+    """
+    Start a trace: a root span that is logged when it finishes.
+
+    Opened inside another span, it is recorded as a child span instead.
+    """
+    root = Span(name, **attributes)
+    if _attach(root) is not None:
+        with _open(root):
+            yield root
+        return
+    try:
+        with _open(root):
+            yield root
+    finally:
+        get_metrics().inc("knowlens_traces_total", name=name, status=root.status)
+        get_trace_log().record(root)
+
+
+def record_span(name, seconds, /, parent=None, **attributes):
+    """
+    Add an already-measured stage (e.g. busy time summed over threads) to
+    ``parent``, or to the current span.
+    """
+    recorded = Span(name, **attributes)
+    recorded.end = recorded.start
+    recorded.start -= seconds
+    if parent is not None:
+        parent.children.append(recorded)
+    else:
+        _attach(recorded)
+    get_metrics().observe("knowlens_stage_duration_seconds", seconds, stage=name)
+    return recorded
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _number(value):
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Metrics:
+    """Process-wide counters and histograms, rendered in the Prometheus text format"""
+
+    def __init__(self, buckets=DURATION_BUCKETS):
+        self.buckets = buckets
+        self._counters = collections.defaultdict(float)
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name, value=1, /, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] += value
+
+    def observe(self, name, value, /, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    histogram["counts"][i] += 1
+            histogram["sum"] += value
+            histogram["count"] += 1
+
+    @staticmethod
+    def _labels(labels, extra=()):
+        pairs = list(labels) + list(extra)
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in pairs) + "}"
+
+    def render(self):
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {key: dict(value, counts=list(value["counts"])) for key, value in self._histograms.items()}
+
+        lines = []
+        for name, (kind, help_text) in METRIC_HELP.items():
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+            if kind == "counter":
+                for (metric, labels), value in sorted(counters.items()):
+                    if metric == name:
+                        lines.append(f"{name}{self._labels(labels)} {_number(value)}")
+                continue
+            for (metric, labels), histogram in sorted(histograms.items()):
+                if metric != name:
+                    continue
+                for bound, count in zip(self.buckets, histogram["counts"]):
+                    lines.append(f"{name}_bucket{self._labels(labels, [('le', f'{bound:g}')])} {count}")
+                lines.append(f"{name}_bucket{self._labels(labels, [('le', '+Inf')])} {histogram['count']}")
+                lines.append(f"{name}_sum{self._labels(labels)} {histogram['sum']:.6f}")
+                lines.append(f"{name}_count{self._labels(labels)} {histogram['count']}")
+        return "\n".join(lines) + "\n"
+
+
+class TraceLog:
+    """Recent finished traces in memory, appended to a JSON-lines file"""
+
+    def __init__(self, path=TRACE_LOG, max_bytes=TRACE_LOG_MAX_BYTES, keep=RECENT_TRACES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.recent = collections.deque(maxlen=keep)
+        self._lock = threading.Lock()
+
+    def record(self, root):
+        entry = {"started_at": root.started_at, **root.as_dict()}
+        with self._lock:
+            self.recent.append(entry)
+            if not self.path:
+                return
+            try:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                if os.path.exists(self.path) and os.path.getsize(self.path) > self.max_bytes:
+                    os.replace(self.path, self.path + ".1")
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(entry, default=str) + "\n")
+            except OSError as e:
+                print(f"⚠️ Could not write trace log {self.path}: {e}")
+
+    def latest(self, limit=20, name=None):
+        with self._lock:
+            entries = [entry for entry in self.recent if name is None or entry["name"] == name]
+        return entries[-limit:][::-1]
+
+
+class LLMTraceHandler(BaseCallbackHandler):
+    """
+    LangChain callback that records each LLM call as an ``llm`` span.
+
+    The span gets the model name, time to first token (when streaming) and
+    token counts. Counts come from the provider's usage metadata when it
+    reports them; otherwise the prompt is estimated from its length and
+    the completion is the number of streamed tokens.
+    """
+
+    # Run in the caller's context, so the span joins the current trace
+    run_inline = True
+
+    def __init__(self):
+        self._runs = {}
+        self._lock = threading.Lock()
+
+    def _start(self, run_id, serialized, prompt_chars, invocation_params):
+        params = invocation_params or {}
+        model = params.get("model") or params.get("model_name") or (serialized or {}).get("name")
+        llm_span = Span("llm", model=model)
+        _attach(llm_span)
+        with self._lock:
+            self._runs[run_id] = {"span": llm_span, "prompt_chars": prompt_chars, "tokens": 0}
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        chars = sum(len(str(message.content)) for batch in messages for message in batch)
+        self._start(run_id, serialized, chars, kwargs.get("invocation_params"))
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._start(run_id, serialized, sum(len(p) for p in prompts), kwargs.get("invocation_params"))
+
+    def on_llm_new_token(self, token, *, run_id, **kwargs):
+        run = self._runs.get(run_id)
+        if run is None or not token:
+            return
+        if run["tokens"] == 0:
+            ttft = run["span"].duration
+            run["span"].set(time_to_first_token_ms=round(ttft * 1000, 3))
+            get_metrics().observe("knowlens_time_to_first_token_seconds", ttft, scope="llm")
+        run["tokens"] += 1
+
+    def _usage(self, response):
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+                if usage:
+                    return usage.get("input_tokens"), usage.get("output_tokens")
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        return usage.get("prompt_tokens"), usage.get("completion_tokens")
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        with self._lock:
+            run = self._runs.pop(run_id, None)
+        if run is None:
+            return
+        prompt_tokens, completion_tokens = self._usage(response)
+        estimated = prompt_tokens is None or completion_tokens is None
+        if prompt_tokens is None:
+            prompt_tokens = -(-run["prompt_chars"] // CHARS_PER_TOKEN)
+        if completion_tokens is None:
+            text = "".join(g.text for generations in response.generations for g in generations)
+            completion_tokens = run["tokens"] or -(-len(text) // CHARS_PER_TOKEN)
+        run["span"].set(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens,
+                        tokens_estimated=estimated)
+        run["span"].finish()
+        metrics = get_metrics()
+        metrics.inc("knowlens_llm_tokens_total", prompt_tokens, kind="prompt")
+        metrics.inc("knowlens_llm_tokens_total", completion_tokens, kind="completion")
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        with self._lock:
+            run = self._runs.pop(run_id, None)
+        if run is not None:
+            run["span"].finish(error=error)
+
+
+_metrics = None
+_trace_log = None
+_llm_handler = None
+_lock = threading.Lock()
+
+
+def get_metrics():
+    """Return the process-wide metrics registry"""
+    global _metrics
+    if _metrics is None:
+        with _lock:
+            if _metrics is None:
+                _metrics = Metrics()
+    return _metrics
+
+
+def get_trace_log():
+    """Return the process-wide trace log"""
+    global _trace_log
+    if _trace_log is None:
+        with _lock:
+            if _trace_log is None:
+                _trace_log = TraceLog()
+    return _trace_log
+
+
+def get_llm_trace_handler():
+    """Return the shared LLM callback handler"""
+    global _llm_handler
+    if _llm_handler is None:
+        with _lock:
+            if _llm_handler is None:
+                _llm_handler = LLMTraceHandler()
+    return _llm_handler
+
+
+def render_metrics():
+    """All metrics in the Prometheus text exposition format"""
+    return get_metrics().render()
+
+
+def recent_traces(limit=20, name=None):
+    """Most recent finished traces first, optionally only those called ``name``"""
+    return get_trace_log().latest(limit, name)
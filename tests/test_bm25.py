@@ -0,0 +1,67 @@
+from collections import defaultdict
+import heapq
+import math
+import random
+
+from retrieval.bm25 import BM25Index, tokenize
+
+
+def exhaustive(index, query, k):
+    """Reference BM25: every posting of every query term"""
+    n_docs = len(index.doc_len)
+    avg_len = index.total_len / n_docs
+    k1, b = index.k1, index.b
+    scores = defaultdict(float)
+    for term in set(tokenize(query)):
+        postings = index.postings.get(term, {})
+        df = len(postings)
+        idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5)) if df else 0.0
+        for doc_id, tf in postings.items():
+            scores[doc_id] += idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * index.doc_len[doc_id] / avg_len))
+    return heapq.nlargest(k, scores.values())
+
+
+def corpus(n_docs=3000, seed=0):
+    """Zipf-like vocabulary and varied document lengths"""
+    rng = random.Random(seed)
+    vocabulary = [f"w{i}" for i in range(2000)]
+    weights = [1 / (rank + 1) for rank in range(len(vocabulary))]
+    index = BM25Index()
+    texts = [
+        " ".join(rng.choices(vocabulary, weights, k=rng.randint(5, 400)))
+        for _ in range(n_docs)
+    ]
+    index.add([f"d{i}" for i in range(n_docs)], texts)
+    return index, vocabulary, rng
+
+
+def assert_matches(index, query, k):
+    found = [score for _, score in index.search(query, k)]
+    assert [round(s, 9) for s in found] == [round(s, 9) for s in exhaustive(index, query, k)], query
+
+
+def test_search_matches_exhaustive_scoring():
+    index, vocabulary, rng = corpus()
+    # Every band of document frequency, including terms in well over 100 docs
+    assert sum(1 for term in vocabulary if len(index.postings[term]) > 100) > 50
+    for _ in range(200):
+        terms = rng.sample(vocabulary[:50], 2) + rng.sample(vocabulary[50:], rng.randint(1, 3))
+        for k in (1, 10, 50):
+            assert_matches(index, " ".join(terms), k)
+
+
+def test_search_matches_exhaustive_scoring_for_common_terms():
+    index, vocabulary, rng = corpus(seed=1)
+    for _ in range(50):
+        assert_matches(index, " ".join(rng.sample(vocabulary[:20], rng.randint(1, 6))), 10)
+
+
+def test_search_after_changes():
+    index, vocabulary, rng = corpus(n_docs=1000, seed=2)
+    query = " ".join(vocabulary[:3] + vocabulary[500:503])
+    assert_matches(index, query, 10)
+    index.remove([f"d{i}" for i in range(0, 1000, 3)])
+    assert_matches(index, query, 10)
+    index.add(["extra"], [query * 3])
+    assert index.search(query, 1)[0][0] == "extra"
+    assert_matches(index, query, 10)
@@ -0,0 +1,51 @@
+import hashlib
+
+import numpy as np
+from langchain_community.vectorstores import FAISS
+from langchain_core.embeddings import Embeddings
+
+from retrieval.ann_index import index_type_of, pq_bits_of
+from retrieval.corpus import Corpus
+
+
+class HashEmbeddings(Embeddings):
+    """Deterministic random vectors, no model"""
+
+    def _vector(self, text):
+        seed = int(hashlib.md5(text.encode("utf-8")).hexdigest()[:8], 16)
+        return list(np.random.default_rng(seed).random(16))
+
+    def embed_documents(self, texts):
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text):
+        return self._vector(text)
+
+
+def _document(embeddings, name, n_chunks):
+    return FAISS.from_texts([f"{name} chunk {i}" for i in range(n_chunks)], embeddings)
+
+
+def test_small_pq_corpus_does_not_reindex_on_every_add(capsys):
+    embeddings = HashEmbeddings()
+    corpus = Corpus(embeddings=embeddings, index_type="pq")
+    for i in range(5):
+        corpus.add_document(f"doc{i}", _document(embeddings, f"doc{i}", 30), name=f"doc{i}")
+
+    # Too few vectors for PQ: sq8 is built once and then kept
+    assert index_type_of(corpus.vector_store.index) == "sq8"
+    assert capsys.readouterr().out.count("Re-indexing") == 1
+    assert len(corpus) == 150
+    assert corpus.version == 5
+
+
+def test_pq_corpus_moves_to_pq_once_it_can_train():
+    embeddings = HashEmbeddings()
+    corpus = Corpus(embeddings=embeddings, index_type="pq", pq_bits=5)
+    corpus.add_document("small", _document(embeddings, "small", 100))
+    assert index_type_of(corpus.vector_store.index) == "sq8"
+
+    corpus.add_document("large", _document(embeddings, "large", 39 * 32))
+    assert index_type_of(corpus.vector_store.index) == "pq"
+    assert pq_bits_of(corpus.vector_store.index) == 5
+    assert corpus.vector_store.similarity_search("large chunk 3", k=1)
@@ -0,0 +1,54 @@
+import csv
+
+import pytest
+
+from ingest.csv_Ingest import RowBlockCSVLoader
+
+
+def _write(tmp_path, header, rows):
+    path = tmp_path / "data.csv"
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        writer.writerows(rows)
+    return str(path)
+
+
+def _blocks(path, max_block_chars=200):
+    return list(RowBlockCSVLoader(path, max_block_chars=max_block_chars).lazy_load())
+
+
+def test_blocks_stay_within_budget_with_a_wide_header(tmp_path):
+    header = [f"column_{i}" for i in range(12)]  # ~120 chars of a 200 budget
+    rows = [[str(r)] * 12 for r in range(40)] + [["x" * 300] + [""] * 11]
+    blocks = _blocks(_write(tmp_path, header, rows))
+    header_line = ",".join(header)
+    assert all(len(b.page_content) <= 200 for b in blocks)
+    assert all(b.page_content.startswith(header_line + "\n") for b in blocks)
+    # The oversized last row is cut into header-prefixed pieces
+    pieces = [b for b in blocks if b.metadata["row_start"] == 41]
+    assert len(pieces) > 1
+    assert all(b.metadata["row_end"] == 41 for b in pieces)
+
+
+def test_header_over_budget_gives_one_row_per_block(tmp_path):
+    header = [f"a_rather_long_column_name_{i}" for i in range(10)]
+    blocks = _blocks(_write(tmp_path, header, [["1"] * 10, ["2"] * 10, ["3"] * 10]))
+    assert [(b.metadata["row_start"], b.metadata["row_end"]) for b in blocks] == [(1, 1), (2, 2), (3, 3)]
+
+
+def test_rows_are_numbered_from_the_file(tmp_path):
+    path = tmp_path / "ragged.csv"
+    path.write_text("id,name\n1,a\n2\n3,c,extra\n4,d\n", encoding="utf-8")
+    blocks = _blocks(str(path), max_block_chars=18)
+    assert [(b.metadata["row_start"], b.metadata["row_end"]) for b in blocks] == [(1, 2), (3, 3), (4, 4)]
+    assert blocks[-1].page_content == "id,name\n4,d"
+
+
+def test_empty_and_header_only_files(tmp_path):
+    empty = tmp_path / "empty.csv"
+    empty.write_text("", encoding="utf-8")
+    with pytest.raises(ValueError, match="is empty"):
+        _blocks(str(empty))
+    with pytest.raises(ValueError, match="no data rows"):
+        _blocks(_write(tmp_path, ["id", "name"], []))
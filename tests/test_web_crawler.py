@@ -0,0 +1,288 @@
+import asyncio
+import copy
+import hashlib
+import socket
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from langchain_core.embeddings import Embeddings
+
+from ingest.web_Crawler import WebCrawler, acrawl_website, arefresh_website
+from retrieval.kb_store import source_state
+
+
+def _page(title, *links):
+    anchors = "".join(f'<a href="{link}">{link}</a>' for link in links)
+    return web.Response(
+        text=f"<html><head><title>{title}</title></head><body><p>{title} text</p>{anchors}</body></html>",
+        content_type="text/html",
+    )
+
+
+def _site(other_origin):
+    """A small site; ``other_origin`` is a second host, out of scope"""
+    pages = {
+        "/": ("Home", "/a", "/private", "/moved", "/offsite", "/dup", "/bad-charset",
+              f"{other_origin}/external"),
+        "/a": ("A", "/b"),
+        "/b": ("B", "/c"),
+        "/c": ("C",),
+        "/private": ("Private",),
+        "/target": ("Target",),
+    }
+
+    async def handle(request):
+        path = request.path
+        if path == "/robots.txt":
+            return web.Response(text="User-agent: *\nDisallow: /private\n")
+        if path == "/moved":
+            raise web.HTTPFound("/target")
+        if path == "/dup":
+            raise web.HTTPFound("/a")
+        if path == "/offsite":
+            raise web.HTTPFound(f"{other_origin}/external")
+        if path == "/bad-charset":
+            return web.Response(body=b"<html><p>x</p></html>",
+                                headers={"Content-Type": "text/html; charset=no-such-charset"})
+        if path not in pages:
+            raise web.HTTPNotFound()
+        return _page(*pages[path])
+
+    app = web.Application()
+    app.router.add_get("/{tail:.*}", handle)
+    return app
+
+
+def _other_site():
+    async def handle(request):
+        return _page("External")
+
+    app = web.Application()
+    app.router.add_get("/{tail:.*}", handle)
+    return app
+
+
+def crawl(**params):
+    """Crawl the test site; returns ({path: result}, stats)"""
+
+    async def run():
+        # Same port range, different host name: out of scope for the crawler
+        other = TestServer(_other_site(), host="localhost")
+        await other.start_server()
+        server = TestServer(_site(f"http://localhost:{other.port}"), host="127.0.0.1")
+        await server.start_server()
+        root = str(server.make_url("")).rstrip("/")
+        try:
+            crawler = WebCrawler(root + "/", timeout=5, **params)
+            results = [result async for result in crawler.results()]
+        finally:
+            await server.close()
+            await other.close()
+        return {r["url"][len(root):] or "/": r for r in results}, crawler.stats
+
+    return asyncio.run(asyncio.wait_for(run(), timeout=30))
+
+
+def test_depth_limit():
+    results, _ = crawl(max_depth=2)
+    assert results["/a"]["status"] == "ok"
+    assert results["/b"]["status"] == "ok"
+    assert "/c" not in results
+
+
+def test_page_limit():
+    results, stats = crawl(max_depth=3, max_pages=2)
+    assert len(results) == 2
+    assert stats.dropped > 0
+
+
+def test_robots_txt():
+    results, stats = crawl(max_depth=1)
+    assert results["/private"]["status"] == "skipped"
+    assert stats.disallowed == 1
+
+
+def test_out_of_scope_links_are_not_followed():
+    results, _ = crawl(max_depth=1)
+    assert all(not url.startswith("http") for url in results)
+
+
+def test_redirects():
+    results, _ = crawl(max_depth=1)
+    moved = results["/moved"]
+    assert moved["status"] == "ok"
+    assert moved["document"].metadata["source"].endswith("/target")
+    # Out of scope after the redirect
+    assert results["/offsite"]["status"] == "skipped"
+    # Lands on a page already crawled under its own URL
+    assert results["/a"]["status"] == "ok"
+    assert results["/dup"]["status"] == "skipped"
+
+
+def test_page_errors_do_not_stop_the_crawl():
+    results, stats = crawl(max_depth=1)
+    assert results["/bad-charset"]["status"] == "error"
+    assert any(url.endswith("/bad-charset") for url in stats.failures)
+    assert results["/a"]["status"] == "ok"
+
+
+def test_start_url_redirect_moves_the_scope(monkeypatch):
+    # www.example.test and example.test both resolve to the test server
+    getaddrinfo = socket.getaddrinfo
+
+    def resolve(host, *args, **kwargs):
+        if isinstance(host, str) and host.endswith("example.test"):
+            host = "127.0.0.1"
+        return getaddrinfo(host, *args, **kwargs)
+
+    monkeypatch.setattr(socket, "getaddrinfo", resolve)
+
+    async def handle(request):
+        if request.host.startswith("www."):
+            # www -> apex, like many sites
+            raise web.HTTPMovedPermanently(f"http://example.test:{request.url.port}{request.path}")
+        if request.path == "/robots.txt":
+            raise web.HTTPNotFound()
+        if request.path == "/":
+            return _page("Home", "/a")
+        return _page("A")
+
+    async def run():
+        app = web.Application()
+        app.router.add_get("/{tail:.*}", handle)
+        server = TestServer(app, host="127.0.0.1")
+        await server.start_server()
+        try:
+            crawler = WebCrawler(f"http://www.example.test:{server.port}/", max_depth=1, timeout=5)
+            return [result async for result in crawler.results()]
+        finally:
+            await server.close()
+
+    results = asyncio.run(asyncio.wait_for(run(), timeout=30))
+    statuses = {result["url"].split("/", 3)[-1]: result["status"] for result in results}
+    assert statuses == {"": "ok", "a": "ok"}
+    assert results[0]["document"].metadata["source"].startswith("http://example.test:")
+
+
+class _Embeddings(Embeddings):
+    """Fixed-size vectors from text hashes; ``fail`` makes embedding raise"""
+
+    fail = False
+
+    def embed_documents(self, texts):
+        if self.fail:
+            raise RuntimeError("embedding failed")
+        return [self.embed_query(text) for text in texts]
+
+    def embed_query(self, text):
+        digest = hashlib.sha256(text.encode("utf-8")).digest()
+        return [byte / 255 for byte in digest[:8]]
+
+
+class _ChangingSite:
+    """A site whose pages can be edited or deleted between crawls"""
+
+    def __init__(self):
+        self.pages = {
+            "/": ("Home", "/etag", "/dated", "/plain"),
+            "/etag": ("Etag page v1",),
+            "/dated": ("Dated page",),
+            "/plain": ("Plain page",),
+        }
+        self.etags = {"/etag": '"v1"'}
+        self.not_modified = set()
+
+    async def handle(self, request):
+        path = request.path
+        if path == "/robots.txt" or path not in self.pages:
+            raise web.HTTPNotFound()
+        headers = {}
+        if path in self.etags:
+            headers["ETag"] = self.etags[path]
+            if request.headers.get("If-None-Match") == self.etags[path]:
+                self.not_modified.add(path)
+                return web.Response(status=304, headers=headers)
+        if path == "/dated":
+            headers["Last-Modified"] = "Mon, 05 Jan 2026 10:00:00 GMT"
+            if request.headers.get("If-Modified-Since") == headers["Last-Modified"]:
+                self.not_modified.add(path)
+                return web.Response(status=304, headers=headers)
+        response = _page(*self.pages[path])
+        response.headers.update(headers)
+        return response
+
+
+def _texts(vector_store):
+    return sorted(
+        vector_store.docstore.search(doc_id).page_content
+        for doc_id in vector_store.index_to_docstore_id.values()
+    )
+
+
+def refresh_site(edit, embeddings=None):
+    """Crawl a _ChangingSite, apply ``edit(site, embeddings)``, refresh; returns what happened"""
+
+    async def run():
+        site = _ChangingSite()
+        app = web.Application()
+        app.router.add_get("/{tail:.*}", site.handle)
+        server = TestServer(app, host="127.0.0.1")
+        await server.start_server()
+        try:
+            embedder = embeddings or _Embeddings()
+            store = await acrawl_website(str(server.make_url("/")), embeddings=embedder, max_depth=1)
+            before = (_texts(store), copy.deepcopy(source_state(store)))
+            edit(site, embedder)
+            try:
+                report = await arefresh_website(store, embeddings=embedder)
+            except Exception as e:
+                report = e
+            return site, store, before, report
+        finally:
+            await server.close()
+
+    return asyncio.run(asyncio.wait_for(run(), timeout=30))
+
+
+def test_refresh_updates_changed_and_deleted_pages():
+    def edit(site, _):
+        site.pages["/etag"] = ("Etag page v2",)
+        site.etags["/etag"] = '"v2"'
+        del site.pages["/plain"]
+
+    site, store, _, report = refresh_site(edit)
+    assert report == {"unchanged": 2, "changed": 1, "added": 0, "removed": 1}
+    texts = " ".join(_texts(store))
+    assert "Etag page v2" in texts and "Etag page v1" not in texts
+    assert "Plain page" not in texts
+    assert site.not_modified == {"/dated"}
+    pages = source_state(store)["pages"]
+    assert sorted(url.rsplit("/", 1)[-1] for url in pages) == ["", "dated", "etag"]
+    assert sum(len(page["ids"]) for page in pages.values()) == store.index.ntotal
+
+
+def test_refresh_answers_304_for_unchanged_pages():
+    site, store, (texts, _), report = refresh_site(lambda site, _: None)
+    assert report == {"unchanged": 4, "changed": 0, "added": 0, "removed": 0}
+    assert site.not_modified == {"/etag", "/dated"}
+    assert _texts(store) == texts
+
+
+def test_failed_refresh_leaves_the_store_alone():
+    def delete_everything(site, _):
+        site.pages.clear()
+
+    _, store, (texts, state), report = refresh_site(delete_everything)
+    assert isinstance(report, ValueError)
+    assert _texts(store) == texts
+    assert source_state(store) == state
+
+    def break_embedding(site, embeddings):
+        site.pages["/etag"] = ("Etag page v2",)
+        site.etags["/etag"] = '"v2"'
+        embeddings.fail = True
+
+    _, store, (texts, state), report = refresh_site(break_embedding)
+    assert isinstance(report, RuntimeError)
+    assert _texts(store) == texts
+    assert source_state(store) == state
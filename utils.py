@@ -1,19 +1,31 @@
 
 
 
-def format_sources(source_documents):
+def format_sources(source_documents, scores=None):
     formatted_sources = []
 
     seen = set()  # to avoid duplicates
 
-    for doc in source_documents:
+    if scores is None:
+        scores = [None] * len(source_documents)
+
+    for doc, score in zip(source_documents, scores):
         meta = doc.metadata
 
         source_name = meta.get("source", "Unknown source")
         page = meta.get("page", None)
         total_pages = meta.get("total_pages", None)
+        row_start = meta.get("row_start", None)
+        row_end = meta.get("row_end", None)
+
+        if row_start is not None:
+            location = f"Rows {row_start}–{row_end}"
+        elif page is not None:
+            location = f"Page {page + 1} of {total_pages}" if total_pages else f"Page {page + 1}"
+        else:
+            location = "Whole document"
 
-        key = (source_name, page)
+        key = (source_name, page, row_start)
         if key in seen:
             continue
         seen.add(key)
@@ -22,9 +34,48 @@ def format_sources(source_documents):
             "source": source_name,
             "page": page + 1 if page is not None else None,
             "total_pages": total_pages,
-            "excerpt": doc.page_content[:300] + "..."
+            "rows": (row_start, row_end) if row_start is not None else None,
+            "location": location,
+            "excerpt": doc.page_content[:300] + "...",
+            "score": score
         }
 
         formatted_sources.append(entry)
 
     return formatted_sources
+
+
+def timing_breakdown(trace):
+    """
+    Summarize a question trace (see telemetry) for the debug panels.
+
+    Returns:
+        dict: headline numbers (total, time to first token, LLM token
+        counts) and ``rows``: one ``{"stage", "ms", "details"}`` per span,
+        indented by depth
+    """
+    summary = {
+        "total_ms": trace["duration_ms"],
+        "time_to_first_token_ms": trace["attributes"].get("time_to_first_token_ms"),
+        "cached": trace["attributes"].get("cached", False),
+        "prompt_tokens": None,
+        "completion_tokens": None,
+        "rows": [],
+    }
+
+    def visit(span, depth):
+        attributes = span["attributes"]
+        if span["name"] == "llm":
+            summary["prompt_tokens"] = attributes.get("prompt_tokens")
+            summary["completion_tokens"] = attributes.get("completion_tokens")
+        details = ", ".join(f"{key}={value}" for key, value in attributes.items())
+        summary["rows"].append({
+            "stage": "    " * depth + span["name"],
+            "ms": round(span["duration_ms"], 1),
+            "details": details,
+        })
+        for child in span["children"]:
+            visit(child, depth + 1)
+
+    visit(trace, 0)
+    return summary